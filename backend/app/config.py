@@ -12,17 +12,94 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./analytics.db"
     
+    # Source Database Connection Pools
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is recycled
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_IDLE_TIMEOUT: int = 600  # Seconds before an unused engine is disposed
+    DB_IMPORT_CHUNK_SIZE: int = 50000  # Rows fetched per server-side cursor chunk
+    
     # File Upload
     UPLOAD_DIR: str = "uploads"
-    MAX_UPLOAD_SIZE: int = 10485760  # 10MB
-    ALLOWED_EXTENSIONS: list = [".csv", ".xlsx", ".xls"]
+    MAX_UPLOAD_SIZE: int = 4294967296  # 4GB
+    MAX_DECODED_SIZE: int = 17179869184  # 16GB of CSV text after decompression
+    UPLOAD_CHUNK_SIZE: int = 1048576  # Bytes read per upload chunk
+    CSV_BLOCK_SIZE: int = 16777216  # Bytes of CSV text parsed per block
+    CSV_SAMPLE_SIZE: int = 1048576  # Leading bytes used for schema inference
+    CSV_ENGINE: str = "pandas"  # pandas, parallel or pyarrow
+    CSV_PARSE_THREADS: int = 0  # 0 uses all cores
+    ALLOWED_EXTENSIONS: list = [
+        ".csv", ".csv.gz", ".csv.zst", ".xlsx", ".xls",
+        ".parquet", ".pq", ".arrow", ".ipc", ".feather"
+    ]
+    
+    # Dataset Registry
+    DEFAULT_DATASET_ID: str = "default"
+    DATASET_MEMORY_BUDGET: int = 2147483648  # 2GB of resident datasets
+    DATASET_SPILL_DIR: str = "spill"  # Relative to UPLOAD_DIR
+    DATASET_MAX_VERSIONS: int = 8  # Raw plus cleaned versions kept per dataset
+    DATASET_SHARED_DIR: str = ""  # Local directory shared by the workers of a node; empty keeps datasets per worker
+    DATASET_PERSIST: bool = False  # Record datasets in DATABASE_URL and reopen them after a restart
+    DATASET_CATALOG_DIR: str = "catalog"  # Relative to UPLOAD_DIR; data files of persisted datasets unless DATASET_SHARED_DIR is set
+    
+    # Ingest Dtypes
+    INGEST_OPTIMIZE_DTYPES: bool = True  # Downcast numbers and encode low-cardinality text as categoricals
+    INGEST_CATEGORY_MAX_RATIO: float = 0.5  # Text columns with at most this share of distinct values become categoricals
+    INGEST_BLANKS_AS_MISSING: bool = True  # Numbers stored with '' placeholders become numeric with missing values
+    
+    # Sample Data
+    SAMPLE_CHUNK_ROWS: int = 100000  # Rows per independently seeded chunk
+    SAMPLE_MAX_ROWS: int = 50000000
+    SAMPLE_THREADS: int = 0  # 0 uses all cores
     
     # ML Settings
     ML_MODEL_DIR: str = "models"
     RANDOM_SEED: int = 42
     
+    # Sketches (approximate analytics)
+    SKETCH_AT_INGEST: bool = True  # Build sketches while streaming CSV uploads
+    SKETCH_QUANTILE_K: int = 200  # KLL accuracy, ~1.3% rank error
+    SKETCH_HLL_PRECISION: int = 14  # 2^14 registers, ~0.8% relative error
+    SKETCH_TOPK_CAPACITY: int = 1024  # Values tracked per top-k summary
+    SKETCH_CHUNK_ROWS: int = 1000000
+    
+    # Profiles
+    PROFILE_COUNTS_MAX_DISTINCT: int = 10000  # Columns up to this cardinality keep exact value counts
+    
+    # Duplicate Detection
+    ROW_HASH_AT_INGEST: bool = True  # Hash every row when a dataset is loaded
+    NEAR_DUPLICATE_PERMUTATIONS: int = 64  # MinHash signature length
+    NEAR_DUPLICATE_MAX_ROWS: int = 200000  # Rows scanned per near-duplicate search
+    NEAR_DUPLICATE_BUCKET_WINDOW: int = 50  # Neighbours compared within an LSH bucket
+    
+    # Compute Executor
+    COMPUTE_THREADS: int = 0  # 0 uses the cores plus four, at most 32
+    COMPUTE_PROCESSES: int = 2  # 0 runs every endpoint on threads
+    COMPUTE_PROCESS_ENDPOINTS: list = ["forecast"]  # Pure-Python-heavy work sent to processes
+    COMPUTE_DEFAULT_LIMIT: int = 4  # Concurrent calls per endpoint
+    COMPUTE_ENDPOINT_LIMITS: dict = {
+        "segment": 2, "forecast": 2, "clean": 1, "near_duplicates": 1,
+        "load": 2, "export": 2, "live": 4  # live: queries on the source database pools
+    }
+    COMPUTE_ENDPOINT_QUEUE: int = 16  # Calls waiting per endpoint before 429
+    COMPUTE_MAX_QUEUE: int = 64  # Calls admitted across endpoints before 503
+    COMPUTE_TIMEOUT: float = 120.0  # Seconds before a call answers 504
+    # Work that stores a dataset would finish after its 504; 0 waits as long as it takes
+    COMPUTE_ENDPOINT_TIMEOUTS: dict = {"load": 0, "append": 0, "generate": 0}
+    COMPUTE_RETRY_AFTER: int = 2  # Retry-After seconds sent with 429 and 503
+
+    # Background Jobs
+    JOBS_WORKERS: int = 2  # Jobs running at once
+    JOBS_MAX_QUEUED: int = 32  # Jobs waiting to run before submissions get 429
+    JOBS_RESULT_TTL: int = 3600  # Seconds a finished job stays available for polling
+    JOBS_RETAINED: int = 100  # Finished jobs kept at most
+    
     # Analytics
+    RESULT_CACHE_MAX_ENTRIES: int = 512
+    RESULT_CACHE_MAX_BYTES: int = 268435456  # 256MB of cached results
     MAX_ROWS_PREVIEW: int = 100
+    STREAM_BATCH_ROWS: int = 10000  # Rows encoded per streamed chunk
     DEFAULT_CHART_BINS: int = 10
     
     class Config:
@@ -2,12 +2,15 @@
 FastAPI Main Application
 Entry point for the Data Analytics Platform API
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
 
-from routes import data, cleaning, analytics, ml
+from routes import data, cleaning, analytics, ml, jobs, system
+from services.dataset_store import dataset_registry
+from services.executor import ComputeUnavailable, compute_executor
 
 # Create FastAPI app
 app = FastAPI(
@@ -25,6 +28,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def add_etag(request: Request, call_next):
+    """Attach the ETag computed by dataset_etag to successful reads"""
+    response = await call_next(request)
+    etag = getattr(request.state, "etag", None)
+    if etag and response.status_code == 200:
+        response.headers["ETag"] = etag
+        # Let clients keep the payload but revalidate before reuse
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.exception_handler(ComputeUnavailable)
+async def compute_unavailable(request: Request, exc: ComputeUnavailable):
+    """Answer refused or timed-out compute with its status and a retry hint"""
+    headers = {"Retry-After": str(exc.retry_after)} if exc.retry_after else None
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers=headers)
+
+@app.on_event("startup")
+async def restore_datasets():
+    """Reopen the datasets a persistent catalog kept across the restart"""
+    dataset_registry.restore()
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    compute_executor.shutdown()
+
 # Create uploads directory
 os.makedirs("uploads", exist_ok=True)
 
@@ -36,6 +65,8 @@ app.include_router(data.router, prefix="/api/data", tags=["Data Management"])
 app.include_router(cleaning.router, prefix="/api/cleaning", tags=["Data Cleaning"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 app.include_router(ml.router, prefix="/api/ml", tags=["Machine Learning"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Background Jobs"])
+app.include_router(system.router, prefix="/api/system", tags=["System"])
 
 @app.get("/")
 async def root():
@@ -47,6 +78,8 @@ async def root():
             "cleaning": "/api/cleaning",
             "analytics": "/api/analytics",
             "ml": "/api/ml",
+            "jobs": "/api/jobs",
+            "system": "/api/system",
             "docs": "/docs"
         }
     }
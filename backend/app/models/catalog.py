@@ -0,0 +1,21 @@
+"""
+Dataset Catalog Models
+Database records of the datasets kept across restarts
+"""
+from sqlalchemy import Column, String, Integer, Float, Text
+
+from database import Base
+
+class DatasetRecord(Base):
+    """A persisted dataset: its version manifest and a summary for listing"""
+    __tablename__ = "datasets"
+
+    key = Column(String(255), primary_key=True)
+    dataset_id = Column(String(64), nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    current_version = Column(String(64), nullable=False)
+    rows = Column(Integer, nullable=False)
+    columns = Column(Integer, nullable=False)
+    manifest = Column(Text, nullable=False)  # JSON manifest naming the version files
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
@@ -5,6 +5,8 @@ from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from enum import Enum
 
+VERSION_NAME_PATTERN = r"^[A-Za-z0-9_\-\.]{1,64}$"
+
 # Enums
 class DatabaseType(str, Enum):
     MYSQL = "mysql"
@@ -20,6 +22,12 @@ class CleaningStrategy(str, Enum):
     ML = "ml"
     REMOVE = "remove"
 
+class CleaningOp(str, Enum):
+    IMPUTE = "impute"
+    DEDUPE = "dedupe"
+    STANDARDIZE = "standardize"
+    CAST = "cast"
+
 class SampleDataType(str, Enum):
     SALES = "sales"
     CUSTOMERS = "customers"
@@ -31,10 +39,32 @@ class DatabaseConnectionRequest(BaseModel):
     connection_string: str
     table_name: str
 
+class DatabaseImportRequest(DatabaseConnectionRequest):
+    columns: Optional[List[str]] = None
+    where: Optional[str] = None
+    watermark_column: Optional[str] = None
+    watermark_value: Optional[Any] = None
+    chunk_size: int = Field(default=50000, ge=100, le=1000000)
+    append: bool = False
+
 class CleaningConfigRequest(BaseModel):
     strategy: CleaningStrategy = CleaningStrategy.MEAN
     remove_duplicates: bool = True
+    duplicate_subset: Optional[List[str]] = None
     standardize_data: bool = True
+    version_name: Optional[str] = Field(default=None, pattern=VERSION_NAME_PATTERN)
+
+class CleaningStep(BaseModel):
+    op: CleaningOp
+    columns: Optional[List[str]] = None
+    strategy: Optional[CleaningStrategy] = None  # impute
+    dtype: Optional[str] = None  # cast: int, float, string, category or datetime
+
+class CleaningPlanRequest(BaseModel):
+    steps: List[CleaningStep] = Field(..., min_length=1)
+    sample_rows: int = Field(default=1000, ge=1, le=100000)
+    source: str = Field(default="raw", pattern=VERSION_NAME_PATTERN)  # Version the plan cleans
+    version_name: Optional[str] = Field(default=None, pattern=VERSION_NAME_PATTERN)
 
 class ForecastRequest(BaseModel):
     periods: int = Field(default=6, ge=1, le=12)
@@ -49,6 +79,8 @@ class DataUploadResponse(BaseModel):
     rows: int
     columns: int
     headers: List[str]
+    dataset_id: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
 
 class QualityMetrics(BaseModel):
     completeness: float
@@ -74,6 +106,11 @@ class StatisticalSummary(BaseModel):
     min: float
     max: float
     count: int
+    group: Optional[Any] = None
+    null_count: Optional[int] = None
+    skew: Optional[float] = None
+    kurtosis: Optional[float] = None
+    percentiles: Optional[Dict[str, float]] = None
 
 class Insight(BaseModel):
     icon: str
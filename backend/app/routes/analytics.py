@@ -2,107 +2,200 @@
 Analytics Routes
 Statistical analysis and data visualization
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import List, Optional
 from models.schemas import StatisticalSummary, Insight
-from services.analytics import AnalyticsService
+from services.analytics import AnalyticsService, PERCENTILES
 from services.insights import InsightsService
-from services.data_loader import DataLoaderService
-from routes.data import data_store
+from services.live_query import LiveQueryService
+from services.dataset_store import DatasetStore
+from services.result_cache import result_cache
+from services.executor import ComputeUnavailable, compute_executor
+from routes.data import get_dataset, dataset_etag
 
 router = APIRouter()
 
-@router.get("/summary", response_model=List[StatisticalSummary])
-async def get_statistical_summary():
+@router.get(
+    "/summary",
+    response_model=List[StatisticalSummary],
+    response_model_exclude_none=True,
+    dependencies=[Depends(dataset_etag)]
+)
+async def get_statistical_summary(
+    extended: bool = Query(False, description="Add null counts, skew, kurtosis and percentiles"),
+    group_by: Optional[str] = Query(None, description="Summarize per value of this column"),
+    store: DatasetStore = Depends(get_dataset)
+):
     """Get statistical summary for all numeric columns"""
     
-    data = data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
+    if store.live is not None:
+        if extended or group_by:
+            raise HTTPException(status_code=400, detail="Extended and grouped summaries need an imported dataset")
+        # Computed at the source database
+        summary = await compute_executor.run("live", LiveQueryService.get_statistical_summary, store.live)
+        return [StatisticalSummary(**s) for s in summary]
     
-    if not data:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data available")
     
-    df = DataLoaderService.dict_to_dataframe(data)
-    summary = AnalyticsService.get_statistical_summary(df)
+    try:
+        summary = await result_cache.get_or_compute(
+            store, "summary", {"extended": extended, "group_by": group_by},
+            lambda df: AnalyticsService.get_statistical_summary(df, extended, group_by)
+        )
+    except ComputeUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return [StatisticalSummary(**s) for s in summary]
 
-@router.get("/distribution")
-async def get_distribution(column: str = Query(...), bins: int = 10):
+@router.get("/distribution", dependencies=[Depends(dataset_etag)])
+async def get_distribution(column: str = Query(...), bins: int = 10, store: DatasetStore = Depends(get_dataset)):
     """Get data distribution for a column"""
     
-    data = data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
-    
-    if not data:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data available")
     
-    df = DataLoaderService.dict_to_dataframe(data)
-    
     try:
-        distribution = AnalyticsService.get_distribution(df, column, bins)
+        distribution = await result_cache.get_or_compute(
+            store, "distribution", {"column": column, "bins": bins},
+            lambda df: AnalyticsService.get_distribution(df, column, bins)
+        )
         return distribution
+    except ComputeUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/correlation")
-async def get_correlation():
+@router.get("/correlation", dependencies=[Depends(dataset_etag)])
+async def get_correlation(store: DatasetStore = Depends(get_dataset)):
     """Get correlation matrix"""
     
-    data = data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
-    
-    if not data:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data available")
-    
-    df = DataLoaderService.dict_to_dataframe(data)
-    correlation = AnalyticsService.get_correlation_matrix(df)
+    correlation = await result_cache.get_or_compute(
+        store, "correlation", None,
+        AnalyticsService.get_correlation_matrix
+    )
     
     return correlation
 
-@router.get("/trend")
-async def get_trend(date_col: str = Query(...), value_col: str = Query(...)):
+@router.get("/trend", dependencies=[Depends(dataset_etag)])
+async def get_trend(date_col: str = Query(...), value_col: str = Query(...), store: DatasetStore = Depends(get_dataset)):
     """Get time series trend"""
     
-    data = data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
-    
-    if not data:
+    if store.live is not None:
+        try:
+            return await compute_executor.run(
+                "live", LiveQueryService.get_time_series_trend, store.live, date_col, value_col
+            )
+        except ComputeUnavailable:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data available")
     
-    df = DataLoaderService.dict_to_dataframe(data)
-    
     try:
-        trend = AnalyticsService.get_time_series_trend(df, date_col, value_col)
+        trend = await result_cache.get_or_compute(
+            store, "trend", {"date_col": date_col, "value_col": value_col},
+            lambda df: AnalyticsService.get_time_series_trend(df, date_col, value_col)
+        )
         return trend
+    except ComputeUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/categorical")
-async def get_categorical_distribution(column: str = Query(...)):
+@router.get("/categorical", dependencies=[Depends(dataset_etag)])
+async def get_categorical_distribution(
+    column: str = Query(...),
+    approx: bool = Query(False, description="Answer from the top-k sketch"),
+    store: DatasetStore = Depends(get_dataset)
+):
     """Get categorical distribution"""
     
-    data = data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
+    if store.live is not None:
+        try:
+            return await compute_executor.run("live", LiveQueryService.get_categorical_distribution, store.live, column)
+        except ComputeUnavailable:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
-    if not data:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data available")
     
-    df = DataLoaderService.dict_to_dataframe(data)
-    
     try:
-        distribution = AnalyticsService.get_categorical_distribution(df, column)
+        distribution = await result_cache.get_or_compute(
+            store, "categorical", {"column": column, "approx": approx},
+            lambda df: store.sketches().top(column) if approx
+            else AnalyticsService.get_categorical_distribution(df, column)
+        )
         return distribution
+    except ComputeUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/percentiles", dependencies=[Depends(dataset_etag)])
+async def get_percentiles(
+    column: str = Query(...),
+    approx: bool = Query(False, description="Answer from the quantile sketch"),
+    store: DatasetStore = Depends(get_dataset)
+):
+    """Get percentiles of a numeric column"""
+    
+    if not store.has_data:
+        raise HTTPException(status_code=404, detail="No data available")
+    
+    try:
+        return await result_cache.get_or_compute(
+            store, "percentiles", {"column": column, "approx": approx},
+            lambda df: store.sketches().percentiles(column, PERCENTILES) if approx
+            else AnalyticsService.get_percentiles(df, column)
+        )
+    except ComputeUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/cardinality", dependencies=[Depends(dataset_etag)])
+async def get_cardinality(
+    column: str = Query(...),
+    approx: bool = Query(False, description="Answer from the HyperLogLog sketch"),
+    store: DatasetStore = Depends(get_dataset)
+):
+    """Get the number of distinct values in a column"""
+    
+    if not store.has_data:
+        raise HTTPException(status_code=404, detail="No data available")
+    
+    try:
+        return await result_cache.get_or_compute(
+            store, "cardinality", {"column": column, "approx": approx},
+            lambda df: store.sketches().cardinality(column) if approx
+            else AnalyticsService.get_cardinality(df, column)
+        )
+    except ComputeUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/insights", response_model=List[Insight])
-async def generate_insights():
+@router.get("/insights", response_model=List[Insight], dependencies=[Depends(dataset_etag)])
+async def generate_insights(store: DatasetStore = Depends(get_dataset)):
     """Generate AI-powered insights"""
     
-    if not data_store["raw_data"]:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data loaded")
     
-    raw_df = DataLoaderService.dict_to_dataframe(data_store["raw_data"])
-    cleaned_df = DataLoaderService.dict_to_dataframe(
-        data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
+    insights = await result_cache.get_or_compute(
+        store, "insights", None,
+        lambda df: InsightsService.generate_insights(
+            store.raw(), df, store.profile("raw"), store.profile()
+        )
     )
     
-    insights = InsightsService.generate_insights(raw_df, cleaned_df)
-    
     return [Insight(**insight) for insight in insights]
\ No newline at end of file
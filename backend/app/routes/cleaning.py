@@ -2,44 +2,61 @@
 Data Cleaning Routes
 Quality assessment and data cleaning operations
 """
-from fastapi import APIRouter, HTTPException
-from models.schemas import CleaningConfigRequest, QualityMetrics, CleaningResults
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+
+from config import settings
+from models.schemas import CleaningConfigRequest, CleaningPlanRequest, QualityMetrics, CleaningResults
 from services.data_cleaner import DataCleanerService
-from services.data_loader import DataLoaderService
-from routes.data import data_store
+from services.dataset_store import DatasetStore
+from services.duplicates import DuplicateService, RowHashIndex
+from services.result_cache import result_cache
+from services.executor import ComputeUnavailable, compute_executor
+from services.cleaning_plan import CleaningPlan, run_plan
+from services.jobs import job_manager
+from services.streaming import StreamingService
+from routes.data import get_dataset, dataset_etag, parse_columns
+from routes.jobs import submit_clean
 
 router = APIRouter()
 
-@router.get("/quality", response_model=QualityMetrics)
-async def assess_quality():
+@router.get("/quality", response_model=QualityMetrics, dependencies=[Depends(dataset_etag)])
+async def assess_quality(store: DatasetStore = Depends(get_dataset)):
     """Assess data quality"""
     
-    if not data_store["raw_data"]:
+    df = store.raw()
+    
+    if df is None:
         raise HTTPException(status_code=404, detail="No data loaded")
     
-    df = DataLoaderService.dict_to_dataframe(data_store["raw_data"])
-    quality = DataCleanerService.assess_quality(df)
+    quality = await compute_executor.run(
+        "quality", lambda: DataCleanerService.assess_quality(df, store.profile("raw"))
+    )
     
     return QualityMetrics(**quality)
 
 @router.post("/clean", response_model=CleaningResults)
-async def clean_data(config: CleaningConfigRequest):
+async def clean_data(config: CleaningConfigRequest, store: DatasetStore = Depends(get_dataset)):
     """Clean data based on configuration"""
     
-    if not data_store["raw_data"]:
+    # Read before the frame: a change in between can only make the result stale
+    base_version = store.version
+    df = store.raw()
+    
+    if df is None:
         raise HTTPException(status_code=404, detail="No data loaded")
     
     try:
-        df = DataLoaderService.dict_to_dataframe(data_store["raw_data"])
-        
-        cleaned_df, stats = DataCleanerService.clean_data(
-            df,
+        plan = CleaningPlan.from_config(
             strategy=config.strategy.value,
             remove_duplicates=config.remove_duplicates,
-            standardize=config.standardize_data
+            standardize=config.standardize_data,
+            duplicate_subset=config.duplicate_subset
         )
+        cleaned_df, stats = await compute_executor.run("clean", run_plan, store, df, plan)
         
-        data_store["cleaned_data"] = DataLoaderService.dataframe_to_dict(cleaned_df)
+        if store.set_cleaned(cleaned_df, plan, base_version=base_version, name=config.version_name) is None:
+            raise HTTPException(status_code=409, detail="Dataset changed while cleaning; retry the request")
         
         return CleaningResults(
             success=True,
@@ -51,19 +68,167 @@ async def clean_data(config: CleaningConfigRequest):
             final_columns=len(cleaned_df.columns)
         )
     
+    except (HTTPException, ComputeUnavailable):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def build_plan(request: CleaningPlanRequest) -> CleaningPlan:
+    """Validate the steps of a plan request"""
+    try:
+        return CleaningPlan([step.model_dump(mode="json") for step in request.steps])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/plan/preview")
+async def preview_plan(request: CleaningPlanRequest, store: DatasetStore = Depends(get_dataset)):
+    """Fit a cleaning plan on the full data and run it on a sample"""
+    
+    plan = build_plan(request)
+    
+    try:
+        df = store.frame(request.source)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    if df is None:
+        raise HTTPException(status_code=404, detail="No data loaded")
+    
+    def run():
+        plan.fit(df, store.profile(request.source))
+        return plan.preview(df, request.sample_rows, store.row_hashes(request.source))
+    
+    try:
+        sample, info = await compute_executor.run("plan_preview", run)
+    except (HTTPException, ComputeUnavailable):
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingService.stream(sample.head(settings.MAX_ROWS_PREVIEW), "json", info)
+
+@router.post("/plan/apply", status_code=202)
+async def apply_plan(request: CleaningPlanRequest, store: DatasetStore = Depends(get_dataset)):
+    """Apply a cleaning plan to the full data as a background job"""
+    
+    plan = build_plan(request)
+    
+    if not store.has_data:
+        raise HTTPException(status_code=404, detail="No data loaded")
+    
+    params = {"steps": plan.steps, "source": request.source, "version_name": request.version_name}
+    return submit_clean(store, plan, request.source, request.version_name, params)
+
+@router.get("/plan/operations/{operation_id}")
+async def get_plan_operation(operation_id: str):
+    """Status and result of a background plan application (same as /api/jobs/{id})"""
+    
+    operation = job_manager.get(operation_id)
+    
+    if operation is None:
+        raise HTTPException(status_code=404, detail="Operation not found")
+    
+    return operation
 
-@router.get("/outliers")
-async def detect_outliers(threshold: float = 3.0):
+@router.get("/plan", dependencies=[Depends(dataset_etag)])
+async def get_current_plan(store: DatasetStore = Depends(get_dataset)):
+    """The fitted plan that produced the current cleaned version"""
+    
+    if store.cleaning_plan is None:
+        raise HTTPException(status_code=404, detail="No cleaned data available. Run cleaning first.")
+    
+    return {"steps": store.cleaning_plan.describe()}
+
+@router.get("/outliers", dependencies=[Depends(dataset_etag)])
+async def detect_outliers(threshold: float = 3.0, store: DatasetStore = Depends(get_dataset)):
     """Detect outliers in data"""
     
-    data = data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
+    df = store.active()
+    
+    if df is None:
+        raise HTTPException(status_code=404, detail="No data available")
+    outliers = await compute_executor.run("outliers", DataCleanerService.detect_outliers, df, threshold)
+    
+    return outliers
+
+def duplicate_index(store: DatasetStore, df, columns: Optional[str]) -> RowHashIndex:
+    """Row hashes of the active data over all columns or a subset"""
+    subset = parse_columns(columns)
+    if not subset:
+        return store.row_hashes()
+    return RowHashIndex.build(df, subset)
+
+@router.get("/duplicates", dependencies=[Depends(dataset_etag)])
+async def find_duplicates(
+    columns: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=1000),
+    store: DatasetStore = Depends(get_dataset)
+):
+    """Count exact duplicate rows and list the largest groups of equal rows"""
     
-    if not data:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data available")
     
-    df = DataLoaderService.dict_to_dataframe(data)
-    outliers = DataCleanerService.detect_outliers(df, threshold)
+    try:
+        return await result_cache.get_or_compute(
+            store, "duplicates", {"columns": columns, "limit": limit},
+            lambda df: DuplicateService.summary(duplicate_index(store, df, columns), limit)
+        )
+    except ComputeUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/duplicates/{row}", dependencies=[Depends(dataset_etag)])
+async def find_duplicates_of_row(
+    row: int,
+    columns: Optional[str] = None,
+    store: DatasetStore = Depends(get_dataset)
+):
+    """List the rows equal to the row at a position"""
     
-    return outliers
\ No newline at end of file
+    if not store.has_data:
+        raise HTTPException(status_code=404, detail="No data available")
+    
+    try:
+        index = await compute_executor.run("duplicates", duplicate_index, store, store.active(), columns)
+        rows = index.duplicates_of(row)
+    except ComputeUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "row": row,
+        "duplicates": [int(other) for other in rows if other != row]
+    }
+
+@router.get("/near-duplicates", dependencies=[Depends(dataset_etag)])
+async def find_near_duplicates(
+    columns: Optional[str] = None,
+    threshold: float = Query(0.8, gt=0, le=1),
+    shingle_size: int = Query(3, ge=1, le=8),
+    limit: int = Query(20, ge=1, le=1000),
+    store: DatasetStore = Depends(get_dataset)
+):
+    """Find groups of similar rows with MinHash locality-sensitive hashing"""
+    
+    if not store.has_data:
+        raise HTTPException(status_code=404, detail="No data available")
+    
+    params = {"columns": columns, "threshold": threshold, "shingle_size": shingle_size, "limit": limit}
+    try:
+        return await result_cache.get_or_compute(
+            store, "near_duplicates", params,
+            lambda df: DuplicateService.near_duplicates(
+                df,
+                columns=parse_columns(columns),
+                threshold=threshold,
+                shingle_size=shingle_size,
+                limit=limit
+            )
+        )
+    except ComputeUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
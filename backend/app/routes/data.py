@@ -2,69 +2,330 @@
 Data Management Routes
 Upload files, connect to databases, generate sample data
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Header, Depends, Request, Path
+from fastapi.responses import Response
+from pandas.api.types import is_numeric_dtype, CategoricalDtype
+from typing import Dict, Any, Optional, List, AsyncIterator
 import os
-import shutil
+import time
+import json
+import hashlib
 
-from models.schemas import DatabaseConnectionRequest, DataUploadResponse, SampleDataType
-from services.data_loader import DataLoaderService
+from config import settings
+from models.schemas import DatabaseConnectionRequest, DatabaseImportRequest, DataUploadResponse, SampleDataType, VERSION_NAME_PATTERN
+from services.data_loader import DataLoaderService, EXPORT_FORMATS
+from services.csv_ingest import StreamingCSVParser, DecodedSizeExceeded, detect_compression
+from services.streaming import StreamingService
+from utils.helpers import encode_cursor, decode_cursor
+from services.dataset_store import DatasetStore, dataset_registry
+from services.connection_pool import engine_registry
+from services.live_query import LiveSource, LiveQueryService
+from services.sample_data import SampleDataService
+from services.sketches import ColumnSketches
+from services.duplicates import RowHashIndex
+from services.dtypes import DtypeOptimizer
+from services.incremental import IncrementalService, DatasetChanged
+from services.executor import ComputeUnavailable, compute_executor
 
 router = APIRouter()
 
-# In-memory data store (use Redis/DB in production)
-data_store = {
-    "raw_data": [],
-    "cleaned_data": []
-}
+DATASET_ID_PATTERN = r"^[A-Za-z0-9_\-]{1,64}$"
+
+def get_dataset(
+    dataset_id: str = Query(settings.DEFAULT_DATASET_ID, pattern=DATASET_ID_PATTERN),
+    x_session_id: Optional[str] = Header(None)
+) -> DatasetStore:
+    """Resolve the dataset a request reads from"""
+    store = dataset_registry.get(dataset_id, x_session_id)
+    # An unregistered empty store makes routes report "no data" as before
+    return store if store is not None else DatasetStore(dataset_id)
+
+def dataset_etag(request: Request, store: DatasetStore = Depends(get_dataset)) -> Optional[str]:
+    """
+    Strong ETag for a read of the current dataset version.
+    Raises 304 before the handler runs when the client already holds it.
+    """
+    load_id, version = store.tag()
+    if store.live is not None or version == 0:
+        return None
+    
+    params = sorted(request.query_params.multi_items())
+    # The load id tells apart data re-uploaded after a delete or restart,
+    # whose version numbers start over
+    digest = hashlib.sha1(
+        json.dumps([store.key, load_id, version, request.url.path, params]).encode()
+    ).hexdigest()
+    etag = f'"{digest}"'
+    # Picked up by the ETag middleware for the outgoing response
+    request.state.etag = etag
+    
+    candidates = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    if etag in candidates or "*" in candidates:
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    return etag
+
+def store_dataset(
+    df,
+    dataset_id: str,
+    session_id: Optional[str],
+    sketches: Optional[ColumnSketches] = None,
+    row_hashes: Optional[RowHashIndex] = None
+) -> DatasetStore:
+    """Load a DataFrame as the raw data of a dataset, with compact dtypes"""
+    if settings.INGEST_OPTIMIZE_DTYPES:
+        optimized, changed = DtypeOptimizer.optimize(df)
+        if sketches is not None:
+            # Downcasts and categorical encoding keep every value and sketches hash
+            # values canonically, so only text re-read as numbers is sketched again
+            reread = [
+                col for col in changed
+                if not is_numeric_dtype(df[col]) and not isinstance(optimized[col].dtype, CategoricalDtype)
+            ]
+            if reread:
+                sketches.columns.update(ColumnSketches.build(optimized[reread]).columns)
+        df = optimized
+    if sketches is not None:
+        sketches.retain(df)
+    if row_hashes is None and settings.ROW_HASH_AT_INGEST:
+        row_hashes = RowHashIndex.build(df)
+    store = dataset_registry.get_or_create(dataset_id, session_id)
+    store.load(df, sketches, row_hashes)
+    return store
+
+def parse_columns(columns: Optional[str]) -> Optional[List[str]]:
+    """Split a comma-separated column projection"""
+    if not columns:
+        return None
+    return [col.strip() for col in columns.split(',') if col.strip()]
+
+def project(df, columns: Optional[List[str]]):
+    missing = [col for col in columns or [] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Columns not found: {', '.join(missing)}")
+    return df[columns] if columns else df
+
+async def ingest_csv(chunks: AsyncIterator[bytes], compression: Optional[str]):
+    """Parse an incoming CSV body chunk by chunk"""
+    parser = StreamingCSVParser(compression)
+    
+    # The body is read on the event loop; decompressing and parsing it run
+    # on the worker pool, one call at a time so the parser sees chunks in order
+    async for chunk in chunks:
+        if parser.bytes_received + len(chunk) > settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds the {settings.MAX_UPLOAD_SIZE} byte limit"
+            )
+        try:
+            await compute_executor.run("load", parser.feed, chunk)
+        except DecodedSizeExceeded as e:
+            raise HTTPException(status_code=413, detail=str(e))
+    
+    try:
+        df = await compute_executor.run("load", parser.close)
+    except DecodedSizeExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return df, parser.timings, parser.sketches
+
+async def read_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    """Read an uploaded file in chunks"""
+    while True:
+        chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+def upload_response(df, dataset_id: str, timings: Dict[str, float]) -> DataUploadResponse:
+    return DataUploadResponse(
+        success=True,
+        message=f"Successfully loaded {len(df)} rows",
+        rows=len(df),
+        columns=len(df.columns),
+        headers=df.columns.tolist(),
+        dataset_id=dataset_id,
+        timings={stage: round(seconds, 4) for stage, seconds in timings.items()}
+    )
 
 @router.post("/upload", response_model=DataUploadResponse)
-async def upload_file(file: UploadFile = File(...)):
-    """Upload CSV file"""
+async def upload_file(
+    file: UploadFile = File(...),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to load"),
+    dataset_id: str = Query(settings.DEFAULT_DATASET_ID, pattern=DATASET_ID_PATTERN),
+    x_session_id: Optional[str] = Header(None)
+):
+    """Upload CSV (optionally gzip or zstd compressed), Parquet, Arrow IPC, Feather or Excel file"""
     
     # Validate file extension
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Only CSV files are supported")
+    fmt = DataLoaderService.file_format(file.filename)
+    if not fmt or not file.filename.lower().endswith(tuple(settings.ALLOWED_EXTENSIONS)):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+        )
     
-    # Save file
-    file_path = f"uploads/{file.filename}"
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {settings.MAX_UPLOAD_SIZE} byte limit")
     
     try:
-        # Load data
-        df = DataLoaderService.load_csv(file_path)
-        data_store["raw_data"] = DataLoaderService.dataframe_to_dict(df)
-        data_store["cleaned_data"] = []
+        if fmt == "csv":
+            # Parse the upload as it is read, without a copy on disk
+            df, timings, sketches = await ingest_csv(read_upload(file), detect_compression(file.filename))
+            df = project(df, parse_columns(columns))
+        else:
+            # Columnar formats need random access; read the spooled upload directly
+            start = time.perf_counter()
+            df = await compute_executor.run("load", DataLoaderService.load_file, file.file, fmt, parse_columns(columns))
+            timings = {"parse": time.perf_counter() - start}
+            sketches = None
         
-        return DataUploadResponse(
-            success=True,
-            message=f"Successfully loaded {len(df)} rows",
-            rows=len(df),
-            columns=len(df.columns),
-            headers=df.columns.tolist()
+        await compute_executor.run("load", store_dataset, df, dataset_id, x_session_id, sketches)
+        
+        return upload_response(df, dataset_id, timings)
+    
+    except (HTTPException, ComputeUnavailable):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/upload/stream", response_model=DataUploadResponse)
+async def upload_stream(
+    request: Request,
+    filename: str = Query("upload.csv"),
+    dataset_id: str = Query(settings.DEFAULT_DATASET_ID, pattern=DATASET_ID_PATTERN),
+    x_session_id: Optional[str] = Header(None),
+    content_encoding: Optional[str] = Header(None)
+):
+    """Upload a raw CSV request body, parsed incrementally as it arrives"""
+    
+    if DataLoaderService.file_format(filename) != "csv":
+        raise HTTPException(status_code=400, detail="Only CSV files are supported")
+    
+    try:
+        df, timings, sketches = await ingest_csv(request.stream(), detect_compression(filename, content_encoding))
+        await compute_executor.run("load", store_dataset, df, dataset_id, x_session_id, sketches)
+        
+        return upload_response(df, dataset_id, timings)
+    
+    except (HTTPException, ComputeUnavailable):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/{dataset_id}/append")
+async def append_rows(
+    dataset_id: str = Path(..., pattern=DATASET_ID_PATTERN),
+    file: UploadFile = File(...),
+    x_session_id: Optional[str] = Header(None)
+):
+    """
+    Append rows from a file to a loaded dataset. Cleaned versions are
+    extended by cleaning only the new rows; hashes, sketches and profiles
+    are updated rather than rebuilt.
+    """
+    
+    store = dataset_registry.get(dataset_id, x_session_id)
+    if store is None or not store.has_data:
+        raise HTTPException(status_code=404, detail=f"Dataset '{dataset_id}' has no data")
+    if store.live is not None:
+        raise HTTPException(status_code=400, detail="Live datasets cannot be appended to")
+    
+    fmt = DataLoaderService.file_format(file.filename)
+    if not fmt or not file.filename.lower().endswith(tuple(settings.ALLOWED_EXTENSIONS)):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
         )
     
+    try:
+        start = time.perf_counter()
+        if fmt == "csv":
+            df, timings, _ = await ingest_csv(read_upload(file), detect_compression(file.filename))
+        else:
+            df = await compute_executor.run("load", DataLoaderService.load_file, file.file, fmt)
+            timings = {"parse": time.perf_counter() - start}
+        
+        start = time.perf_counter()
+        result = await compute_executor.run("append", IncrementalService.append, store, df)
+        timings["append"] = time.perf_counter() - start
+        
+        return {
+            "success": True,
+            "dataset_id": dataset_id,
+            **result,
+            "timings": {stage: round(seconds, 4) for stage, seconds in timings.items()}
+        }
+    
+    except (HTTPException, ComputeUnavailable):
+        raise
+    except DatasetChanged as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/files")
+async def list_upload_files():
+    """List data files dropped into the upload directory"""
+    
+    if not os.path.isdir(settings.UPLOAD_DIR):
+        return {"files": []}
+    
+    files = []
+    for name in sorted(os.listdir(settings.UPLOAD_DIR)):
+        path = os.path.join(settings.UPLOAD_DIR, name)
+        fmt = DataLoaderService.file_format(name)
+        if fmt and os.path.isfile(path):
+            files.append({"name": name, "format": fmt, "size": os.path.getsize(path)})
+    
+    return {"files": files}
+
+@router.post("/open", response_model=DataUploadResponse)
+async def open_upload_file(
+    filename: str = Query(...),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to load"),
+    dataset_id: str = Query(settings.DEFAULT_DATASET_ID, pattern=DATASET_ID_PATTERN),
+    x_session_id: Optional[str] = Header(None)
+):
+    """Load a file from the upload directory, memory-mapping Parquet and Arrow files"""
+    
+    path = os.path.join(settings.UPLOAD_DIR, filename)
+    fmt = DataLoaderService.file_format(filename)
+    
+    if os.path.basename(filename) != filename or not fmt:
+        raise HTTPException(status_code=400, detail="Invalid file name")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"File '{filename}' not found")
+    
+    try:
+        start = time.perf_counter()
+        df = await compute_executor.run("load", DataLoaderService.load_file, path, fmt, parse_columns(columns))
+        await compute_executor.run("load", store_dataset, df, dataset_id, x_session_id)
+        
+        return upload_response(df, dataset_id, {"load": time.perf_counter() - start})
+    
+    except ComputeUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        # Clean up
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
 @router.post("/connect")
-async def connect_database(request: DatabaseConnectionRequest):
+async def connect_database(
+    request: DatabaseConnectionRequest,
+    dataset_id: str = Query(settings.DEFAULT_DATASET_ID, pattern=DATASET_ID_PATTERN),
+    x_session_id: Optional[str] = Header(None)
+):
     """Connect to database and fetch data"""
     
-    try:
+    def load():
         df = DataLoaderService.connect_database(
             request.db_type,
             request.connection_string,
             request.table_name
         )
-        
-        data_store["raw_data"] = DataLoaderService.dataframe_to_dict(df)
-        data_store["cleaned_data"] = []
+        store_dataset(df, dataset_id, x_session_id)
+        return df
+    
+    try:
+        df = await compute_executor.run("load", load)
         
         return {
             "success": True,
@@ -72,65 +333,400 @@ async def connect_database(request: DatabaseConnectionRequest):
             "rows": len(df),
             "columns": len(df.columns),
             "headers": df.columns.tolist(),
+            "dataset_id": dataset_id,
             "tables": ["sales", "customers", "products"]  # Simulated
         }
     
+    except ComputeUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/import")
+async def import_database(
+    request: DatabaseImportRequest,
+    dataset_id: str = Query(settings.DEFAULT_DATASET_ID, pattern=DATASET_ID_PATTERN),
+    x_session_id: Optional[str] = Header(None)
+):
+    """Import a full table in chunks, optionally filtered or above a watermark"""
+    
+    def read():
+        return DataLoaderService.import_database(
+            request.db_type,
+            request.connection_string,
+            request.table_name,
+            columns=request.columns,
+            where=request.where,
+            watermark_column=request.watermark_column,
+            watermark_value=request.watermark_value,
+            chunk_size=request.chunk_size
+        )
+    
+    try:
+        df, stats = await compute_executor.run("load", read)
+        
+        store = dataset_registry.get(dataset_id, x_session_id)
+        new_rows = len(df)
+        if request.append and store is not None and store.has_data and store.live is None:
+            # Incremental import: add the rows above the watermark and extend
+            # the cleaned versions with them
+            appended = await compute_executor.run("append", IncrementalService.append, store, df)
+            rows, headers = appended["rows"], store.raw().columns.tolist()
+        else:
+            appended = None
+            await compute_executor.run("load", store_dataset, df, dataset_id, x_session_id)
+            rows, headers = len(df), df.columns.tolist()
+        
+        return {
+            "success": True,
+            "message": f"Imported {new_rows} rows from {request.table_name}",
+            "rows": rows,
+            "imported_rows": new_rows,
+            "columns": len(headers),
+            "headers": headers,
+            "dataset_id": dataset_id,
+            "versions": appended["versions"] if appended else None,
+            **stats
+        }
+    
+    except DatasetChanged as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ComputeUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/live")
+async def connect_live(
+    request: DatabaseConnectionRequest,
+    dataset_id: str = Query(settings.DEFAULT_DATASET_ID, pattern=DATASET_ID_PATTERN),
+    x_session_id: Optional[str] = Header(None)
+):
+    """Register a database table as a live dataset queried in place"""
+    
+    try:
+        source = LiveSource(request.db_type.value, request.connection_string, request.table_name)
+        rows = await compute_executor.run("live", LiveQueryService.count_rows, source)
+    except ComputeUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(DataLoaderService._database_error(e, request.table_name)))
+    
+    dataset_registry.get_or_create(dataset_id, x_session_id).attach_live(source)
+    
+    return {
+        "success": True,
+        "message": f"Live dataset on {request.table_name} ({rows} rows)",
+        "rows": rows,
+        "columns": len(source.columns),
+        "headers": source.columns,
+        "dataset_id": dataset_id,
+        "live": True
+    }
+
+@router.get("/connections")
+async def list_connections():
+    """List pooled database connections"""
+    
+    return {"connections": engine_registry.list()}
+
+@router.delete("/connections")
+async def close_all_connections():
+    """Close all pooled database connections"""
+    
+    return {"success": True, "closed": engine_registry.close()}
+
+@router.delete("/connections/{connection_id}")
+async def close_connection(connection_id: str):
+    """Close a pooled database connection"""
+    
+    if not engine_registry.close(connection_id):
+        raise HTTPException(status_code=404, detail=f"Connection '{connection_id}' not found")
+    
+    return {"success": True, "closed": 1}
+
 @router.get("/generate/{data_type}")
-async def generate_sample_data(data_type: SampleDataType, size: int = 500):
+async def generate_sample_data(
+    data_type: SampleDataType,
+    size: int = Query(500, ge=1, le=settings.SAMPLE_MAX_ROWS),
+    seed: Optional[int] = Query(None, description="Random seed, defaults to RANDOM_SEED"),
+    save: bool = Query(False, description="Write to a Parquet file in the upload directory and load it from there"),
+    dataset_id: str = Query(settings.DEFAULT_DATASET_ID, pattern=DATASET_ID_PATTERN),
+    x_session_id: Optional[str] = Header(None)
+):
     """Generate sample data for testing"""
     
+    seed = settings.RANDOM_SEED if seed is None else seed
+    filename = f"{data_type.value}-{size}-{seed}.parquet" if save else None
+    
+    def generate():
+        if save:
+            # Chunks are written as they are generated, then memory-mapped back
+            path = os.path.join(settings.UPLOAD_DIR, filename)
+            SampleDataService.write_parquet(data_type.value, size, path, seed)
+            df = DataLoaderService.load_file(path, "parquet")
+        else:
+            df = DataLoaderService.generate_sample_data(data_type.value, size, seed)
+        store_dataset(df, dataset_id, x_session_id)
+        return df
+    
     try:
-        df = DataLoaderService.generate_sample_data(data_type.value, size)
-        data_store["raw_data"] = DataLoaderService.dataframe_to_dict(df)
-        data_store["cleaned_data"] = []
+        start = time.perf_counter()
+        df = await compute_executor.run("generate", generate)
         
         return {
             "success": True,
             "message": f"Generated {len(df)} {data_type.value} records",
             "rows": len(df),
             "columns": len(df.columns),
-            "headers": df.columns.tolist()
+            "headers": df.columns.tolist(),
+            "dataset_id": dataset_id,
+            "seed": seed,
+            "file": filename,
+            "elapsed": round(time.perf_counter() - start, 3)
         }
     
+    except ComputeUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/preview")
-async def get_data_preview(limit: int = 5):
+FORMAT_PATTERN = r"^(json|ndjson|columnar|arrow)$"
+
+def stream_page(df, version: int, fmt: str, cursor: Optional[str], limit: Optional[int]):
+    """Stream one page of a frame, starting at the cursor position"""
+    offset = 0
+    if cursor:
+        try:
+            cursor_version, offset = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if cursor_version != version:
+            raise HTTPException(status_code=409, detail="Dataset changed since the cursor was issued")
+    
+    page = df.iloc[offset:offset + limit] if limit else df.iloc[offset:]
+    end = offset + len(page)
+    
+    extra = {"count": len(df)}
+    if limit or cursor:
+        extra["next_cursor"] = encode_cursor(version, end) if end < len(df) else None
+    
+    return StreamingService.stream(page, fmt, extra)
+
+@router.get("/preview", dependencies=[Depends(dataset_etag)])
+async def get_data_preview(
+    limit: int = 5,
+    format: str = Query("json", pattern=FORMAT_PATTERN),
+    store: DatasetStore = Depends(get_dataset)
+):
     """Get data preview"""
     
-    if not data_store["raw_data"]:
+    if store.live is not None:
+        source = store.live
+        return await compute_executor.run("live", lambda: {
+            "data": LiveQueryService.preview(source, limit),
+            "total_rows": LiveQueryService.count_rows(source),
+            "has_cleaned": False
+        })
+    
+    df = store.raw()
+    
+    if df is None:
+        raise HTTPException(status_code=404, detail="No data loaded")
+    
+    return StreamingService.stream(
+        df.head(limit),
+        format,
+        {"total_rows": len(df), "has_cleaned": store.has_cleaned}
+    )
+
+@router.get("/raw", dependencies=[Depends(dataset_etag)])
+async def get_raw_data(
+    format: str = Query("json", pattern=FORMAT_PATTERN),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    store: DatasetStore = Depends(get_dataset)
+):
+    """Get raw data, streamed and optionally paginated"""
+    
+    version = store.version
+    df = store.raw()
+    
+    if df is None:
+        raise HTTPException(status_code=404, detail="No data loaded")
+    
+    return stream_page(df, version, format, cursor, limit)
+
+@router.get("/cleaned", dependencies=[Depends(dataset_etag)])
+async def get_cleaned_data(
+    format: str = Query("json", pattern=FORMAT_PATTERN),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    store: DatasetStore = Depends(get_dataset)
+):
+    """Get cleaned data, streamed and optionally paginated"""
+    
+    version = store.version
+    df = store.cleaned()
+    
+    if df is None:
+        raise HTTPException(status_code=404, detail="No cleaned data available. Run cleaning first.")
+    
+    return stream_page(df, version, format, cursor, limit)
+
+@router.get("/profile", dependencies=[Depends(dataset_etag)])
+async def get_data_profile(
+    kind: Optional[str] = Query(None, pattern=VERSION_NAME_PATTERN),
+    store: DatasetStore = Depends(get_dataset)
+):
+    """Get the column profile of raw, cleaned or a named version (default: the current one)"""
+    
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data loaded")
     
+    profile = await compute_executor.run("profile", store.profile, kind)
+    
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No data available to profile")
+    
+    return profile.to_dict()
+
+@router.get("/memory")
+async def get_memory_report(
+    kind: Optional[str] = Query(None, pattern=VERSION_NAME_PATTERN),
+    store: DatasetStore = Depends(get_dataset)
+):
+    """Bytes per column of raw, cleaned or a named version (default: the current one), before and after dtype optimization"""
+    
+    if not store.has_data:
+        raise HTTPException(status_code=404, detail="No data loaded")
+    
+    try:
+        df = store.frame(kind) if kind else store.active()
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if df is None:
+        raise HTTPException(status_code=404, detail="No data available")
+    
+    report = await compute_executor.run("memory", DtypeOptimizer.memory_report, df)
+    
     return {
-        "data": data_store["raw_data"][:limit],
-        "total_rows": len(data_store["raw_data"]),
-        "has_cleaned": len(data_store["cleaned_data"]) > 0
+        "dataset_id": store.dataset_id,
+        "version": store.version,
+        "version_name": kind or store.current,
+        "resident_bytes": store.nbytes,
+        **report
     }
 
-@router.get("/raw")
-async def get_raw_data():
-    """Get all raw data"""
+@router.get("/versions")
+async def list_versions(store: DatasetStore = Depends(get_dataset)):
+    """List the versions of a dataset with their lineage and memory cost"""
     
-    if not data_store["raw_data"]:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data loaded")
     
     return {
-        "data": data_store["raw_data"],
-        "count": len(data_store["raw_data"])
+        "current": store.current,
+        "memory_bytes": store.nbytes,
+        "versions": store.versions()
     }
 
-@router.get("/cleaned")
-async def get_cleaned_data():
-    """Get all cleaned data"""
+@router.get("/versions/{name}", dependencies=[Depends(dataset_etag)])
+async def get_version_data(
+    name: str,
+    format: str = Query("json", pattern=FORMAT_PATTERN),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    store: DatasetStore = Depends(get_dataset)
+):
+    """Get the data of a named version, streamed and optionally paginated"""
     
-    if not data_store["cleaned_data"]:
-        raise HTTPException(status_code=404, detail="No cleaned data available. Run cleaning first.")
+    version = store.version
+    try:
+        df = store.frame(name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    if df is None:
+        raise HTTPException(status_code=404, detail="No data loaded")
+    
+    return stream_page(df, version, format, cursor, limit)
+
+@router.post("/versions/{name}/activate")
+async def activate_version(name: str, store: DatasetStore = Depends(get_dataset)):
+    """Make a version current so analytics and ML read it"""
+    
+    try:
+        version = store.activate(name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return {"success": True, "current": name, "version": version}
+
+@router.delete("/versions/{name}")
+async def delete_version(name: str, store: DatasetStore = Depends(get_dataset)):
+    """Delete a cleaned version that no other version derives from"""
+    
+    try:
+        version = store.delete_version(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"success": True, "current": store.current, "version": version}
+
+@router.get("/datasets")
+async def list_datasets(x_session_id: Optional[str] = Header(None)):
+    """List loaded datasets"""
     
     return {
-        "data": data_store["cleaned_data"],
-        "count": len(data_store["cleaned_data"])
-    }
\ No newline at end of file
+        "datasets": dataset_registry.list(x_session_id),
+        "resident_bytes": dataset_registry.resident_bytes,
+        "memory_budget": dataset_registry.memory_budget
+    }
+
+@router.delete("/datasets/{dataset_id}")
+async def delete_dataset(dataset_id: str, x_session_id: Optional[str] = Header(None)):
+    """Remove a dataset"""
+    
+    if not dataset_registry.drop(dataset_id, x_session_id):
+        raise HTTPException(status_code=404, detail=f"Dataset '{dataset_id}' not found")
+    
+    return {"success": True, "dataset_id": dataset_id}
+
+@router.get("/export", dependencies=[Depends(dataset_etag)])
+async def export_data(
+    format: str = Query("parquet", description="csv, parquet, arrow or feather"),
+    source: Optional[str] = Query(None, description="raw or cleaned; defaults to cleaned when available"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to export"),
+    store: DatasetStore = Depends(get_dataset)
+):
+    """Export the dataset as a file"""
+    
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of {', '.join(EXPORT_FORMATS)}")
+    
+    if source == "raw":
+        df = store.raw()
+    elif source == "cleaned":
+        df = store.cleaned()
+    else:
+        df = store.active()
+    
+    if df is None:
+        raise HTTPException(status_code=404, detail="No data available")
+    
+    try:
+        content = await compute_executor.run(
+            "export", lambda: DataLoaderService.export_dataframe(project(df, parse_columns(columns)), format)
+        )
+    except ComputeUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    media_type, suffix = EXPORT_FORMATS[format]
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{store.dataset_id}{suffix}"'}
+    )
\ No newline at end of file
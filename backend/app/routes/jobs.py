@@ -0,0 +1,147 @@
+"""
+Background Job Routes
+Submit long-running cleaning, segmentation and forecasting, then poll or cancel them
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Dict, Any, Optional, Callable
+
+from config import settings
+from models.schemas import CleaningConfigRequest, ForecastRequest, SegmentationRequest
+from services.cleaning_plan import CleaningPlan, run_plan
+from services.dataset_store import DatasetStore
+from services.jobs import job_manager, JobQueueFull, JobSuperseded, JOB_STATUSES
+from services.ml_service import MLService
+from services.result_cache import result_cache
+from routes.data import get_dataset
+
+router = APIRouter()
+
+def queue_job(*args, **kwargs) -> Dict[str, Any]:
+    """Submit a job, answering 429 when the queue is full"""
+    try:
+        return job_manager.submit(*args, **kwargs)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(settings.COMPUTE_RETRY_AFTER)}
+        )
+
+def submit_clean(store: DatasetStore, plan: CleaningPlan, source: str, version_name: Optional[str], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Clean a version in the background, storing the result only if the dataset did not change"""
+    # Read before the frame: a change in between can only make the result stale
+    base_version = store.version
+    try:
+        df = store.frame(source)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if df is None:
+        raise HTTPException(status_code=404, detail="No data loaded")
+    
+    def finish(outcome):
+        cleaned, stats = outcome
+        version = store.set_cleaned(cleaned, plan, base_version=base_version, name=version_name, parent=source)
+        if version is None:
+            raise JobSuperseded("Dataset changed while the job was running")
+        return {
+            **stats,
+            "version": version,
+            "version_name": store.current,
+            "final_rows": len(cleaned),
+            "final_columns": len(cleaned.columns)
+        }
+    
+    return queue_job(
+        "clean", run_plan, store, df, plan, source,
+        finish=finish, progress=True, dataset_id=store.dataset_id, params=params
+    )
+
+def cache_result(store: DatasetStore, version: int, endpoint: str, params: Dict[str, Any]) -> Callable[[Any], Any]:
+    """Finish step that also serves the result, computed from `version`, to later synchronous requests"""
+    def finish(result):
+        if store.live is None and store.version == version:
+            result_cache.put(result_cache.make_key(store.key, version, endpoint, params), result)
+        return result
+    
+    return finish
+
+@router.post("/clean", status_code=202)
+async def submit_clean_job(config: CleaningConfigRequest, store: DatasetStore = Depends(get_dataset)):
+    """Clean the raw data in the background and store it as a new version"""
+    
+    try:
+        plan = CleaningPlan.from_config(
+            strategy=config.strategy.value,
+            remove_duplicates=config.remove_duplicates,
+            standardize=config.standardize_data,
+            duplicate_subset=config.duplicate_subset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return submit_clean(store, plan, "raw", config.version_name, config.model_dump(mode="json"))
+
+@router.post("/segment", status_code=202)
+async def submit_segment_job(request: SegmentationRequest, store: DatasetStore = Depends(get_dataset)):
+    """Segment customers in the background"""
+    
+    if not store.has_data:
+        raise HTTPException(status_code=404, detail="No data available")
+    
+    version, df = store.active_snapshot()
+    params = {"n_clusters": request.n_clusters}
+    return queue_job(
+        "segment", MLService.segment_customers, df, request.n_clusters,
+        finish=cache_result(store, version, "segment", params), dataset_id=store.dataset_id, params=params
+    )
+
+@router.post("/forecast", status_code=202)
+async def submit_forecast_job(request: ForecastRequest, store: DatasetStore = Depends(get_dataset)):
+    """Forecast sales in the background"""
+    
+    if not store.has_data:
+        raise HTTPException(status_code=404, detail="No data available")
+    
+    try:
+        # Only the date and value columns are shipped to the worker process
+        version, df = store.active_snapshot()
+        df = MLService.forecast_frame(df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    params = {"periods": request.periods}
+    return queue_job(
+        "forecast", MLService.forecast_sales, df, request.periods,
+        finish=cache_result(store, version, "forecast", params), dataset_id=store.dataset_id, params=params
+    )
+
+@router.get("")
+async def list_jobs(
+    kind: Optional[str] = None,
+    status: Optional[str] = Query(None, pattern=f"^({'|'.join(JOB_STATUSES)})$")
+):
+    """List jobs, newest first, without their results"""
+    
+    return {"jobs": job_manager.list(kind, status), "stats": job_manager.stats()}
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress and (once completed) result of a job"""
+    
+    job = job_manager.get(job_id)
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    
+    job = job_manager.cancel(job_id)
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
@@ -2,83 +2,93 @@
 Machine Learning Routes
 Sales forecasting, customer segmentation, anomaly detection, recommendations
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from typing import List
+from functools import partial
 from models.schemas import (
     ForecastRequest, ForecastResult,
     SegmentationRequest, SegmentationResult,
     AnomalyResult, Recommendation
 )
 from services.ml_service import MLService
-from services.data_loader import DataLoaderService
-from routes.data import data_store
+from services.dataset_store import DatasetStore
+from services.result_cache import result_cache
+from services.executor import ComputeUnavailable
+from routes.data import get_dataset, dataset_etag
 
 router = APIRouter()
 
 @router.post("/forecast", response_model=ForecastResult)
-async def forecast_sales(request: ForecastRequest):
+async def forecast_sales(request: ForecastRequest, store: DatasetStore = Depends(get_dataset)):
     """Generate sales forecast"""
     
-    data = data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
-    
-    if not data:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data available")
     
-    df = DataLoaderService.dict_to_dataframe(data)
-    
     try:
-        forecast = MLService.forecast_sales(df, request.periods)
+        forecast = await result_cache.get_or_compute(
+            store, "forecast", {"periods": request.periods},
+            # Runs on the process pool, so the work is passed as a picklable call
+            # and only the date and value columns are pickled with it
+            partial(MLService.forecast_sales, periods=request.periods),
+            project=MLService.forecast_frame
+        )
         return ForecastResult(**forecast)
+    except ComputeUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/segment", response_model=SegmentationResult)
-async def segment_customers(request: SegmentationRequest):
+async def segment_customers(request: SegmentationRequest, store: DatasetStore = Depends(get_dataset)):
     """Perform customer segmentation"""
     
-    data = data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
-    
-    if not data:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data available")
     
-    df = DataLoaderService.dict_to_dataframe(data)
-    
     try:
-        segmentation = MLService.segment_customers(df, request.n_clusters)
+        segmentation = await result_cache.get_or_compute(
+            store, "segment", {"n_clusters": request.n_clusters},
+            lambda df: MLService.segment_customers(df, request.n_clusters)
+        )
         return SegmentationResult(**segmentation)
+    except ComputeUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/anomalies", response_model=AnomalyResult)
-async def detect_anomalies(threshold: float = 2.5):
+@router.get("/anomalies", response_model=AnomalyResult, dependencies=[Depends(dataset_etag)])
+async def detect_anomalies(threshold: float = 2.5, store: DatasetStore = Depends(get_dataset)):
     """Detect anomalies in data"""
     
-    data = data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
-    
-    if not data:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data available")
     
-    df = DataLoaderService.dict_to_dataframe(data)
-    
     try:
-        anomalies = MLService.detect_anomalies(df, threshold)
+        anomalies = await result_cache.get_or_compute(
+            store, "anomalies", {"threshold": threshold},
+            lambda df: MLService.detect_anomalies(df, threshold)
+        )
         return AnomalyResult(**anomalies)
+    except ComputeUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/recommendations", response_model=List[Recommendation])
-async def generate_recommendations():
+@router.get("/recommendations", response_model=List[Recommendation], dependencies=[Depends(dataset_etag)])
+async def generate_recommendations(store: DatasetStore = Depends(get_dataset)):
     """Generate ML-powered recommendations"""
     
-    data = data_store["cleaned_data"] if data_store["cleaned_data"] else data_store["raw_data"]
-    
-    if not data:
+    if not store.has_data:
         raise HTTPException(status_code=404, detail="No data available")
     
-    df = DataLoaderService.dict_to_dataframe(data)
-    
     try:
-        recommendations = MLService.generate_recommendations(df)
+        recommendations = await result_cache.get_or_compute(
+            store, "recommendations", None,
+            lambda df: MLService.generate_recommendations(df, store.profile())
+        )
         return [Recommendation(**rec) for rec in recommendations]
+    except ComputeUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+System Routes
+Runtime monitoring of caches and resources
+"""
+from fastapi import APIRouter
+
+from services.result_cache import result_cache
+from services.single_flight import single_flight
+from services.executor import compute_executor
+
+router = APIRouter()
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Get result cache hit/miss counters"""
+    
+    return result_cache.stats()
+
+@router.delete("/cache")
+async def clear_cache():
+    """Drop all cached results"""
+    
+    return {"success": True, "cleared": result_cache.clear()}
+
+@router.get("/coalescing")
+async def get_coalescing_stats():
+    """Get counters for concurrent identical computations that were coalesced"""
+    
+    return single_flight.stats()
+
+@router.get("/executor")
+async def get_executor_stats():
+    """Get worker pool sizes and per-endpoint concurrency, queueing and rejections"""
+    
+    return compute_executor.stats()
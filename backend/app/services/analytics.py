@@ -4,9 +4,101 @@ Statistical analysis and data visualization preparation
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from scipy import stats
 
+from services.dtypes import value_counts
+
+PERCENTILES = [10, 25, 50, 75, 90, 95, 99]
+
+def _quantiles(values: np.ndarray, count: int, qs: List[float]) -> List[float]:
+    """
+    Linearly interpolated quantiles of the count non-missing values, using
+    one partial sort (NaNs are ordered last, so they never need removing)
+    """
+    positions = [q * (count - 1) for q in qs]
+    kth = sorted({int(np.floor(pos)) for pos in positions} | {int(np.ceil(pos)) for pos in positions})
+    part = np.partition(values, kth)
+    return [
+        float(part[int(np.floor(pos))] + (part[int(np.ceil(pos))] - part[int(np.floor(pos))]) * (pos - np.floor(pos)))
+        for pos in positions
+    ]
+
+def _summarize(columns: List[str], values: np.ndarray, extended: bool = False) -> List[Dict[str, Any]]:
+    """
+    Moments and extrema for every column of a 2-D float block at once.
+    NaNs are missing values; statistics match pandas (sample std, bias
+    corrected skew and excess kurtosis).
+    """
+    # One row per column so reductions run over contiguous memory
+    block = np.ascontiguousarray(values.T)
+    mask = ~np.isnan(block)
+    has_missing = not mask.all()
+    count = mask.sum(axis=1) if has_missing else np.full(len(columns), block.shape[1])
+    
+    sums = block.sum(axis=1)
+    if has_missing:
+        partial = count < block.shape[1]
+        sums[partial] = np.add.reduce(block[partial], axis=1, where=mask[partial])
+    mean = sums / np.maximum(count, 1)
+    
+    # Deviations from the mean, zero where values are missing
+    centered = block - mean[:, None]
+    if has_missing:
+        centered[~mask] = 0.0
+    m2 = np.einsum("ij,ij->i", centered, centered)
+    
+    # fmin/fmax skip NaNs
+    low = np.fmin.reduce(block, axis=1)
+    high = np.fmax.reduce(block, axis=1)
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.where(count > 1, np.sqrt(m2 / np.maximum(count - 1, 1)), np.nan)
+        
+        if extended:
+            n = count.astype(np.float64)
+            squared = centered * centered
+            m3 = (squared * centered).sum(axis=1)
+            m4 = (squared * squared).sum(axis=1)
+            skew = np.where(
+                (n >= 3) & (m2 > 0),
+                np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5,
+                np.where(n >= 3, 0.0, np.nan)
+            )
+            kurtosis = np.where(
+                (n >= 4) & (m2 > 0),
+                (n + 1) * n * (n - 1) / ((n - 2) * (n - 3)) * m4 / (m2 * m2)
+                - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)),
+                np.where(n >= 4, 0.0, np.nan)
+            )
+    
+    qs = [0.5] + ([p / 100 for p in PERCENTILES] if extended else [])
+    
+    summaries = []
+    for j, col in enumerate(columns):
+        if count[j] == 0:
+            continue
+        points = _quantiles(block[j], int(count[j]), qs)
+        summary = {
+            "field": col,
+            "mean": float(mean[j]),
+            "median": points[0],
+            "std": float(std[j]),
+            "min": float(low[j]),
+            "max": float(high[j]),
+            "count": int(count[j])
+        }
+        if extended:
+            summary.update({
+                "null_count": int(block.shape[1] - count[j]),
+                "skew": float(skew[j]),
+                "kurtosis": float(kurtosis[j]),
+                "percentiles": {f"p{p}": point for p, point in zip(PERCENTILES, points[1:])}
+            })
+        summaries.append(summary)
+    
+    return summaries
+
 class AnalyticsService:
     
     @staticmethod
@@ -29,23 +121,39 @@ class AnalyticsService:
         }
     
     @staticmethod
-    def get_statistical_summary(df: pd.DataFrame) -> List[Dict[str, Any]]:
-        """Get statistical summary for all numeric columns"""
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        summaries = []
+    def get_statistical_summary(
+        df: pd.DataFrame,
+        extended: bool = False,
+        group_by: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get statistical summary for all numeric columns.
+        With extended, null counts, skew, kurtosis and percentiles are added;
+        with group_by, one summary per column and group value is returned.
+        """
+        if group_by is not None and group_by not in df.columns:
+            raise ValueError(f"Column {group_by} not found")
         
-        for col in numeric_cols:
-            data = df[col].dropna()
-            if len(data) > 0:
-                summaries.append({
-                    "field": col,
-                    "mean": float(data.mean()),
-                    "median": float(data.median()),
-                    "std": float(data.std()),
-                    "min": float(data.min()),
-                    "max": float(data.max()),
-                    "count": int(len(data))
-                })
+        numeric_cols = [col for col in df.select_dtypes(include=[np.number]).columns if col != group_by]
+        if not numeric_cols:
+            return []
+        values = df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        if group_by is None:
+            return _summarize(numeric_cols, values, extended)
+        
+        # Sort rows by group once so every group is a contiguous block
+        codes, uniques = pd.factorize(df[group_by], sort=True)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        values = values[order]
+        
+        summaries = []
+        for i, group in enumerate(uniques):
+            block = values[bounds[i]:bounds[i + 1]]
+            for summary in _summarize(numeric_cols, block, extended):
+                summary["group"] = group.item() if hasattr(group, "item") else group
+                summaries.append(summary)
         
         return summaries
     
@@ -89,11 +197,11 @@ class AnalyticsService:
         if column not in df.columns:
             raise ValueError(f"Column {column} not found")
         
-        value_counts = df[column].value_counts()
+        counts = value_counts(df[column])
         
         return {
-            "labels": value_counts.index.tolist(),
-            "values": value_counts.values.tolist(),
+            "labels": counts.index.tolist(),
+            "values": counts.values.tolist(),
             "column": column
         }
     
@@ -129,12 +237,21 @@ class AnalyticsService:
         if not pd.api.types.is_numeric_dtype(data):
             raise ValueError(f"Column {column} is not numeric")
         
-        percentiles = [10, 25, 50, 75, 90, 95, 99]
-        
         return {
             "column": column,
             "percentiles": {
                 f"p{p}": float(np.percentile(data, p))
-                for p in percentiles
+                for p in PERCENTILES
             }
-        }
\ No newline at end of file
+        }
+    
+    @staticmethod
+    def get_cardinality(df: pd.DataFrame, column: str) -> Dict[str, Any]:
+        """Count distinct non-missing values in a column"""
+        if column not in df.columns:
+            raise ValueError(f"Column {column} not found")
+        
+        return {
+            "column": column,
+            "distinct": int(df[column].nunique())
+        }
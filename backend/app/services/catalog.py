@@ -0,0 +1,80 @@
+"""
+Persistent Dataset Catalog
+Dataset versions kept across restarts: metadata in the database, data in Arrow files
+"""
+import os
+import json
+import time
+from typing import Dict, List, Any
+
+from database import SessionLocal, init_db
+from models.catalog import DatasetRecord
+from services.shared_store import SharedCatalog
+
+class PersistentCatalog(SharedCatalog):
+    """
+    A shared catalog whose manifests are also recorded in DATABASE_URL.
+
+    The database is the durable record of which datasets exist and which
+    files make up their versions; the manifest files remain the fast path
+    workers poll. On startup the records are checked against the files and
+    the datasets are reopened lazily, their frames memory-mapped on first
+    access instead of being parsed again.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        init_db()
+
+    def publish(self, key: str, manifest: Dict[str, Any]):
+        super().publish(key, manifest)
+        now = time.time()
+        with SessionLocal() as db:
+            record = db.get(DatasetRecord, key)
+            if record is None:
+                record = DatasetRecord(key=key, created_at=now)
+                db.add(record)
+            record.dataset_id = manifest["dataset_id"]
+            record.version = manifest["version"]
+            record.current_version = manifest["current"]
+            record.rows, record.columns = manifest["shape"]
+            record.manifest = json.dumps(manifest)
+            record.updated_at = now
+            db.commit()
+
+    def remove(self, key: str):
+        super().remove(key)
+        with SessionLocal() as db:
+            db.query(DatasetRecord).filter(DatasetRecord.key == key).delete()
+            db.commit()
+
+    def keys(self) -> List[str]:
+        with SessionLocal() as db:
+            return [key for (key,) in db.query(DatasetRecord.key).order_by(DatasetRecord.key)]
+
+    def restore(self) -> List[str]:
+        """
+        Reconcile the records with the files after a restart: rewrite lost
+        manifests and forget datasets whose version files are gone.
+        """
+        restored, missing = [], []
+        with SessionLocal() as db:
+            records = db.query(DatasetRecord).all()
+            manifests = {record.key: json.loads(record.manifest) for record in records}
+
+        for key, manifest in manifests.items():
+            with self.lock(key):
+                directory = self._dir(key)
+                files = [entry["file"] for entry in manifest["versions"]]
+                files += [entry["plan_file"] for entry in manifest["versions"] if entry["plan_file"]]
+                if not all(os.path.exists(os.path.join(directory, name)) for name in files):
+                    missing.append(key)
+                    continue
+                current = self.read_manifest(key)
+                if current is None or current["version"] < manifest["version"]:
+                    super().publish(key, manifest)
+                restored.append(key)
+
+        for key in missing:
+            self.remove(key)
+        return restored
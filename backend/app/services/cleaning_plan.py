@@ -0,0 +1,385 @@
+"""
+Cleaning Plans
+Declarative cleaning steps fitted once and executed as one fused pass
+"""
+import copy
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from config import settings
+from services.duplicates import RowHashIndex
+from services.profiler import DatasetProfile, _scalar
+
+CLEANING_OPS = ("impute", "dedupe", "standardize", "cast")
+IMPUTE_STRATEGIES = ("mean", "median", "mode", "interpolation", "ml", "remove")
+CAST_TYPES = ("int", "float", "string", "category", "datetime")
+
+def _cast(series: pd.Series, dtype: str) -> pd.Series:
+    """Convert a column; values that do not convert become missing"""
+    if dtype == "float":
+        return pd.to_numeric(series, errors="coerce").astype("float64")
+    if dtype == "int":
+        numeric = pd.to_numeric(series, errors="coerce")
+        return numeric.where(numeric == np.round(numeric)).astype("Int64")
+    if dtype == "datetime":
+        return pd.to_datetime(series, errors="coerce")
+    return series.astype(dtype)
+
+def _has_dtype(series: pd.Series, dtype: str) -> bool:
+    if dtype == "float":
+        return series.dtype == np.float64
+    if dtype == "int":
+        return str(series.dtype) == "Int64"
+    if dtype == "datetime":
+        return pd.api.types.is_datetime64_any_dtype(series)
+    return str(series.dtype) == dtype
+
+def _realign(series: pd.Series, aligned: Optional[np.ndarray], selection: np.ndarray) -> pd.Series:
+    """Narrow a column taken at one row selection to a later, smaller one"""
+    if aligned is None:
+        return series.iloc[selection]
+    return series.iloc[np.searchsorted(aligned, selection)]
+
+class CleaningPlan:
+    """
+    Ordered cleaning steps: impute, dedupe, standardize and cast.
+
+    fit() resolves each step's columns, drops steps with nothing to do and
+    computes fill values once. apply() then transforms each affected column
+    once; row filters (dedupe, removing incomplete rows) only narrow a row
+    selection, which every column takes once at the end. Columns no step
+    touches are passed through without copying.
+    """
+
+    def __init__(self, steps: List[Dict[str, Any]]):
+        if not steps:
+            raise ValueError("A cleaning plan needs at least one step")
+        self.steps = [self._validate(step) for step in steps]
+        self.fitted: Optional[List[Dict[str, Any]]] = None
+        # Hashes of the rows each dedupe step kept, by step position, so
+        # appended rows can be deduplicated against them
+        self.seen: Optional[Dict[int, np.ndarray]] = None
+
+    @staticmethod
+    def _validate(step: Dict[str, Any]) -> Dict[str, Any]:
+        op = step.get("op")
+        if op not in CLEANING_OPS:
+            raise ValueError(f"Unknown cleaning step: {op}")
+        step = {"op": op, "columns": step.get("columns") or None, **{
+            key: value for key, value in step.items() if key not in ("op", "columns") and value is not None
+        }}
+        if op == "impute":
+            step.setdefault("strategy", "mean")
+            if step["strategy"] not in IMPUTE_STRATEGIES:
+                raise ValueError(f"Unknown imputation strategy: {step['strategy']}")
+        if op == "cast":
+            if not step["columns"]:
+                raise ValueError("A cast step needs columns")
+            if step.get("dtype") not in CAST_TYPES:
+                raise ValueError(f"Cast dtype must be one of: {', '.join(CAST_TYPES)}")
+        return step
+
+    @classmethod
+    def from_config(
+        cls,
+        strategy: str = "mean",
+        remove_duplicates: bool = True,
+        standardize: bool = True,
+        duplicate_subset: Optional[List[str]] = None
+    ) -> "CleaningPlan":
+        """The plan equivalent to a classic cleaning configuration"""
+        steps = [{"op": "impute", "strategy": strategy}]
+        if remove_duplicates:
+            steps.append({"op": "dedupe", "columns": duplicate_subset})
+        if standardize:
+            steps.append({"op": "standardize"})
+        return cls(steps)
+
+    @staticmethod
+    def _columns(df: pd.DataFrame, step: Dict[str, Any]) -> List[str]:
+        columns = step["columns"] or list(df.columns)
+        missing = [col for col in columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Columns not found: {', '.join(missing)}")
+        return columns
+
+    def fit(self, df: pd.DataFrame, profile: Optional[DatasetProfile] = None) -> "CleaningPlan":
+        """Resolve the steps against a frame and compute fill values"""
+        numeric = set(df.select_dtypes(include=[np.number]).columns)
+        cast_to: Dict[str, str] = {}
+        fitted = []
+
+        def source(col: str) -> pd.Series:
+            return _cast(df[col], cast_to[col]) if col in cast_to else df[col]
+
+        def profiled(col: str) -> Optional[Dict[str, Any]]:
+            # Profiles describe the input, so not columns an earlier step cast
+            return profile.column(col) if profile is not None and col not in cast_to else None
+
+        for step in self.steps:
+            op = step["op"]
+            columns = self._columns(df, step)
+
+            if op == "impute":
+                strategy = step["strategy"]
+                if strategy == "remove":
+                    fitted.append({"op": "drop_incomplete", "columns": columns})
+                    continue
+                for col in columns:
+                    stats = profiled(col)
+                    series = source(col)
+                    nulls = stats["null_count"] if stats else int(series.isna().sum())
+                    if not nulls:
+                        continue
+                    fitted.append(self._fit_impute(col, series, strategy, col in numeric, nulls, stats))
+
+            elif op == "dedupe":
+                fitted.append({"op": "dedupe", "columns": step["columns"]})
+
+            elif op == "standardize":
+                columns = [col for col in columns if col not in numeric]
+                if not columns:
+                    continue
+                if fitted and fitted[-1]["op"] == "standardize":
+                    fitted[-1]["columns"] += [col for col in columns if col not in fitted[-1]["columns"]]
+                else:
+                    fitted.append({"op": "standardize", "columns": columns})
+
+            elif op == "cast":
+                dtype = step["dtype"]
+                for col in columns:
+                    if col not in cast_to and _has_dtype(df[col], dtype):
+                        continue
+                    fitted.append({"op": "cast", "column": col, "dtype": dtype})
+                    cast_to[col] = dtype
+                    if dtype in ("int", "float"):
+                        numeric.add(col)
+                    else:
+                        numeric.discard(col)
+
+        self.fitted = fitted
+        self.seen = None
+        return self
+
+    @staticmethod
+    def _fit_impute(
+        col: str,
+        series: pd.Series,
+        strategy: str,
+        is_numeric: bool,
+        nulls: int,
+        stats: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        if is_numeric and strategy == "interpolation":
+            return {"op": "interpolate", "column": col, "missing": nulls}
+
+        if is_numeric and strategy in ("mean", "median", "ml"):
+            step = {"op": "fill", "column": col, "missing": nulls}
+            step["value"] = series.median() if strategy == "median" else series.mean()
+            if strategy == "ml":
+                # Spread of the mean-filled column, as if its std were taken after filling
+                observed = len(series) - nulls
+                scale = np.sqrt((observed - 1) / (len(series) - 1)) if len(series) > 1 else np.nan
+                step["noise"] = float(series.std() * scale * 0.1)
+            return step
+
+        # Categorical columns (and every column under "mode") take the mode;
+        # the profile's top value is used when it is not tied
+        top = stats["top_values"] if stats and stats["kind"] in ("numeric", "categorical") else []
+        if len(top) == 1 or (len(top) > 1 and top[0]["count"] > top[1]["count"]):
+            value = top[0]["value"]
+        else:
+            mode = series.mode()
+            value = mode.iloc[0] if len(mode) > 0 else None
+        return {"op": "fill", "column": col, "missing": nulls, "value": value}
+
+    def apply(
+        self,
+        df: pd.DataFrame,
+        row_hashes: Optional[RowHashIndex] = None,
+        profile: Optional[DatasetProfile] = None,
+        seed: int = settings.RANDOM_SEED,
+        record: bool = False
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Run the fitted plan over a frame, returning the cleaned frame and
+        counts. With record, the plan remembers the rows it kept so that
+        extend() can clean appended rows later.
+        """
+        if self.fitted is None:
+            self.fit(df, profile)
+        cleaned, stats, kept = self._execute(df, row_hashes, profile, seed)
+        if record:
+            self.seen = kept
+        return cleaned, stats
+
+    def extend(self, rows: pd.DataFrame, seed: int = settings.RANDOM_SEED) -> Tuple[pd.DataFrame, Dict[str, Any], "CleaningPlan"]:
+        """
+        Clean rows appended to the frame this plan was applied to, with the
+        fill values fitted then. Dedupe steps also drop rows equal to rows
+        kept earlier; interpolation only sees the appended rows. Returns the
+        cleaned rows, counts and the plan updated with the new rows.
+        """
+        dedupes = [i for i, step in enumerate(self.fitted or []) if step["op"] == "dedupe"]
+        if self.fitted is None or (dedupes and (self.seen is None or any(i not in self.seen for i in dedupes))):
+            raise ValueError("The plan was not recorded when it was applied")
+
+        cleaned, stats, kept = self._execute(rows, None, None, seed, history=self.seen)
+        extended = copy.copy(self)
+        extended.seen = {i: np.concatenate([self.seen[i], kept[i]]) for i in kept}
+        return cleaned, stats, extended
+
+    def _execute(
+        self,
+        df: pd.DataFrame,
+        row_hashes: Optional[RowHashIndex],
+        profile: Optional[DatasetProfile],
+        seed: int,
+        history: Optional[Dict[int, np.ndarray]] = None
+    ) -> Tuple[pd.DataFrame, Dict[str, Any], Dict[int, np.ndarray]]:
+        rng = np.random.default_rng(seed)
+        kept: Dict[int, np.ndarray] = {}
+
+        columns = {col: df[col] for col in df.columns}
+        aligned: Dict[str, Optional[np.ndarray]] = {col: None for col in df.columns}
+        selection: Optional[np.ndarray] = None
+        modified = set()
+        stats = {
+            "missing_found": profile.missing_count if profile is not None else int(df.isna().sum().sum()),
+            "missing_filled": 0,
+            "duplicates_removed": 0,
+            "values_coerced": 0
+        }
+
+        def current(col: str) -> pd.Series:
+            if selection is not None and aligned[col] is not selection:
+                columns[col] = _realign(columns[col], aligned[col], selection)
+                aligned[col] = selection
+            return columns[col]
+
+        def narrow(keep: np.ndarray) -> Optional[np.ndarray]:
+            if keep.all():
+                # Keep sharing the input columns when no row goes
+                return selection
+            return (np.arange(len(df)) if selection is None else selection)[keep]
+
+        for position, step in enumerate(self.fitted):
+            op = step["op"]
+
+            if op in ("fill", "interpolate"):
+                col = step["column"]
+                series = current(col)
+                missing = series.isna().to_numpy()
+                if op == "interpolate":
+                    filled = series.interpolate(method='linear', limit_direction='both')
+                else:
+                    filled = series.fillna(step["value"]) if step["value"] is not None else series
+                    if step.get("noise") and missing.any():
+                        values = filled.to_numpy(dtype=np.float64, copy=True)
+                        values[missing] += rng.normal(0, step["noise"], int(missing.sum()))
+                        filled = pd.Series(values, index=filled.index, name=col)
+                stats["missing_filled"] += int(missing.sum() - filled.isna().sum())
+                columns[col] = filled
+                modified.add(col)
+
+            elif op == "drop_incomplete":
+                frame = pd.DataFrame({col: current(col) for col in step["columns"]}, copy=False)
+                complete = frame.notna().all(axis=1).to_numpy()
+                stats["missing_filled"] += int(frame.isna().sum().sum())
+                selection = narrow(complete)
+
+            elif op == "dedupe":
+                subset = step["columns"]
+                if subset is None and row_hashes is not None and not modified:
+                    index = row_hashes if selection is None else row_hashes.take(selection)
+                else:
+                    # Cleaned values may make rows equal, so hash them as they are now
+                    names = subset or list(df.columns)
+                    index = RowHashIndex.build(pd.DataFrame({col: current(col) for col in names}, copy=False))
+                duplicated = index.duplicated()
+                if history is not None:
+                    duplicated = duplicated | pd.Series(index.hashes).isin(history[position]).to_numpy()
+                kept[position] = index.hashes[~duplicated]
+                stats["duplicates_removed"] += int(duplicated.sum())
+                selection = narrow(~duplicated)
+
+            elif op == "standardize":
+                for col in step["columns"]:
+                    series = current(col)
+                    if isinstance(series.dtype, pd.CategoricalDtype):
+                        categories = series.cat.categories
+                        if categories.equals(categories.astype(str).str.strip()):
+                            # Standard categories: keep the shared codes
+                            continue
+                    standardized = series.astype(str).str.strip()
+                    if standardized.dtype == series.dtype and standardized.equals(series):
+                        # Already standard: keep the shared buffer
+                        continue
+                    columns[col] = standardized
+                    modified.add(col)
+
+            elif op == "cast":
+                col = step["column"]
+                series = current(col)
+                cast = _cast(series, step["dtype"])
+                stats["values_coerced"] += int(cast.isna().sum() - series.isna().sum())
+                columns[col] = cast
+                modified.add(col)
+
+        cleaned = pd.DataFrame({col: current(col) for col in df.columns}, copy=False)
+        return cleaned, stats, kept
+
+    def preview(
+        self,
+        df: pd.DataFrame,
+        rows: int,
+        row_hashes: Optional[RowHashIndex] = None
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Run the fitted plan over a random sample of rows. Fill values come
+        from the full data, so sampled rows clean exactly as they would in a
+        full run (except for interpolation and within-sample deduplication).
+        """
+        started = time.perf_counter()
+        if len(df) > rows:
+            positions = np.sort(np.random.default_rng(settings.RANDOM_SEED).choice(len(df), rows, replace=False))
+            df = df.iloc[positions]
+            if row_hashes is not None:
+                row_hashes = row_hashes.take(positions)
+
+        cleaned, stats = self.apply(df, row_hashes)
+        return cleaned, {
+            "sample_rows": len(df),
+            "rows_after": len(cleaned),
+            "sample_stats": stats,
+            "estimated_missing_filled": sum(step.get("missing", 0) for step in self.fitted),
+            "steps": self.describe(),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """The fitted steps with JSON-safe fill values"""
+        if self.fitted is None:
+            return self.steps
+        return [
+            {key: _scalar(value) if key in ("value", "noise") else value for key, value in step.items()}
+            for step in self.fitted
+        ]
+
+def run_plan(store, df: pd.DataFrame, plan: CleaningPlan, source: str = "raw", progress: Optional[Callable[[float], None]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Fit a plan on a version's frame and apply it, recording the kept rows.
+    progress, if given, is told the fraction done after each stage.
+    """
+    progress = progress or (lambda fraction: None)
+    profile = store.profile(source)
+    progress(0.3)
+    plan.fit(df, profile)
+    progress(0.4)
+    row_hashes = store.row_hashes(source)
+    progress(0.5)
+    cleaned, stats = plan.apply(df, row_hashes, profile, record=True)
+    progress(0.95)
+    return cleaned, stats
@@ -0,0 +1,168 @@
+"""
+Connection Pool Service
+Caches pooled SQLAlchemy engines and MongoDB clients per connection string
+"""
+import hashlib
+import threading
+import time
+from typing import Dict, List, Any, Optional
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+from config import settings
+
+class _PooledConnection:
+    """A cached engine or client with usage bookkeeping"""
+
+    def __init__(self, connection_id: str, kind: str, display_url: str, client):
+        self.connection_id = connection_id
+        self.kind = kind
+        self.display_url = display_url
+        self.client = client
+        self.created = time.time()
+        self.last_used = time.monotonic()
+        self.uses = 0
+
+    def touch(self):
+        self.last_used = time.monotonic()
+        self.uses += 1
+
+    def close(self):
+        if self.kind == "mongodb":
+            self.client.close()
+        else:
+            self.client.dispose()
+
+    def info(self) -> Dict[str, Any]:
+        info = {
+            "connection_id": self.connection_id,
+            "type": self.kind,
+            "url": self.display_url,
+            "created": self.created,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "uses": self.uses
+        }
+        if self.kind != "mongodb":
+            info["pool"] = self.client.pool.status()
+        return info
+
+class EngineRegistry:
+    """
+    Registry of pooled engines keyed by normalized connection string.
+
+    Repeated requests against the same source reuse one engine and its
+    connection pool instead of paying connection setup every time. Engines
+    idle for longer than the idle timeout are disposed on the next access.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = settings.DB_POOL_SIZE,
+        max_overflow: int = settings.DB_MAX_OVERFLOW,
+        pool_recycle: int = settings.DB_POOL_RECYCLE,
+        pool_pre_ping: bool = settings.DB_POOL_PRE_PING,
+        idle_timeout: int = settings.DB_POOL_IDLE_TIMEOUT
+    ):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+        self.idle_timeout = idle_timeout
+        self._lock = threading.RLock()
+        self._connections: Dict[str, _PooledConnection] = {}
+
+    @staticmethod
+    def _connection_id(normalized: str) -> str:
+        return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+    def get_engine(self, connection_string: str):
+        """Get a pooled SQLAlchemy engine for a connection string"""
+        url = make_url(connection_string)
+        # make_url orders query parameters, so equivalent strings share an engine
+        normalized = url.render_as_string(hide_password=False)
+        connection_id = self._connection_id(normalized)
+
+        with self._lock:
+            self.evict_idle()
+            pooled = self._connections.get(connection_id)
+            if pooled is None:
+                pooled = _PooledConnection(
+                    connection_id,
+                    url.get_backend_name(),
+                    url.render_as_string(hide_password=True),
+                    create_engine(url, **self._engine_options(url))
+                )
+                self._connections[connection_id] = pooled
+            pooled.touch()
+            return pooled.client
+
+    def _engine_options(self, url) -> Dict[str, Any]:
+        options = {
+            "pool_pre_ping": self.pool_pre_ping,
+            "pool_recycle": self.pool_recycle
+        }
+        if url.get_backend_name() == "sqlite":
+            # SQLite engines use single-connection pools without overflow
+            options["connect_args"] = {"check_same_thread": False}
+        else:
+            options["pool_size"] = self.pool_size
+            options["max_overflow"] = self.max_overflow
+        return options
+
+    def get_mongo_client(self, connection_string: str):
+        """Get a pooled MongoDB client for a connection string"""
+        from pymongo import MongoClient
+
+        connection_id = self._connection_id(connection_string.strip())
+
+        with self._lock:
+            self.evict_idle()
+            pooled = self._connections.get(connection_id)
+            if pooled is None:
+                scheme, _, rest = connection_string.partition("://")
+                pooled = _PooledConnection(
+                    connection_id,
+                    "mongodb",
+                    f"{scheme}://***@{rest.split('@')[-1]}" if "@" in rest else connection_string,
+                    MongoClient(
+                        connection_string,
+                        maxPoolSize=self.pool_size + self.max_overflow,
+                        maxIdleTimeMS=self.idle_timeout * 1000
+                    )
+                )
+                self._connections[connection_id] = pooled
+            pooled.touch()
+            return pooled.client
+
+    def evict_idle(self) -> int:
+        """Dispose engines that have been idle longer than the idle timeout"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                connection_id for connection_id, pooled in self._connections.items()
+                if now - pooled.last_used > self.idle_timeout
+            ]
+            for connection_id in idle:
+                self._connections.pop(connection_id).close()
+            return len(idle)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Describe the pooled connections"""
+        with self._lock:
+            self.evict_idle()
+            return [pooled.info() for pooled in self._connections.values()]
+
+    def close(self, connection_id: Optional[str] = None) -> int:
+        """Close one pooled connection, or all of them"""
+        with self._lock:
+            if connection_id is None:
+                closed = list(self._connections.values())
+                self._connections.clear()
+            else:
+                pooled = self._connections.pop(connection_id, None)
+                closed = [pooled] if pooled else []
+        for pooled in closed:
+            pooled.close()
+        return len(closed)
+
+engine_registry = EngineRegistry()
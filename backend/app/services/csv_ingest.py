@@ -0,0 +1,374 @@
+"""
+CSV Ingestion
+Streaming and parallel CSV parsing, block by block
+"""
+import io
+import os
+import mmap
+import time
+import zlib
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, List, Dict, Any, Tuple, Union
+
+from config import settings
+from services.sketches import ColumnSketches
+
+CSV_ENGINES = ("pandas", "parallel", "pyarrow")
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Bytes decompressed per step, so an oversized body is rejected before it is inflated whole
+GZIP_OUTPUT_STEP = 1 << 20
+ZSTD_INPUT_STEP = 1 << 10
+
+class DecodedSizeExceeded(ValueError):
+    """A compressed upload inflates past the decoded-size limit"""
+
+def detect_compression(filename: Optional[str] = None, content_encoding: Optional[str] = None) -> Optional[str]:
+    """Work out the compression of an upload from its encoding header or file name"""
+    encoding = (content_encoding or "").lower()
+    name = (filename or "").lower()
+
+    if encoding in ("gzip", "x-gzip") or name.endswith(".gz"):
+        return "gzip"
+    if encoding == "zstd" or name.endswith(".zst"):
+        return "zstd"
+    return None
+
+def _decompressor(compression: str):
+    """Create an incremental decompressor"""
+    if compression == "gzip":
+        # Accept both gzip and zlib headers
+        return zlib.decompressobj(wbits=zlib.MAX_WBITS | 32)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd support requires 'zstandard' package. Install with: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"Unsupported compression: {compression}")
+
+def _record_boundary(buf: bytearray, start: int = 0) -> int:
+    """
+    Return the offset just past the last complete record in buf.
+
+    A newline only ends a record when it is outside a quoted field, i.e.
+    when an even number of quote characters precede it.
+    """
+    pos = buf.rfind(b"\n", start)
+    if pos < 0:
+        return 0
+
+    quotes = buf.count(b'"', 0, pos)
+    while pos >= start:
+        if quotes % 2 == 0:
+            return pos + 1
+        prev = buf.rfind(b"\n", start, pos)
+        if prev < 0:
+            break
+        quotes -= buf.count(b'"', prev, pos)
+        pos = prev
+    return 0
+
+def _first_record_end(buf: bytearray) -> int:
+    """Return the offset just past the first complete record in buf, or 0"""
+    pos = buf.find(b"\n")
+    while pos >= 0:
+        if buf.count(b'"', 0, pos) % 2 == 0:
+            return pos + 1
+        pos = buf.find(b"\n", pos + 1)
+    return 0
+
+def _parse_block(header: bytes, block: bytes, schema: Optional[Dict[str, Any]]) -> pd.DataFrame:
+    """Parse complete records into a DataFrame block"""
+    data = io.BytesIO(header + block)
+
+    if schema is None:
+        return pd.read_csv(data)
+    try:
+        return pd.read_csv(data, dtype=schema)
+    except (ValueError, TypeError):
+        # The sample schema does not fit this block (e.g. NAs in an
+        # integer column); infer it and let concat unify the dtypes
+        data.seek(0)
+        return pd.read_csv(data)
+
+def _parse_sketched(header: bytes, block: bytes, schema: Optional[Dict[str, Any]]) -> Tuple[pd.DataFrame, ColumnSketches]:
+    """Parse a block and sketch its columns while it is hot in cache"""
+    df = _parse_block(header, block, schema)
+    sketches = ColumnSketches()
+    sketches.update(df)
+    return df, sketches
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def parse_pool() -> ThreadPoolExecutor:
+    """Shared thread pool for block parsing"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.CSV_PARSE_THREADS or os.cpu_count() or 1,
+                thread_name_prefix="csv-parse"
+            )
+        return _pool
+
+def _validate_engine(engine: str) -> str:
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine: {engine}. Use one of {', '.join(CSV_ENGINES)}")
+    return engine
+
+class StreamingCSVParser:
+    """
+    Incremental CSV parser fed with raw (optionally compressed) byte chunks.
+
+    Complete records are parsed into columnar blocks as soon as enough bytes
+    have arrived. The first block is a small leading sample whose inferred
+    dtypes become the schema for later blocks, so peak memory stays close to
+    the size of the parsed columns rather than the raw text. Column sketches
+    are built per block and merged when `sketch` is enabled.
+    """
+
+    def __init__(
+        self,
+        compression: Optional[str] = None,
+        block_size: int = settings.CSV_BLOCK_SIZE,
+        sample_size: int = settings.CSV_SAMPLE_SIZE,
+        engine: str = settings.CSV_ENGINE,
+        sketch: bool = settings.SKETCH_AT_INGEST,
+        max_decoded: int = settings.MAX_DECODED_SIZE
+    ):
+        self.compression = compression
+        self.max_decoded = max_decoded
+        self.block_size = block_size
+        self.sample_size = sample_size
+        # Blocks after the sample are parsed on the pool unless the plain
+        # pandas engine is configured
+        self.parallel = _validate_engine(engine) != "pandas"
+        self.sketch = sketch
+        self.sketches: Optional[ColumnSketches] = None
+        self.timings: Dict[str, float] = {"receive": 0.0, "parse": 0.0, "unify": 0.0}
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+        self.schema: Optional[Dict[str, Any]] = None
+        self._decoder = _decompressor(compression) if compression else None
+        self._sniffed = compression is not None
+        self._header: Optional[bytes] = None
+        self._buffer = bytearray()
+        self._blocks: List[Union[pd.DataFrame, Tuple, Future]] = []
+
+    def feed(self, chunk: bytes):
+        """Add a chunk of the request body"""
+        if not chunk:
+            return
+        self.bytes_received += len(chunk)
+
+        if not self._sniffed:
+            # Fall back to magic bytes when the client did not declare compression
+            self._sniffed = True
+            if chunk.startswith(GZIP_MAGIC):
+                self.compression = "gzip"
+            elif chunk.startswith(ZSTD_MAGIC):
+                self.compression = "zstd"
+            if self.compression:
+                self._decoder = _decompressor(self.compression)
+
+        start = time.perf_counter()
+        if self._decoder is None:
+            self._append(chunk)
+        elif self.compression == "gzip":
+            while chunk:
+                self._append(self._decoder.decompress(chunk, GZIP_OUTPUT_STEP))
+                chunk = self._decoder.unconsumed_tail
+        else:
+            # zstd output cannot be capped, so its input is fed in small steps
+            for pos in range(0, len(chunk), ZSTD_INPUT_STEP):
+                self._append(self._decoder.decompress(chunk[pos:pos + ZSTD_INPUT_STEP]))
+        self.timings["receive"] += time.perf_counter() - start
+
+    def _append(self, data: bytes):
+        self.bytes_decoded += len(data)
+        if self.bytes_decoded > self.max_decoded:
+            raise DecodedSizeExceeded(f"Decompressed upload exceeds the {self.max_decoded} byte limit")
+        self._buffer += data
+
+        if self._header is None:
+            end = _first_record_end(self._buffer)
+            if end == 0:
+                return
+            self._header = bytes(self._buffer[:end])
+            del self._buffer[:end]
+
+        threshold = self.sample_size if self.schema is None else self.block_size
+        if len(self._buffer) >= threshold:
+            end = _record_boundary(self._buffer)
+            if end > 0:
+                self._parse(self._buffer[:end])
+                del self._buffer[:end]
+
+    def _parse(self, block: bytes):
+        """Parse a block now, or queue it on the parse pool"""
+        parse = _parse_sketched if self.sketch else _parse_block
+        if self.schema is None:
+            result = parse(self._header, block, None)
+            self.schema = (result[0] if self.sketch else result).dtypes.to_dict()
+            self._blocks.append(result)
+        elif self.parallel:
+            self._blocks.append(parse_pool().submit(parse, self._header, bytes(block), self.schema))
+        else:
+            self._blocks.append(parse(self._header, block, self.schema))
+
+    def close(self) -> pd.DataFrame:
+        """Parse any remaining bytes and return the assembled DataFrame"""
+        if self._decoder is not None and hasattr(self._decoder, "flush"):
+            tail = self._decoder.flush()
+            if tail:
+                self._append(tail)
+
+        if self._header is None:
+            # Single line without a trailing newline
+            self._header = bytes(self._buffer) + b"\n"
+            self._buffer = bytearray()
+        if self._buffer.strip():
+            self._parse(self._buffer)
+            self._buffer = bytearray()
+
+        if not self._blocks:
+            if not self._header.strip():
+                raise ValueError("Error loading CSV: file is empty")
+            return pd.read_csv(io.BytesIO(self._header))
+
+        start = time.perf_counter()
+        blocks = [block.result() if isinstance(block, Future) else block for block in self._blocks]
+        self._blocks = []
+        self.timings["parse"] = time.perf_counter() - start
+        
+        if self.sketch:
+            start = time.perf_counter()
+            self.sketches = ColumnSketches()
+            for _, sketches in blocks:
+                self.sketches.merge(sketches)
+            blocks = [df for df, _ in blocks]
+            self.timings["sketch"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df = blocks[0] if len(blocks) == 1 else pd.concat(blocks, ignore_index=True)
+        self.timings["unify"] = time.perf_counter() - start
+        
+        if self.sketches is not None:
+            self.sketches.retain(df)
+        return df
+
+def _count_quotes(buf, start: int, end: int, window: int = 1 << 26) -> int:
+    """Count quote characters in buf[start:end] without copying it whole"""
+    return sum(buf[pos:min(pos + window, end)].count(b'"') for pos in range(start, end, window))
+
+def _split_ranges(buf, start: int, parts: int) -> List[Tuple[int, int]]:
+    """Split buf[start:] into byte ranges that begin and end on record boundaries"""
+    size = len(buf)
+    step = max((size - start) // parts, 1)
+    bounds = [start]
+
+    for i in range(1, parts):
+        target = max(start + i * step, bounds[-1])
+        # Quote parity since the last boundary tells whether a newline ends a record
+        nl = buf.find(b"\n", target)
+        quotes = _count_quotes(buf, bounds[-1], nl) if nl >= 0 else 0
+        while nl >= 0 and quotes % 2:
+            prev = nl
+            nl = buf.find(b"\n", nl + 1)
+            if nl >= 0:
+                quotes += _count_quotes(buf, prev, nl)
+        if nl < 0 or nl + 1 >= size:
+            break
+        bounds.append(nl + 1)
+
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+class CSVFileReader:
+    """
+    CSV file reader with selectable parse engine.
+
+    - pandas: single-threaded pd.read_csv
+    - parallel: splits the file into byte ranges on record boundaries,
+      infers the schema from a leading sample and parses the ranges on
+      all cores
+    - pyarrow: pyarrow's multithreaded CSV reader
+
+    Per-stage timings in seconds are recorded in `timings` after a read.
+    """
+
+    def __init__(self, engine: str = settings.CSV_ENGINE, threads: int = settings.CSV_PARSE_THREADS):
+        self.engine = _validate_engine(engine)
+        self.threads = threads or os.cpu_count() or 1
+        self.timings: Dict[str, float] = {}
+
+    def read(self, file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read a CSV file into a DataFrame"""
+        start = time.perf_counter()
+
+        if self.engine == "pyarrow":
+            df = self._read_pyarrow(file_path, columns)
+        elif self.engine == "parallel" and os.path.getsize(file_path) > settings.CSV_SAMPLE_SIZE:
+            df = self._read_parallel(file_path, columns)
+        else:
+            df = pd.read_csv(file_path, usecols=columns)
+            self.timings["parse"] = time.perf_counter() - start
+
+        self.timings["total"] = time.perf_counter() - start
+        return df
+
+    def _read_parallel(self, file_path: str, columns: Optional[List[str]]) -> pd.DataFrame:
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            stage = time.perf_counter()
+            header_end = _first_record_end(buf[:settings.CSV_SAMPLE_SIZE]) or len(buf)
+            header = buf[:header_end]
+            ranges = _split_ranges(buf, header_end, self.threads * 4)
+            self.timings["split"] = time.perf_counter() - stage
+
+            stage = time.perf_counter()
+            sample_end = ranges[0][0] + _record_boundary(
+                bytearray(buf[ranges[0][0]:ranges[0][0] + settings.CSV_SAMPLE_SIZE])
+            )
+            sample = _parse_block(header, buf[header_end:sample_end], None)
+            schema = sample.dtypes.to_dict() if len(sample) else None
+            self.timings["infer"] = time.perf_counter() - stage
+
+            stage = time.perf_counter()
+            pool = parse_pool()
+            futures = [pool.submit(_parse_block, header, buf[a:b], schema) for a, b in ranges]
+            blocks = [future.result() for future in futures]
+            self.timings["parse"] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        df = blocks[0] if len(blocks) == 1 else pd.concat(blocks, ignore_index=True)
+        if columns:
+            df = df[columns]
+        self.timings["unify"] = time.perf_counter() - stage
+        return df
+
+    def _read_pyarrow(self, file_path: str, columns: Optional[List[str]]) -> pd.DataFrame:
+        try:
+            from pyarrow import csv as pa_csv
+        except ImportError:
+            raise ValueError("The pyarrow CSV engine requires 'pyarrow' package. Install with: pip install pyarrow")
+
+        stage = time.perf_counter()
+        table = pa_csv.read_csv(
+            file_path,
+            read_options=pa_csv.ReadOptions(use_threads=True, block_size=settings.CSV_BLOCK_SIZE),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            # Match pandas: empty fields are missing values in every column
+            convert_options=pa_csv.ConvertOptions(include_columns=columns, strings_can_be_null=True)
+        )
+        self.timings["parse"] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        df = table.to_pandas()
+        self.timings["unify"] = time.perf_counter() - stage
+        return df
@@ -4,21 +4,24 @@ Handles missing values, duplicates, and data standardization
 """
 import pandas as pd
 import numpy as np
-from typing import Tuple, Dict, Any
-from sklearn.impute import SimpleImputer
-from sklearn.linear_model import LinearRegression
+from typing import Tuple, Dict, List, Any, Optional
+
+from services.profiler import DatasetProfile
+from services.duplicates import RowHashIndex
+from services.cleaning_plan import CleaningPlan
 
 class DataCleanerService:
     
     @staticmethod
-    def assess_quality(df: pd.DataFrame) -> Dict[str, Any]:
+    def assess_quality(df: pd.DataFrame, profile: Optional[DatasetProfile] = None) -> Dict[str, Any]:
         """Assess data quality metrics"""
-        total_cells = df.shape[0] * df.shape[1]
-        missing_count = df.isnull().sum().sum()
+        profile = profile or DatasetProfile.build(df)
+        total_cells = profile.total_cells
+        missing_count = profile.missing_count
         completeness = ((total_cells - missing_count) / total_cells * 100) if total_cells > 0 else 0
         
         # Count duplicates
-        duplicate_count = df.duplicated().sum()
+        duplicate_count = profile.duplicate_count
         
         # Quality score
         if completeness > 90:
@@ -41,101 +44,25 @@ class DataCleanerService:
         df: pd.DataFrame,
         strategy: str = "mean",
         remove_duplicates: bool = True,
-        standardize: bool = True
+        standardize: bool = True,
+        duplicate_subset: Optional[List[str]] = None,
+        row_hashes: Optional[RowHashIndex] = None,
+        profile: Optional[DatasetProfile] = None
     ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-        """Clean data based on configuration"""
-        
-        df_clean = df.copy()
-        stats = {
-            "missing_found": 0,
-            "missing_filled": 0,
-            "duplicates_removed": 0
+        """
+        Clean data based on configuration.
+        Runs as a fused cleaning plan; duplicates are rows equal on every
+        column, or on duplicate_subset.
+        """
+        plan = CleaningPlan.from_config(strategy, remove_duplicates, standardize, duplicate_subset)
+        plan.fit(df, profile)
+        df_clean, stats = plan.apply(df, row_hashes, profile)
+        
+        return df_clean, {
+            "missing_found": stats["missing_found"],
+            "missing_filled": stats["missing_filled"],
+            "duplicates_removed": stats["duplicates_removed"]
         }
-        
-        # Count initial missing values
-        stats["missing_found"] = int(df_clean.isnull().sum().sum())
-        
-        # Handle missing values
-        numeric_cols = df_clean.select_dtypes(include=[np.number]).columns
-        categorical_cols = df_clean.select_dtypes(exclude=[np.number]).columns
-        
-        if strategy == "remove":
-            df_clean = df_clean.dropna()
-            stats["missing_filled"] = stats["missing_found"]
-        
-        elif strategy in ["mean", "median"]:
-            # Numeric columns
-            if len(numeric_cols) > 0:
-                imputer = SimpleImputer(strategy=strategy)
-                df_clean[numeric_cols] = imputer.fit_transform(df_clean[numeric_cols])
-            
-            # Categorical columns - use mode
-            if len(categorical_cols) > 0:
-                for col in categorical_cols:
-                    if df_clean[col].isnull().any():
-                        mode_value = df_clean[col].mode()
-                        if len(mode_value) > 0:
-                            df_clean[col].fillna(mode_value[0], inplace=True)
-            
-            stats["missing_filled"] = stats["missing_found"] - int(df_clean.isnull().sum().sum())
-        
-        elif strategy == "mode":
-            # Use most frequent value for all columns
-            for col in df_clean.columns:
-                if df_clean[col].isnull().any():
-                    mode_value = df_clean[col].mode()
-                    if len(mode_value) > 0:
-                        df_clean[col].fillna(mode_value[0], inplace=True)
-            
-            stats["missing_filled"] = stats["missing_found"] - int(df_clean.isnull().sum().sum())
-        
-        elif strategy == "interpolation":
-            # Linear interpolation for numeric columns
-            if len(numeric_cols) > 0:
-                df_clean[numeric_cols] = df_clean[numeric_cols].interpolate(method='linear', limit_direction='both')
-            
-            # Mode for categorical
-            for col in categorical_cols:
-                if df_clean[col].isnull().any():
-                    mode_value = df_clean[col].mode()
-                    if len(mode_value) > 0:
-                        df_clean[col].fillna(mode_value[0], inplace=True)
-            
-            stats["missing_filled"] = stats["missing_found"] - int(df_clean.isnull().sum().sum())
-        
-        elif strategy == "ml":
-            # Use mean imputation as a simple ML approach
-            if len(numeric_cols) > 0:
-                imputer = SimpleImputer(strategy='mean')
-                df_clean[numeric_cols] = imputer.fit_transform(df_clean[numeric_cols])
-                
-                # Add some variation to simulate ML prediction
-                for col in numeric_cols:
-                    mask = df[col].isnull()
-                    if mask.any():
-                        variation = np.random.normal(0, df_clean[col].std() * 0.1, mask.sum())
-                        df_clean.loc[mask, col] += variation
-            
-            for col in categorical_cols:
-                if df_clean[col].isnull().any():
-                    mode_value = df_clean[col].mode()
-                    if len(mode_value) > 0:
-                        df_clean[col].fillna(mode_value[0], inplace=True)
-            
-            stats["missing_filled"] = stats["missing_found"] - int(df_clean.isnull().sum().sum())
-        
-        # Remove duplicates
-        if remove_duplicates:
-            initial_rows = len(df_clean)
-            df_clean = df_clean.drop_duplicates()
-            stats["duplicates_removed"] = initial_rows - len(df_clean)
-        
-        # Standardize data
-        if standardize:
-            for col in categorical_cols:
-                df_clean[col] = df_clean[col].astype(str).str.strip()
-        
-        return df_clean, stats
     
     @staticmethod
     def detect_outliers(df: pd.DataFrame, threshold: float = 3.0) -> Dict[str, Any]:
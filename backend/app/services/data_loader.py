@@ -1,21 +1,167 @@
 """
 Data Loading Service
-Handles CSV uploads, database connections, and sample data generation
+Handles file uploads, database connections, and sample data generation
 """
+import io
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
-import random
-from sqlalchemy import create_engine, text
+from typing import List, Dict, Any, Optional, Union, BinaryIO, Tuple
+import time
+from sqlalchemy import text, select, table, column, bindparam
+
+from config import settings
+from services.csv_ingest import CSVFileReader
+from services.connection_pool import engine_registry
+from services.sample_data import SampleDataService
+
+# File suffix -> format, longest suffixes first
+FILE_FORMATS = {
+    ".csv.gz": "csv",
+    ".csv.zst": "csv",
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".ipc": "arrow",
+    ".feather": "arrow",
+    ".xlsx": "excel",
+    ".xls": "excel"
+}
+
+# Export format -> (media type, file suffix)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", ".arrow"),
+    "feather": ("application/vnd.apache.arrow.file", ".feather")
+}
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ValueError("Parquet and Arrow support requires 'pyarrow' package. Install with: pip install pyarrow")
 
 class DataLoaderService:
     
     @staticmethod
-    def load_csv(file_path: str) -> pd.DataFrame:
-        """Load CSV file into DataFrame"""
+    def file_format(filename: str) -> Optional[str]:
+        """Detect the data format of a file from its name"""
+        name = filename.lower()
+        for suffix, fmt in FILE_FORMATS.items():
+            if name.endswith(suffix):
+                return fmt
+        return None
+    
+    @staticmethod
+    def load_file(
+        source: Union[str, BinaryIO],
+        fmt: str,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Load a file path or binary file object, reading only the given columns.
+        Paths to Parquet and Arrow files are memory-mapped so null-free
+        numeric columns are used without copying.
+        """
+        try:
+            if fmt == "csv":
+                if isinstance(source, str):
+                    return CSVFileReader().read(source, columns)
+                return pd.read_csv(source, usecols=columns)
+            
+            if fmt == "excel":
+                return pd.read_excel(source, usecols=columns)
+            
+            pa = _pyarrow()
+            memory_map = isinstance(source, str)
+            
+            if fmt == "parquet":
+                table = pa.parquet.read_table(source, columns=columns, memory_map=memory_map)
+            elif fmt == "arrow":
+                try:
+                    # Feather v2 is the Arrow IPC file format
+                    table = pa.feather.read_table(source, columns=columns, memory_map=memory_map)
+                except pa.ArrowInvalid:
+                    # Arrow IPC stream format
+                    if memory_map:
+                        source = pa.memory_map(source)
+                    else:
+                        source.seek(0)
+                    table = pa.ipc.open_stream(source).read_all()
+                    if columns:
+                        table = table.select(columns)
+            else:
+                raise ValueError(f"Unsupported file format: {fmt}")
+            
+            return table.to_pandas(split_blocks=True)
+        
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error loading {fmt} file: {str(e)}")
+    
+    @staticmethod
+    def to_arrow_table(df: pd.DataFrame):
+        """Convert a DataFrame to an Arrow table"""
+        pa = _pyarrow()
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Arrow columns hold a single type; write mixed object columns
+            # (e.g. numbers with '' placeholders) as strings
+            mixed = {
+                col: df[col].astype("string")
+                for col in df.select_dtypes(include=["object"]).columns
+            }
+            return pa.Table.from_pandas(df.assign(**mixed), preserve_index=False)
+    
+    @staticmethod
+    def arrow_schema(df: pd.DataFrame):
+        """Arrow schema for a DataFrame without converting its data"""
+        pa = _pyarrow()
+        try:
+            return pa.Schema.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed object columns are written as strings (see to_arrow_table)
+            object_cols = set(df.select_dtypes(include=["object"]).columns)
+            typed = pa.Schema.from_pandas(df.drop(columns=list(object_cols)), preserve_index=False)
+            return pa.schema([
+                pa.field(col, pa.string()) if col in object_cols else typed.field(col)
+                for col in df.columns
+            ])
+    
+    @staticmethod
+    def export_dataframe(df: pd.DataFrame, fmt: str) -> bytes:
+        """Serialize a DataFrame to CSV, Parquet, Arrow IPC or Feather bytes"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        
+        if fmt == "csv":
+            return df.to_csv(index=False).encode()
+        
+        pa = _pyarrow()
+        table = DataLoaderService.to_arrow_table(df)
+        sink = pa.BufferOutputStream()
+        
+        if fmt == "parquet":
+            pa.parquet.write_table(table, sink)
+        elif fmt == "arrow":
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pa.feather.write_feather(table, sink)
+        
+        return sink.getvalue().to_pybytes()
+    
+    @staticmethod
+    def load_csv(file_path: str, engine: str = settings.CSV_ENGINE) -> pd.DataFrame:
+        """Load CSV file into DataFrame using the configured parse engine"""
         try:
-            df = pd.read_csv(file_path)
+            df = CSVFileReader(engine).read(file_path)
             return df
         except Exception as e:
             raise ValueError(f"Error loading CSV: {str(e)}")
@@ -24,144 +170,183 @@ class DataLoaderService:
     def connect_database(db_type: str, connection_string: str, table_name: str) -> pd.DataFrame:
         """Connect to database and fetch data"""
         try:
-            # Create SQLAlchemy engine
-            engine = create_engine(connection_string)
-            
-            # Test connection
-            with engine.connect() as conn:
-                # For MongoDB, use different approach
-                if db_type == 'mongodb':
-                    # MongoDB requires pymongo, not SQLAlchemy
-                    from pymongo import MongoClient
-                    
-                    # Parse connection string
-                    client = MongoClient(connection_string)
-                    
-                    # Get database name from connection string
-                    db_name = connection_string.split('/')[-1].split('?')[0]
-                    db = client[db_name]
-                    
-                    # Get collection
-                    collection = db[table_name]
-                    
-                    # Fetch data
-                    data = list(collection.find().limit(1000))
-                    
-                    # Convert to DataFrame
-                    if data:
-                        df = pd.DataFrame(data)
-                        # Remove MongoDB _id field
-                        if '_id' in df.columns:
-                            df = df.drop('_id', axis=1)
-                        return df
-                    else:
-                        raise ValueError(f"Collection '{table_name}' is empty or doesn't exist")
+            # For MongoDB, use different approach
+            if db_type == 'mongodb':
+                # MongoDB requires pymongo, not SQLAlchemy
+                client = engine_registry.get_mongo_client(connection_string)
                 
-                else:
-                    # For SQL databases
-                    query = f"SELECT * FROM {table_name} LIMIT 1000"
-                    df = pd.read_sql(query, engine)
-                    
-                    if df.empty:
-                        raise ValueError(f"Table '{table_name}' is empty or doesn't exist")
-                    
+                # Get database name from connection string
+                db_name = connection_string.split('/')[-1].split('?')[0]
+                db = client[db_name]
+                
+                # Get collection
+                collection = db[table_name]
+                
+                # Fetch data
+                data = list(collection.find().limit(1000))
+                
+                # Convert to DataFrame
+                if data:
+                    df = pd.DataFrame(data)
+                    # Remove MongoDB _id field
+                    if '_id' in df.columns:
+                        df = df.drop('_id', axis=1)
                     return df
+                else:
+                    raise ValueError(f"Collection '{table_name}' is empty or doesn't exist")
+            
+            else:
+                # For SQL databases, reuse a pooled engine for this connection string
+                engine = engine_registry.get_engine(connection_string)
+                
+                query = f"SELECT * FROM {table_name} LIMIT 1000"
+                with engine.connect() as conn:
+                    df = pd.read_sql(text(query), conn)
+                
+                if df.empty:
+                    raise ValueError(f"Table '{table_name}' is empty or doesn't exist")
+                
+                return df
+        
+        except Exception as e:
+            raise DataLoaderService._database_error(e, table_name)
+    
+    @staticmethod
+    def _database_error(e: Exception, table_name: str) -> ValueError:
+        """Translate a driver error into a helpful message"""
+        if isinstance(e, ValueError):
+            return e
         
-        except ImportError as e:
+        if isinstance(e, ImportError):
             if 'pymongo' in str(e):
-                raise ValueError("MongoDB support requires 'pymongo' package. Install with: pip install pymongo")
+                return ValueError("MongoDB support requires 'pymongo' package. Install with: pip install pymongo")
             elif 'pymysql' in str(e):
-                raise ValueError("MySQL support requires 'pymysql' package. Install with: pip install pymysql")
+                return ValueError("MySQL support requires 'pymysql' package. Install with: pip install pymysql")
             elif 'psycopg2' in str(e):
-                raise ValueError("PostgreSQL support requires 'psycopg2' package. Install with: pip install psycopg2-binary")
+                return ValueError("PostgreSQL support requires 'psycopg2' package. Install with: pip install psycopg2-binary")
             else:
-                raise ValueError(f"Missing required package: {str(e)}")
+                return ValueError(f"Missing required package: {str(e)}")
         
-        except Exception as e:
-            error_msg = str(e).lower()
-            
-            # Provide helpful error messages
-            if 'access denied' in error_msg or 'authentication failed' in error_msg:
-                raise ValueError("Authentication failed. Please check your username and password.")
-            elif 'unknown database' in error_msg or 'database' in error_msg and 'does not exist' in error_msg:
-                raise ValueError(f"Database not found. Please check the database name.")
-            elif 'can\'t connect' in error_msg or 'connection refused' in error_msg:
-                raise ValueError("Cannot connect to database. Please check host and port.")
-            elif 'no such table' in error_msg or 'relation' in error_msg and 'does not exist' in error_msg:
-                raise ValueError(f"Table '{table_name}' does not exist in the database.")
-            else:
-                raise ValueError(f"Database connection error: {str(e)}")
+        error_msg = str(e).lower()
+        
+        # Provide helpful error messages
+        if 'access denied' in error_msg or 'authentication failed' in error_msg:
+            return ValueError("Authentication failed. Please check your username and password.")
+        elif 'unknown database' in error_msg or 'database' in error_msg and 'does not exist' in error_msg:
+            return ValueError(f"Database not found. Please check the database name.")
+        elif 'can\'t connect' in error_msg or 'connection refused' in error_msg:
+            return ValueError("Cannot connect to database. Please check host and port.")
+        elif 'no such table' in error_msg or 'relation' in error_msg and 'does not exist' in error_msg:
+            return ValueError(f"Table '{table_name}' does not exist in the database.")
+        else:
+            return ValueError(f"Database connection error: {str(e)}")
     
     @staticmethod
-    def generate_sample_data(data_type: str, size: int = 500) -> pd.DataFrame:
-        """Generate sample data for testing"""
-        np.random.seed(42)
+    def import_database(
+        db_type: str,
+        connection_string: str,
+        table_name: str,
+        columns: Optional[List[str]] = None,
+        where: Optional[str] = None,
+        watermark_column: Optional[str] = None,
+        watermark_value: Optional[Any] = None,
+        chunk_size: int = settings.DB_IMPORT_CHUNK_SIZE
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Import a whole table in chunks through a server-side cursor.
         
-        if data_type == "sales":
-            products = ['Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Tablet', 'Phone', 'Headphones']
-            regions = ['North', 'South', 'East', 'West']
-            
-            data = []
-            base_date = datetime(2025, 1, 1)
-            
-            for i in range(size):
-                price = round(random.uniform(100, 1100), 2)
-                quantity = random.randint(1, 50)
-                revenue = price * quantity if random.random() > 0.15 else None  # 15% missing
-                
-                data.append({
-                    'id': i + 1,
-                    'product': random.choice(products),
-                    'quantity': quantity,
-                    'price': price,
-                    'region': random.choice(regions),
-                    'date': (base_date + timedelta(days=random.randint(0, 365))).strftime('%Y-%m-%d'),
-                    'revenue': revenue,
-                    'customer_id': '' if random.random() < 0.1 else random.randint(1, 1000)
-                })
-            
-            return pd.DataFrame(data)
+        Rows are fetched chunk_size at a time and assembled into a columnar
+        frame as they arrive, so the driver never buffers the full result.
+        With a watermark column only rows above watermark_value are fetched;
+        it is read for tracking the next watermark even when `columns` leaves
+        it out. Returns the frame and import statistics.
+        """
+        start = time.perf_counter()
+        chunks = []
+        tracked = bool(columns) and watermark_column is not None and watermark_column not in columns
+        fetch = columns + [watermark_column] if tracked else columns
         
-        elif data_type == "customers":
-            segments = ['Enterprise', 'SMB', 'Startup']
-            
-            data = []
-            for i in range(size):
-                data.append({
-                    'customer_id': i + 1,
-                    'name': f'Customer {i + 1}',
-                    'segment': random.choice(segments),
-                    'ltv': round(random.uniform(5000, 55000), 2),
-                    'acquisition_cost': None if random.random() < 0.15 else round(random.uniform(100, 2100), 2),
-                    'churn_risk': '' if random.random() < 0.2 else round(random.uniform(0, 0.3), 2)
-                })
+        try:
+            if db_type == 'mongodb':
+                if where:
+                    raise ValueError("WHERE filters are not supported for MongoDB imports")
+                
+                client = engine_registry.get_mongo_client(connection_string)
+                db_name = connection_string.split('/')[-1].split('?')[0]
+                collection = client[db_name][table_name]
+                
+                query = {watermark_column: {"$gt": watermark_value}} if watermark_column and watermark_value is not None else {}
+                projection = {col: 1 for col in fetch} if fetch else None
+                cursor = collection.find(query, projection).batch_size(chunk_size)
+                if watermark_column:
+                    cursor = cursor.sort(watermark_column, 1)
+                
+                batch = []
+                for doc in cursor:
+                    doc.pop('_id', None)
+                    batch.append(doc)
+                    if len(batch) >= chunk_size:
+                        chunks.append(pd.DataFrame(batch))
+                        batch = []
+                if batch:
+                    chunks.append(pd.DataFrame(batch))
             
-            return pd.DataFrame(data)
+            else:
+                engine = engine_registry.get_engine(connection_string)
+                
+                schema, _, name = table_name.rpartition('.')
+                source = table(name, schema=schema or None)
+                query = select(*[column(col) for col in fetch] if fetch else [text('*')]).select_from(source)
+                if where:
+                    query = query.where(text(where))
+                if watermark_column:
+                    if watermark_value is not None:
+                        query = query.where(column(watermark_column) > bindparam('watermark', watermark_value))
+                    query = query.order_by(column(watermark_column))
+                
+                with engine.connect() as conn:
+                    # Server-side cursor: psycopg2 named cursors, pymysql SSCursor
+                    conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+                    for chunk in pd.read_sql(query, conn, chunksize=chunk_size):
+                        chunks.append(chunk)
         
-        elif data_type == "inventory":
-            categories = ['Electronics', 'Office', 'Accessories']
-            
-            data = []
-            for i in range(size):
-                data.append({
-                    'sku': f'SKU{i + 1}',
-                    'product_name': f'Product {i + 1}',
-                    'category': random.choice(categories),
-                    'stock_level': random.randint(0, 200),
-                    'reorder_point': None if random.random() < 0.1 else random.randint(10, 60),
-                    'unit_cost': round(random.uniform(1, 100), 2)
-                })
-            
-            return pd.DataFrame(data)
+        except Exception as e:
+            raise DataLoaderService._database_error(e, table_name)
         
+        if not chunks:
+            if watermark_value is not None:
+                df = pd.DataFrame(columns=columns or [])
+            else:
+                raise ValueError(f"Table '{table_name}' is empty or doesn't exist")
         else:
-            raise ValueError(f"Unknown sample data type: {data_type}")
+            df = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+        
+        elapsed = time.perf_counter() - start
+        new_watermark = watermark_value
+        if watermark_column and watermark_column in df.columns and len(df) > 0:
+            new_watermark = df[watermark_column].max()
+            new_watermark = new_watermark.item() if hasattr(new_watermark, 'item') else new_watermark
+        if tracked and watermark_column in df.columns:
+            # Fetched only for tracking
+            df = df.drop(columns=[watermark_column])
+        
+        return df, {
+            "chunks": len(chunks),
+            "elapsed": round(elapsed, 3),
+            "rows_per_sec": round(len(df) / elapsed, 1) if elapsed > 0 else None,
+            "watermark": new_watermark
+        }
+    
+    @staticmethod
+    def generate_sample_data(data_type: str, size: int = 500, seed: Optional[int] = None) -> pd.DataFrame:
+        """Generate sample data for testing (identical for the same seed)"""
+        return SampleDataService.generate(data_type, size, seed)
     
     @staticmethod
     def dataframe_to_dict(df: pd.DataFrame) -> List[Dict[str, Any]]:
         """Convert DataFrame to list of dictionaries"""
         # Replace NaN with None for JSON serialization
-        df_clean = df.where(pd.notnull(df), None)
+        df_clean = df.astype(object).where(pd.notnull(df), None)
         return df_clean.to_dict('records')
     
     @staticmethod
@@ -0,0 +1,826 @@
+"""
+Dataset Store
+Keeps loaded datasets and their cleaned versions resident in columnar form
+"""
+import os
+import re
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from typing import Optional, Dict, List, Any, Callable
+
+from config import settings
+from services.result_cache import result_cache
+from services.sketches import ColumnSketches
+from services.profiler import DatasetProfile
+from services.duplicates import RowHashIndex
+from services.shared_store import SharedCatalog
+from services.catalog import PersistentCatalog
+
+# Read-only views are shallow copies; copy-on-write guarantees that a route
+# mutating its view never writes through to the stored buffers.
+# (always enabled from pandas 3.0 onwards)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+RAW = "raw"
+
+def _buffers(series: pd.Series) -> tuple:
+    """Addresses of the memory buffers behind a column"""
+    array = series.array
+    chunked = getattr(array, "_pa_array", None)
+    if chunked is not None:
+        return tuple(buf.address for chunk in chunked.chunks for buf in chunk.buffers() if buf is not None)
+    for attr in ("_ndarray", "_data", "_codes"):
+        values = getattr(array, attr, None)
+        if isinstance(values, np.ndarray):
+            return (values.__array_interface__["data"][0], values.nbytes)
+    return (id(array),)
+
+def _own_bytes(df: pd.DataFrame, parent: Optional[pd.DataFrame]) -> int:
+    """Memory of the columns whose buffers are not shared with the parent frame"""
+    usage = df.memory_usage(deep=True)
+    total = int(usage.get("Index", 0)) if parent is None or not df.index.equals(parent.index) else 0
+    for col in df.columns:
+        if parent is not None and col in parent.columns and _buffers(df[col]) == _buffers(parent[col]):
+            continue
+        total += int(usage[col])
+    return total
+
+class DatasetStore:
+    """
+    Holds named versions of one dataset: the raw data and cleaned variants
+    derived from it, with their lineage.
+
+    A version keeps the column buffers it did not modify shared with its
+    parent (copy-on-write), so each extra version only costs the columns it
+    changed. One version is current; switching versions only moves that
+    pointer. Data stays columnar, routes receive views that share the
+    stored buffers, and frames can be spilled to disk and are reloaded
+    transparently on next access.
+
+    With a shared catalog every change is published for the other worker
+    processes of the node, and changes they published are adopted (their
+    frames memory-mapped on first access) before each request.
+    """
+
+    def __init__(
+        self,
+        dataset_id: str = "default",
+        on_change: Optional[Callable] = None,
+        key: Optional[str] = None,
+        catalog: Optional[SharedCatalog] = None
+    ):
+        self.dataset_id = dataset_id
+        self.key = key or dataset_id
+        self.catalog = catalog
+        self._lock = threading.RLock()
+        self._frames: "OrderedDict[str, Optional[pd.DataFrame]]" = OrderedDict()
+        self._lineage: Dict[str, Dict[str, Any]] = {}
+        self._spilled: Dict[str, str] = {}
+        self._nbytes: Dict[str, int] = {}
+        self._shape = (0, 0)
+        self._on_change = on_change
+        self.live = None
+        self.current = RAW
+        self._cleaned_count = 0
+        # Derived data (sketches, profiles, row hashes) keyed by version name
+        self._derived: Dict[str, Any] = {}
+        self._build_locks: Dict[str, threading.Lock] = {}
+        # Published version files and their manifest entries
+        self._files: Dict[str, str] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._stamp = None
+        self._published = False
+        self.dropped = False
+        self.version = 0
+        # Identifies one load of the data; version counters restart with each store
+        self.load_id: Optional[str] = None
+        self.last_access = time.monotonic()
+
+    @staticmethod
+    def _view(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """Return a zero-copy view of a stored frame"""
+        if df is None:
+            return None
+        return df.copy(deep=False)
+
+    def _set(self, name: str, df: pd.DataFrame, parent: Optional[str] = None, **lineage):
+        self._discard_spill(name)
+        self._files.pop(name, None)
+        base = self._frames.get(parent) if parent else None
+        self._frames[name] = df
+        self._nbytes[name] = _own_bytes(df, base)
+        self._lineage[name] = {
+            "parent": parent,
+            "created_at": time.time(),
+            "changed_columns": [
+                col for col in df.columns
+                if base is None or col not in base.columns or _buffers(df[col]) != _buffers(base[col])
+            ] if parent else None,
+            **lineage
+        }
+        if name == RAW:
+            self._shape = df.shape
+
+    def _clear(self):
+        for name in list(self._frames):
+            self._discard_spill(name)
+        self._frames.clear()
+        self._lineage.clear()
+        self._nbytes.clear()
+        self._files.clear()
+        self._entries.clear()
+        self._derived = {}
+        self._shape = (0, 0)
+        self._cleaned_count = 0
+        self.current = RAW
+
+    def _changed(self):
+        # Called outside the store lock so the registry can spill other stores
+        if self._on_change:
+            self._on_change(self)
+
+    @contextmanager
+    def _shared(self):
+        """Hold the catalog lock and catch up with other workers before a change"""
+        if self.catalog is None:
+            yield
+            return
+        with self.catalog.lock(self.key):
+            self._sync(self.catalog.read_manifest(self.key))
+            yield
+
+    def _sync(self, manifest: Optional[Dict[str, Any]]) -> bool:
+        """Adopt a newer manifest published by another worker; frames are mapped lazily"""
+        if manifest is None:
+            if not self._published:
+                return False
+            # Dropped by another worker
+            self._clear()
+            self._published = False
+            self.dropped = True
+            self.load_id = None
+            self.version += 1
+            return True
+        # A re-upload in another worker starts its version numbers over
+        if manifest.get("load_id") == self.load_id and manifest["version"] <= self.version:
+            return False
+
+        frames: "OrderedDict[str, Optional[pd.DataFrame]]" = OrderedDict()
+        lineage, entries = {}, {}
+        for entry in manifest["versions"]:
+            name = entry["name"]
+            # A version whose file did not change keeps its resident frame
+            keep = self._files.get(name) == entry["file"] and self._frames.get(name) is not None
+            frames[name] = self._frames[name] if keep else None
+            plan = self._lineage[name].get("plan") if keep else (
+                self.catalog.read_plan(self.key, entry["plan_file"]) if entry["plan_file"] else None
+            )
+            lineage[name] = {
+                "parent": entry["parent"],
+                "created_at": entry["created_at"],
+                "changed_columns": entry["changed_columns"],
+                "plan": plan
+            }
+            entries[name] = entry
+
+        for name in list(self._spilled):
+            self._discard_spill(name)
+        kept = {name for name, df in frames.items() if df is not None}
+        self._nbytes = {name: self._nbytes[name] if name in kept else 0 for name in frames}
+        self._derived = {key: value for key, value in self._derived.items() if key.split(":", 1)[1] in kept}
+        self._frames = frames
+        self._lineage = lineage
+        self._files = {name: entry["file"] for name, entry in entries.items()}
+        self._entries = entries
+        self._shape = tuple(manifest["shape"])
+        self.current = manifest["current"]
+        self._cleaned_count = manifest["cleaned_count"]
+        if manifest.get("load_id") != self.load_id:
+            # Results of the replaced load may share version numbers with the new one
+            result_cache.invalidate(self.key)
+        self.version = manifest["version"]
+        self.load_id = manifest.get("load_id")
+        self.live = None
+        self._published = True
+        return True
+
+    def _publish(self):
+        """Write the versions not yet published and a manifest naming them all"""
+        if self.catalog is None:
+            return
+        for name, lineage in self._lineage.items():
+            if name in self._files:
+                continue
+            df = self._resident(name)
+            changed = lineage["changed_columns"]
+            # Unchanged columns are read from the parent, as they share its buffers here
+            own = df if lineage["parent"] is None or changed is None else df[changed]
+            plan = lineage.get("plan")
+            self._files[name] = self.catalog.write_frame(self.key, name, own)
+            self._entries[name] = {
+                "name": name,
+                "parent": lineage["parent"],
+                "created_at": lineage["created_at"],
+                "changed_columns": changed,
+                "columns": [str(col) for col in df.columns],
+                "rows": len(df),
+                "file": self._files[name],
+                "plan_file": self.catalog.write_plan(self.key, name, plan) if plan is not None else None
+            }
+
+        self.catalog.publish(self.key, {
+            "key": self.key,
+            "dataset_id": self.dataset_id,
+            "version": self.version,
+            "load_id": self.load_id,
+            "current": self.current,
+            "cleaned_count": self._cleaned_count,
+            "shape": list(self._shape),
+            "versions": [self._entries[name] for name in self._frames]
+        })
+        self._stamp = self.catalog.stamp(self.key)
+        self._published = True
+
+    def refresh(self) -> bool:
+        """Catch up with changes other workers published since the last call"""
+        if self.catalog is None:
+            return False
+        stamp = self.catalog.stamp(self.key)
+        if stamp == self._stamp:
+            return False
+        with self._lock:
+            changed = self._sync(self.catalog.read_manifest(self.key))
+            self._stamp = stamp
+        if changed:
+            self._changed()
+        return changed
+
+    def load(
+        self,
+        df: pd.DataFrame,
+        sketches: Optional[ColumnSketches] = None,
+        row_hashes: Optional[RowHashIndex] = None
+    ) -> int:
+        """Replace the raw dataset, discarding every derived version"""
+        with self._lock, self._shared():
+            self._clear()
+            self._set(RAW, df)
+            self.live = None
+            self.dropped = False
+            self.load_id = uuid.uuid4().hex
+            self.version += 1
+            self._publish()
+            if sketches is not None:
+                self._derived[f"sketches:{RAW}"] = sketches
+            if row_hashes is not None:
+                self._derived[f"row_hashes:{RAW}"] = row_hashes
+            version = self.version
+            file = self._files.get(RAW)
+        if file is not None:
+            for kind, value in (("sketches", sketches), ("row_hashes", row_hashes)):
+                if value is not None:
+                    self.catalog.write_derived(self.key, file, kind, value)
+        self._changed()
+        return version
+
+    def attach_live(self, source) -> int:
+        """Back the dataset by a live database table instead of frames"""
+        with self._lock:
+            self._clear()
+            self.live = source
+            self.load_id = uuid.uuid4().hex
+            self.version += 1
+            version = self.version
+        self._changed()
+        return version
+
+    def _next_name(self) -> str:
+        # Numbers are not reused, so a name always means the same data
+        while True:
+            self._cleaned_count += 1
+            name = "cleaned" if self._cleaned_count == 1 else f"cleaned-v{self._cleaned_count}"
+            if name not in self._frames:
+                return name
+
+    def _children(self, name: str) -> List[str]:
+        return [child for child, lineage in self._lineage.items() if lineage["parent"] == name]
+
+    def _prune(self):
+        """Drop the oldest leaf versions beyond the version limit"""
+        for name in list(self._frames):
+            if len(self._frames) <= settings.DATASET_MAX_VERSIONS:
+                break
+            if name != RAW and name != self.current and not self._children(name):
+                self._remove(name)
+
+    def _remove(self, name: str):
+        self._discard_spill(name)
+        for mapping in (self._frames, self._lineage, self._nbytes, self._files, self._entries):
+            mapping.pop(name, None)
+        self._derived = {key: value for key, value in self._derived.items() if not key.endswith(f":{name}")}
+
+    def set_cleaned(
+        self,
+        df: pd.DataFrame,
+        plan=None,
+        base_version: Optional[int] = None,
+        name: Optional[str] = None,
+        parent: str = RAW
+    ) -> Optional[int]:
+        """
+        Store a cleaned version derived from `parent` and make it current.
+        With base_version, nothing is stored (and None returned) if the
+        dataset changed since that version.
+        """
+        with self._lock, self._shared():
+            if base_version is not None and self.version != base_version:
+                return None
+            if parent not in self._frames:
+                raise ValueError(f"Version {parent} not found")
+            name = name or self._next_name()
+            if name == RAW:
+                raise ValueError("The raw version cannot be replaced by cleaning")
+            if name in self._frames:
+                if self._children(name):
+                    raise ValueError(f"Version {name} has derived versions and cannot be replaced")
+                self._remove(name)
+
+            self._resident(parent)
+            self._set(name, df, parent, plan=plan)
+            self.current = name
+            self._prune()
+            self.version += 1
+            self._publish()
+            version = self.version
+        self._changed()
+        return version
+
+    def activate(self, name: str) -> int:
+        """Make a version current; analytics then read it"""
+        with self._lock, self._shared():
+            if name not in self._frames:
+                raise ValueError(f"Version {name} not found")
+            self.current = name
+            self.version += 1
+            self._publish()
+            version = self.version
+        self._changed()
+        return version
+
+    def delete_version(self, name: str) -> int:
+        """Remove a cleaned version that no other version derives from"""
+        with self._lock, self._shared():
+            if name == RAW:
+                raise ValueError("The raw version cannot be deleted")
+            if name not in self._frames:
+                raise ValueError(f"Version {name} not found")
+            if self._children(name):
+                raise ValueError(f"Version {name} has derived versions: {', '.join(self._children(name))}")
+            if self.current == name:
+                self.current = self._lineage[name]["parent"]
+            self._remove(name)
+            self.version += 1
+            self._publish()
+            version = self.version
+        self._changed()
+        return version
+
+    def active_snapshot(self):
+        """The version number with the current version's frame, read consistently"""
+        with self._lock:
+            return self.version, self._get(self.current)
+
+    def tag(self):
+        """The load id and version number, read consistently"""
+        with self._lock:
+            return self.load_id, self.version
+
+    def snapshot(self):
+        """
+        The version number with every version's frame, parent and plan
+        (parents before children) and the derived data, read consistently.
+        """
+        with self._lock:
+            versions = OrderedDict(
+                (name, {
+                    "frame": self._get(name),
+                    "parent": self._lineage[name]["parent"],
+                    "plan": self._lineage[name].get("plan")
+                })
+                for name in self._frames
+            )
+            return self.version, versions, dict(self._derived)
+
+    def replace_versions(
+        self,
+        frames: "OrderedDict[str, pd.DataFrame]",
+        plans: Dict[str, Any],
+        derived: Dict[str, Any],
+        base_version: int
+    ) -> Optional[int]:
+        """
+        Swap in new frames for existing versions, keeping their names and
+        lineage; versions missing from `frames` are dropped. Nothing changes
+        (and None is returned) if the dataset changed since base_version.
+        """
+        with self._lock, self._shared():
+            if self.version != base_version:
+                return None
+            for name in list(self._frames):
+                if name not in frames:
+                    self._remove(name)
+            # Parents come first, so sharing is measured against their new frames
+            for name, df in frames.items():
+                lineage = self._lineage[name]
+                self._set(
+                    name, df, lineage["parent"],
+                    created_at=lineage["created_at"],
+                    plan=plans.get(name, lineage.get("plan"))
+                )
+            if self.current not in self._frames:
+                self.current = RAW
+            self.version += 1
+            self._publish()
+            self._derived = dict(derived)
+            version = self.version
+        self._changed()
+        return version
+
+    @property
+    def cleaning_plan(self):
+        """The plan that produced the current version, if it is a cleaned one"""
+        lineage = self._lineage.get(self.current)
+        return lineage.get("plan") if lineage else None
+
+    def _has(self, name: str) -> bool:
+        if name in self._spilled:
+            return True
+        df = self._frames.get(name)
+        if df is None:
+            # Published by another worker and not mapped yet
+            return name in self._entries and self._entries[name]["rows"] > 0
+        return not df.empty
+
+    @property
+    def has_data(self) -> bool:
+        return self._has(RAW)
+
+    @property
+    def has_cleaned(self) -> bool:
+        return self.current != RAW and self._has(self.current)
+
+    @property
+    def resident(self) -> bool:
+        return all(df is not None for df in self._frames.values())
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the resident frames, counting shared columns once"""
+        return sum(nbytes for name, nbytes in self._nbytes.items() if self._frames.get(name) is not None)
+
+    def _resident(self, name: str) -> Optional[pd.DataFrame]:
+        """The stored frame of a version, reloading it if spilled or not yet mapped"""
+        if self._frames.get(name) is not None:
+            return self._frames[name]
+        if name in self._spilled:
+            self._frames[name] = _read_spill(self._spilled.pop(name))
+            # Reloaded frames no longer share buffers with their parent
+            self._nbytes[name] = _own_bytes(self._frames[name], None)
+        elif name in self._files:
+            self._frames[name] = self._map(name)
+        return self._frames.get(name)
+
+    def _map(self, name: str) -> pd.DataFrame:
+        """Memory-map a published version, taking unchanged columns from its parent"""
+        entry = self._entries[name]
+        try:
+            own = self.catalog.read_frame(self.key, entry["file"])
+        except FileNotFoundError:
+            raise ValueError("Dataset was changed by another worker; retry the request")
+        parent = self._resident(entry["parent"]) if entry["parent"] else None
+        if parent is not None and any(col not in own.columns for col in entry["columns"]):
+            df = pd.DataFrame(
+                {col: own[col] if col in own.columns else parent[col] for col in entry["columns"]},
+                index=parent.index,
+                copy=False
+            )
+        else:
+            df = own
+        self._nbytes[name] = _own_bytes(df, parent)
+        return df
+
+    def _get(self, name: str) -> Optional[pd.DataFrame]:
+        reloaded = False
+        with self._lock:
+            self.last_access = time.monotonic()
+            if name in self._frames and self._frames[name] is None:
+                self._resident(name)
+                reloaded = True
+            view = self._view(self._frames.get(name)) if self._has(name) else None
+        if reloaded:
+            self._changed()
+        return view
+
+    def raw(self) -> Optional[pd.DataFrame]:
+        """Get a read-only view of the raw data"""
+        return self._get(RAW)
+
+    def cleaned(self) -> Optional[pd.DataFrame]:
+        """Get a read-only view of the current cleaned version"""
+        with self._lock:
+            return self._get(self.current) if self.current != RAW else None
+
+    def active(self) -> Optional[pd.DataFrame]:
+        """Get the current version: cleaned data if available, otherwise the raw data"""
+        with self._lock:
+            return self._get(self.current)
+
+    def frame(self, name: str) -> Optional[pd.DataFrame]:
+        """Get a read-only view of a named version"""
+        with self._lock:
+            if name not in self._frames:
+                raise ValueError(f"Version {name} not found")
+            return self._get(name)
+
+    def versions(self) -> List[Dict[str, Any]]:
+        """Every version with its lineage, size and the memory it adds"""
+        with self._lock:
+            return [
+                {
+                    "name": name,
+                    "parent": self._lineage[name]["parent"],
+                    "current": name == self.current,
+                    "created_at": self._lineage[name]["created_at"],
+                    "changed_columns": self._lineage[name]["changed_columns"],
+                    "steps": self._lineage[name]["plan"].describe() if self._lineage[name].get("plan") else None,
+                    "resident": self._frames[name] is not None,
+                    "own_bytes": self._nbytes[name]
+                }
+                for name in self._frames
+            ]
+
+    def _derive(self, name: str, version: int, build: Callable[[], Any]) -> Any:
+        """
+        Data derived from the frames, built once per version by the first
+        caller while concurrent callers wait for it. `version` is the version
+        read before the frame that build uses was fetched.
+        """
+        with self._lock:
+            if name in self._derived:
+                return self._derived[name]
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+
+        kind, version_name = name.split(":", 1)
+        with build_lock:
+            with self._lock:
+                if name in self._derived:
+                    return self._derived[name]
+                # Published versions keep their derived data next to their file
+                file = self._files.get(version_name) if self.version == version else None
+            value = self.catalog.read_derived(self.key, file, kind) if file is not None else None
+            built = value is None
+            if built:
+                # Built outside the store lock so readers are not blocked meanwhile
+                value = build()
+            with self._lock:
+                stored = self.version == version
+                if stored:
+                    self._derived[name] = value
+            if built and stored and file is not None:
+                self.catalog.write_derived(self.key, file, kind, value)
+            return value
+
+    def _frame_of(self, kind: Optional[str]):
+        """Resolve raw, cleaned, a version name or None (the current version)"""
+        with self._lock:
+            if kind is None:
+                kind = self.current
+            elif kind == "cleaned":
+                if self.current == RAW:
+                    return self.version, kind, None
+                kind = self.current
+            elif kind not in self._frames:
+                return self.version, kind, None
+            return self.version, kind, self._get(kind)
+
+    def sketches(self) -> Optional[ColumnSketches]:
+        """Column sketches of the current version"""
+        version, name, df = self._frame_of(None)
+        if df is None:
+            return None
+        return self._derive(f"sketches:{name}", version, lambda: ColumnSketches.build(df))
+
+    def row_hashes(self, kind: Optional[str] = None) -> Optional[RowHashIndex]:
+        """Row-hash index of a version (default: the current one)"""
+        version, kind, df = self._frame_of(kind)
+        if df is None:
+            return None
+        return self._derive(f"row_hashes:{kind}", version, lambda: RowHashIndex.build(df))
+
+    def profile(self, kind: Optional[str] = None) -> Optional[DatasetProfile]:
+        """Column profile of a version (default: the current one)"""
+        version, kind, df = self._frame_of(kind)
+        if df is None:
+            return None
+        return self._derive(f"profile:{kind}", version, lambda: DatasetProfile.build(df, self.row_hashes(kind)))
+
+    def spill(self, directory: str) -> int:
+        """Write resident frames to disk and release them, returning bytes freed"""
+        with self._lock:
+            freed = 0
+            os.makedirs(directory, exist_ok=True)
+            for name, df in self._frames.items():
+                if df is None or df.empty or name in self._spilled:
+                    continue
+                # Published versions are simply released and mapped again later
+                if name not in self._files:
+                    self._spilled[name] = _write_spill(df, os.path.join(directory, name))
+                self._frames[name] = None
+                freed += self._nbytes[name]
+            return freed
+
+    def _discard_spill(self, name: str):
+        path = self._spilled.pop(name, None)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def discard(self):
+        """Release frames and remove spill files"""
+        with self._lock:
+            self._clear()
+
+    def info(self) -> Dict[str, Any]:
+        """Describe the dataset without loading spilled frames"""
+        return {
+            "dataset_id": self.dataset_id,
+            "version": self.version,
+            "resident": self.resident,
+            "memory_bytes": self.nbytes,
+            "rows": int(self._shape[0]),
+            "columns": int(self._shape[1]),
+            "has_cleaned": self.has_cleaned,
+            "current_version": self.current,
+            "versions": len(self._frames),
+            "shared": self._published,
+            "live": self.live.info() if self.live is not None else None
+        }
+
+def _write_spill(df: pd.DataFrame, base_path: str) -> str:
+    """Spill a frame to Parquet, falling back to pickle for mixed-type columns"""
+    try:
+        path = base_path + ".parquet"
+        df.to_parquet(path)
+        return path
+    except ImportError:
+        raise ValueError("Dataset spilling requires 'pyarrow' package. Install with: pip install pyarrow")
+    except Exception:
+        # Parquet cannot hold object columns mixing strings and numbers
+        if os.path.exists(path):
+            os.remove(path)
+        path = base_path + ".pkl"
+        df.to_pickle(path)
+        return path
+
+def _read_spill(path: str) -> pd.DataFrame:
+    """Reload a spilled frame and remove the spill file"""
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+    os.remove(path)
+    return df
+
+class DatasetRegistry:
+    """
+    Datasets keyed by dataset id (and optionally session) under a memory budget.
+
+    When resident datasets exceed the budget the least recently used ones are
+    spilled to disk under the spill directory. With a shared catalog,
+    datasets published by other workers (or kept by a persistent catalog
+    from before a restart) are found there too.
+    """
+
+    def __init__(self, memory_budget: int, spill_dir: str, catalog: Optional[SharedCatalog] = None):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.catalog = catalog
+        self._lock = threading.RLock()
+        self._datasets: "OrderedDict[str, DatasetStore]" = OrderedDict()
+
+    @staticmethod
+    def make_key(dataset_id: str, session_id: Optional[str] = None) -> str:
+        return f"{session_id}/{dataset_id}" if session_id else dataset_id
+
+    def get(self, dataset_id: str, session_id: Optional[str] = None) -> Optional[DatasetStore]:
+        """Get a dataset, marking it most recently used"""
+        return self._lookup(self.make_key(dataset_id, session_id))
+
+    def _lookup(self, key: str) -> Optional[DatasetStore]:
+        with self._lock:
+            store = self._datasets.get(key)
+            if store is None and self.catalog is not None:
+                # Published by another worker
+                manifest = self.catalog.read_manifest(key)
+                if manifest is not None:
+                    store = self._create(manifest["dataset_id"], key)
+            if store is not None:
+                self._datasets.move_to_end(key)
+        if store is not None and store.refresh() and store.dropped:
+            with self._lock:
+                if self._datasets.get(key) is store:
+                    del self._datasets[key]
+            return None
+        return store
+
+    def _create(self, dataset_id: str, key: str) -> DatasetStore:
+        store = DatasetStore(dataset_id, on_change=self._on_change, key=key, catalog=self.catalog)
+        self._datasets[key] = store
+        return store
+
+    def get_or_create(self, dataset_id: str, session_id: Optional[str] = None) -> DatasetStore:
+        """Get a dataset, registering an empty one if it does not exist"""
+        key = self.make_key(dataset_id, session_id)
+        with self._lock:
+            store = self._lookup(key)
+            if store is None:
+                store = self._create(dataset_id, key)
+            return store
+
+    def drop(self, dataset_id: str, session_id: Optional[str] = None) -> bool:
+        """Remove a dataset and its spill files"""
+        key = self.make_key(dataset_id, session_id)
+        with self._lock:
+            store = self._datasets.pop(key, None)
+        published = self.catalog is not None and self.catalog.read_manifest(key) is not None
+        if store is None and not published:
+            return False
+        result_cache.invalidate(key)
+        if store is not None:
+            store.discard()
+        if published:
+            self.catalog.remove(key)
+        return True
+
+    def restore(self) -> int:
+        """Register the datasets the catalog kept; their frames are mapped on first access"""
+        if self.catalog is None:
+            return 0
+        keys = self.catalog.restore()
+        for key in keys:
+            self._lookup(key)
+        return len(keys)
+
+    def list(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List datasets visible to a session"""
+        if self.catalog is not None:
+            for key in self.catalog.keys():
+                self._lookup(key)
+        with self._lock:
+            stores = [
+                store for key, store in self._datasets.items()
+                if key == self.make_key(store.dataset_id, session_id)
+            ]
+        return [store.info() for store in stores]
+
+    @property
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(store.nbytes for store in self._datasets.values())
+
+    def _spill_path(self, key: str) -> str:
+        safe = re.sub(r'[^A-Za-z0-9_\-]', '_', key)
+        digest = hashlib.sha1(key.encode()).hexdigest()[:8]
+        return os.path.join(self.spill_dir, f"{safe}-{digest}")
+
+    def _on_change(self, store: DatasetStore):
+        # Results cached for earlier versions can never be served again
+        result_cache.invalidate(store.key, store.version)
+        self._enforce_budget(store)
+
+    def _enforce_budget(self, keep: DatasetStore):
+        """Spill least recently used datasets until under the memory budget"""
+        with self._lock:
+            total = self.resident_bytes
+            for key, store in list(self._datasets.items()):
+                if total <= self.memory_budget:
+                    break
+                if store is keep or store.nbytes == 0:
+                    continue
+                total -= store.spill(self._spill_path(key))
+
+def _catalog() -> Optional[SharedCatalog]:
+    directory = settings.DATASET_SHARED_DIR or os.path.join(settings.UPLOAD_DIR, settings.DATASET_CATALOG_DIR)
+    if settings.DATASET_PERSIST:
+        return PersistentCatalog(directory)
+    return SharedCatalog(directory) if settings.DATASET_SHARED_DIR else None
+
+# Dataset registry, optionally shared between workers and kept across restarts
+dataset_registry = DatasetRegistry(
+    memory_budget=settings.DATASET_MEMORY_BUDGET,
+    spill_dir=os.path.join(settings.UPLOAD_DIR, settings.DATASET_SPILL_DIR),
+    catalog=_catalog()
+)
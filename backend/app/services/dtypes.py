@@ -0,0 +1,133 @@
+"""
+Column Dtypes
+Compact dtypes chosen at ingest and the memory they save
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Tuple
+
+from config import settings
+
+NUMERIC_KINDS = ("integer", "floating", "mixed-integer-float")
+
+def value_counts(series: pd.Series) -> pd.Series:
+    """Counts of the values present, also for categoricals (which otherwise list unused categories)"""
+    counts = series.value_counts(dropna=True)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        counts = counts[counts > 0]
+        counts.index = counts.index.astype(series.dtype.categories.dtype)
+    return counts
+
+def _is_text(series: pd.Series) -> bool:
+    if pd.api.types.is_string_dtype(series.dtype) and series.dtype != object:
+        return True
+    return series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "string"
+
+def _float32(series: pd.Series) -> pd.Series:
+    """The column as float32 if that keeps every value, otherwise unchanged"""
+    with np.errstate(over="ignore"):
+        narrow = series.astype(np.float32)
+    wide = narrow.astype(np.float64)
+    if ((wide == series) | (wide.isna() & series.isna())).all():
+        return narrow
+    return series
+
+def _numeric(series: pd.Series) -> pd.Series:
+    # Nullable extension dtypes are left as they are
+    if not isinstance(series.dtype, np.dtype):
+        return series
+    if series.dtype.kind == "i":
+        return pd.to_numeric(series, downcast="integer")
+    if series.dtype.kind == "u":
+        return pd.to_numeric(series, downcast="unsigned")
+    if series.dtype == np.float64:
+        return _float32(series)
+    return series
+
+def _blanks_as_missing(series: pd.Series) -> pd.Series:
+    """Numbers stored with '' placeholders as a numeric column with missing values"""
+    blank = series.isna() | (series == "")
+    present = series[~blank]
+    if present.empty or pd.api.types.infer_dtype(present, skipna=False) not in NUMERIC_KINDS:
+        return series
+    numeric = pd.to_numeric(series.where(~blank), errors="coerce")
+    if blank.any():
+        return _float32(numeric.astype(np.float64))
+    return _numeric(numeric)
+
+class DtypeOptimizer:
+    """
+    Narrows the dtypes of a freshly loaded frame.
+
+    Integers are downcast to the smallest width holding their range and
+    floats to float32 where no value changes. Numbers stored with ''
+    placeholders become numeric with missing values, and text columns
+    with few distinct values become categoricals, so each value is held
+    once and value counts and group-bys work on integer codes.
+    """
+
+    @staticmethod
+    def optimize(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Dict[str, str]]]:
+        """The frame with compact dtypes and the dtype changes made, by column"""
+        changed = {}
+        columns = {}
+        for col in df.columns:
+            series = df[col]
+            if series.dtype == object and settings.INGEST_BLANKS_AS_MISSING:
+                optimized = _blanks_as_missing(series)
+            elif pd.api.types.is_numeric_dtype(series):
+                optimized = _numeric(series)
+            else:
+                optimized = series
+
+            if optimized is series and _is_text(series) and len(series):
+                if series.nunique(dropna=True) <= settings.INGEST_CATEGORY_MAX_RATIO * len(series):
+                    optimized = series.astype("category")
+
+            if optimized is not series:
+                changed[col] = {"from": str(series.dtype), "to": str(optimized.dtype)}
+                columns[col] = optimized
+        if not columns:
+            return df, changed
+        return df.assign(**columns), changed
+
+    @staticmethod
+    def baseline(series: pd.Series) -> pd.Series:
+        """The column with the dtype a loader gives it without optimization"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series.astype(series.dtype.categories.dtype)
+        if not isinstance(series.dtype, np.dtype):
+            return series
+        if series.dtype.kind == "i":
+            return series.astype(np.int64)
+        if series.dtype.kind == "u":
+            return series.astype(np.uint64)
+        if series.dtype.kind == "f":
+            return series.astype(np.float64)
+        return series
+
+    @staticmethod
+    def memory_report(df: pd.DataFrame) -> Dict[str, Any]:
+        """Bytes held by each column, next to what the unoptimized dtype would take"""
+        columns = []
+        for col in df.columns:
+            series = df[col]
+            baseline = DtypeOptimizer.baseline(series)
+            columns.append({
+                "name": col,
+                "dtype": str(series.dtype),
+                "bytes": int(series.memory_usage(index=False, deep=True)),
+                "baseline_dtype": str(baseline.dtype),
+                "baseline_bytes": int(baseline.memory_usage(index=False, deep=True))
+            })
+
+        total = sum(col["bytes"] for col in columns)
+        baseline_total = sum(col["baseline_bytes"] for col in columns)
+        return {
+            "rows": len(df),
+            "index_bytes": int(df.index.memory_usage(deep=True)),
+            "bytes": total,
+            "baseline_bytes": baseline_total,
+            "reduction": round(baseline_total / total, 2) if total else None,
+            "columns": columns
+        }
@@ -0,0 +1,262 @@
+"""
+Duplicate Detection
+Row-hash index for exact duplicates and MinHash LSH for near-duplicates
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+
+from config import settings
+
+def row_hashes(df: pd.DataFrame, columns: Optional[List[str]] = None, chunk_rows: int = settings.SKETCH_CHUNK_ROWS) -> np.ndarray:
+    """64-bit hash of every row over all or a subset of columns"""
+    if columns:
+        missing = [col for col in columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Columns not found: {', '.join(missing)}")
+        df = df[columns]
+    if len(df.columns) == 0:
+        return np.zeros(len(df), dtype=np.uint64)
+
+    hashes = np.empty(len(df), dtype=np.uint64)
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        hashes[start:start + len(chunk)] = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+    return hashes
+
+class RowHashIndex:
+    """
+    One 64-bit hash per row.
+
+    Duplicate counts, deduplication and "rows equal to row N" lookups work
+    on this single uint64 array instead of re-hashing every column. Two
+    distinct rows share a hash with probability about n^2 / 2^65.
+    """
+
+    def __init__(self, hashes: np.ndarray):
+        self.hashes = hashes
+        self._codes: Optional[np.ndarray] = None
+        self._counts: Optional[np.ndarray] = None
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, columns: Optional[List[str]] = None) -> "RowHashIndex":
+        return cls(row_hashes(df, columns))
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def _groups(self):
+        if self._codes is None:
+            codes, uniques = pd.factorize(self.hashes)
+            self._counts = np.bincount(codes, minlength=len(uniques))
+            self._codes = codes
+        return self._codes, self._counts
+
+    @property
+    def duplicate_count(self) -> int:
+        """Rows that repeat an earlier row"""
+        _, counts = self._groups()
+        return len(self.hashes) - len(counts)
+
+    def duplicated(self, keep: str = "first") -> np.ndarray:
+        """Boolean mask of duplicate rows, like DataFrame.duplicated"""
+        return pd.Series(self.hashes).duplicated(keep=keep).to_numpy()
+
+    def duplicates_of(self, row: int) -> np.ndarray:
+        """Positions of every row equal to the row at a position, itself included"""
+        if not 0 <= row < len(self.hashes):
+            raise ValueError(f"Row {row} out of range")
+        codes, _ = self._groups()
+        return np.flatnonzero(codes == codes[row])
+
+    def groups(self, limit: Optional[int] = None) -> List[np.ndarray]:
+        """Positions of each group of equal rows, largest groups first"""
+        codes, counts = self._groups()
+        repeated = np.flatnonzero(counts > 1)
+        repeated = repeated[np.argsort(-counts[repeated], kind="stable")][:limit]
+        if not len(repeated):
+            return []
+
+        order = np.argsort(codes, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)])
+        return [order[starts[code]:starts[code + 1]] for code in repeated]
+
+    def take(self, mask: np.ndarray) -> "RowHashIndex":
+        """Index of the rows selected by a boolean mask or positions"""
+        return RowHashIndex(self.hashes[mask])
+
+    def extend(self, other: "RowHashIndex") -> "RowHashIndex":
+        """Index of these rows followed by another index's rows"""
+        return RowHashIndex(np.concatenate([self.hashes, other.hashes]))
+
+def appended_row_hashes(previous: Optional[RowHashIndex], old: pd.DataFrame, combined: pd.DataFrame) -> RowHashIndex:
+    """
+    Row hashes of a frame made by appending rows to `old`. The old rows keep
+    their hashes unless appending changed a column's dtype.
+    """
+    if previous is not None and len(previous) == len(old) and old.dtypes.equals(combined.dtypes):
+        return previous.extend(RowHashIndex.build(combined.iloc[len(old):]))
+    return RowHashIndex.build(combined)
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, a fast bijective mix of 64-bit values"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _lsh_bands(num_perm: int, threshold: float) -> int:
+    """Band count whose LSH threshold (1/b)^(1/r) is closest to the target"""
+    divisors = [b for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(divisors, key=lambda b: abs((1 / b) ** (b / num_perm) - threshold))
+
+class DuplicateService:
+
+    @staticmethod
+    def summary(index: RowHashIndex, limit: int = 20) -> Dict[str, Any]:
+        """Duplicate count and the largest groups of equal rows"""
+        groups = index.groups()
+        return {
+            "rows": len(index),
+            "duplicate_count": index.duplicate_count,
+            "duplicate_groups": len(groups),
+            "groups": [
+                {"size": len(rows), "rows": rows[:limit].tolist()}
+                for rows in groups[:limit]
+            ]
+        }
+
+    @staticmethod
+    def _row_text(df: pd.DataFrame) -> pd.Series:
+        """Normalized text of each row: lowercase, trimmed, single-spaced"""
+        parts = [
+            df[col].astype("string").fillna("").str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+            for col in df.columns
+        ]
+        return parts[0].str.cat(parts[1:], sep="\x1f") if len(parts) > 1 else parts[0]
+
+    @staticmethod
+    def minhash_signatures(texts: List[str], num_perm: int, shingle_size: int, seed: int) -> np.ndarray:
+        """
+        MinHash signature of each text's byte shingles.
+        Shingles of all texts are hashed at once; each permutation is one
+        vectorized mix followed by a per-text minimum.
+        """
+        encoded = [text.encode().ljust(shingle_size) for text in texts]
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        buffer = np.frombuffer(b"".join(encoded) + bytes(shingle_size), dtype=np.uint8).astype(np.uint64)
+
+        # Shingle start positions that stay inside their text
+        owner = np.repeat(np.arange(len(encoded)), lengths - shingle_size + 1)
+        starts = np.arange(len(owner)) + np.repeat(np.arange(len(encoded)) * (shingle_size - 1), lengths - shingle_size + 1)
+
+        codes = np.zeros(len(starts), dtype=np.uint64)
+        for j in range(shingle_size):
+            codes = (codes << np.uint64(8)) | buffer[starts + j]
+
+        segment_starts = offsets[:-1] - np.arange(len(encoded)) * (shingle_size - 1)
+        salts = np.random.default_rng(seed).integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        signatures = np.empty((len(encoded), num_perm), dtype=np.uint64)
+        for j, salt in enumerate(salts):
+            signatures[:, j] = np.minimum.reduceat(_mix64(codes ^ salt), segment_starts)
+        return signatures
+
+    @staticmethod
+    def _candidate_pairs(signatures: np.ndarray, bands: int, window: int) -> np.ndarray:
+        """Pairs of texts sharing at least one LSH band bucket"""
+        n, num_perm = signatures.shape
+        rows_per_band = num_perm // bands
+        pairs = []
+        for band in range(bands):
+            block = pd.DataFrame(signatures[:, band * rows_per_band:(band + 1) * rows_per_band])
+            buckets = pd.util.hash_pandas_object(block, index=False).to_numpy()
+            order = np.argsort(buckets, kind="stable")
+            sorted_buckets = buckets[order]
+            # Members of a bucket are adjacent once sorted; compare neighbours
+            # within a window so huge buckets stay bounded
+            for distance in range(1, min(window, n)):
+                same = np.flatnonzero(sorted_buckets[distance:] == sorted_buckets[:-distance])
+                if not len(same):
+                    break
+                first, second = order[same], order[same + distance]
+                pairs.append(np.stack([np.minimum(first, second), np.maximum(first, second)], axis=1))
+
+        if not pairs:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.unique(np.concatenate(pairs), axis=0)
+
+    @staticmethod
+    def near_duplicates(
+        df: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+        threshold: float = 0.8,
+        num_perm: int = settings.NEAR_DUPLICATE_PERMUTATIONS,
+        shingle_size: int = 3,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Groups of rows whose text is similar (estimated Jaccard similarity of
+        character shingles at or above the threshold), found with MinHash LSH.
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        if columns:
+            missing = [col for col in columns if col not in df.columns]
+            if missing:
+                raise ValueError(f"Columns not found: {', '.join(missing)}")
+            df = df[columns]
+        if not 0 < threshold <= 1:
+            raise ValueError("Threshold must be in (0, 1]")
+        if not 1 <= shingle_size <= 8:
+            raise ValueError("Shingle size must be between 1 and 8")
+
+        truncated = len(df) > settings.NEAR_DUPLICATE_MAX_ROWS
+        df = df.iloc[:settings.NEAR_DUPLICATE_MAX_ROWS]
+
+        # Rows with identical text share one signature
+        text_codes, texts = pd.factorize(DuplicateService._row_text(df))
+        signatures = DuplicateService.minhash_signatures(list(texts), num_perm, shingle_size, settings.RANDOM_SEED)
+
+        bands = _lsh_bands(num_perm, threshold)
+        pairs = DuplicateService._candidate_pairs(signatures, bands, settings.NEAR_DUPLICATE_BUCKET_WINDOW)
+        similarity = np.empty(len(pairs))
+        for start in range(0, len(pairs), 65536):
+            batch = pairs[start:start + 65536]
+            similarity[start:start + len(batch)] = (signatures[batch[:, 0]] == signatures[batch[:, 1]]).mean(axis=1)
+        keep = similarity >= threshold
+        pairs, similarity = pairs[keep], similarity[keep]
+
+        # Connect similar texts, then expand each text to its rows
+        n = len(texts)
+        graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+        _, component = connected_components(graph, directed=False)
+        row_component = component[text_codes]
+        sizes = np.bincount(row_component, minlength=n)
+
+        grouped = np.flatnonzero(sizes > 1)
+        grouped = grouped[np.argsort(-sizes[grouped], kind="stable")]
+        order = np.argsort(row_component, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(sizes)])
+
+        groups = []
+        for comp in grouped[:limit]:
+            rows = order[starts[comp]:starts[comp + 1]]
+            in_group = component[pairs[:, 0]] == comp
+            groups.append({
+                "size": int(sizes[comp]),
+                "rows": rows[:limit].tolist(),
+                "min_similarity": round(float(similarity[in_group].min()), 4) if in_group.any() else 1.0
+            })
+
+        return {
+            "rows_scanned": len(df),
+            "truncated": truncated,
+            "threshold": threshold,
+            "num_perm": num_perm,
+            "bands": bands,
+            "similar_pairs": int(len(pairs)),
+            "duplicate_groups": int(len(grouped)),
+            "duplicate_rows": int(sizes[grouped].sum() - len(grouped)),
+            "groups": groups
+        }
@@ -0,0 +1,210 @@
+"""
+Compute Executor
+Bounded worker pools that keep CPU-bound work off the event loop
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, List, Any, Callable, Optional
+
+from config import settings
+
+class ComputeUnavailable(Exception):
+    """Work that was refused (429, 503) or abandoned after its timeout (504)"""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class _Lane:
+    """Concurrency slots and waiting callers of one endpoint"""
+
+    def __init__(self, limit: int, queue: int):
+        self.limit = limit
+        self.queue = queue
+        self.running = 0
+        self.waiters: deque = deque()
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+class ComputeExecutor:
+    """
+    Runs blocking work on worker pools on behalf of async routes.
+
+    NumPy, pandas and scikit-learn release the GIL in their inner loops, so
+    most work goes to a thread pool sharing the resident frames. Endpoints
+    dominated by pure-Python work can be sent to a process pool instead;
+    their callables and arguments must be picklable.
+
+    Each endpoint runs at most `limit` calls at once and queues at most
+    `queue` more (further calls get 429). Across endpoints at most
+    `max_queue` calls are admitted (further calls get 503). A call that
+    does not finish within its timeout gets 504; its slot is only freed
+    once the worker actually finishes, so abandoned work still counts.
+    `timeouts` overrides the timeout per endpoint (0 waits without limit).
+    """
+
+    def __init__(
+        self,
+        threads: int = settings.COMPUTE_THREADS,
+        processes: int = settings.COMPUTE_PROCESSES,
+        process_endpoints: Optional[List[str]] = None,
+        limits: Optional[Dict[str, int]] = None,
+        default_limit: int = settings.COMPUTE_DEFAULT_LIMIT,
+        endpoint_queue: int = settings.COMPUTE_ENDPOINT_QUEUE,
+        max_queue: int = settings.COMPUTE_MAX_QUEUE,
+        timeout: Optional[float] = settings.COMPUTE_TIMEOUT,
+        timeouts: Optional[Dict[str, float]] = None
+    ):
+        self.threads = threads or min(32, (os.cpu_count() or 1) + 4)
+        self.processes = processes
+        self.process_endpoints = set(process_endpoints or [])
+        self.limits = limits or {}
+        self.default_limit = default_limit
+        self.endpoint_queue = endpoint_queue
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lanes: Dict[str, _Lane] = {}
+        self.admitted = 0
+
+    def _pool(self, endpoint: str):
+        if endpoint in self.process_endpoints and self.processes > 0:
+            if self._processes is None:
+                # Forking a process that runs threads can deadlock; spawn
+                # fresh interpreters instead
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="compute")
+        return self._threads
+
+    def _lane(self, endpoint: str) -> _Lane:
+        lane = self._lanes.get(endpoint)
+        if lane is None:
+            lane = _Lane(self.limits.get(endpoint, self.default_limit), self.endpoint_queue)
+            self._lanes[endpoint] = lane
+        return lane
+
+    def _abandon(self, lane: _Lane, waiter: asyncio.Future):
+        """Stop waiting for a slot, passing it on if it was just handed over"""
+        if waiter.done() and not waiter.cancelled():
+            self._release(lane)
+        else:
+            waiter.cancel()
+            lane.waiters.remove(waiter)
+
+    def _release(self, lane: _Lane):
+        # Hand the slot straight to the next waiter, if any
+        while lane.waiters:
+            waiter = lane.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        lane.running -= 1
+
+    async def run(self, endpoint: str, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run fn(*args) on a worker, waiting for a slot of the endpoint"""
+        lane = self._lane(endpoint)
+        if self.admitted >= self.max_queue:
+            lane.rejected += 1
+            raise ComputeUnavailable(
+                "Server is busy; retry later", 503, settings.COMPUTE_RETRY_AFTER
+            )
+        if lane.running >= lane.limit and len(lane.waiters) >= lane.queue:
+            lane.rejected += 1
+            raise ComputeUnavailable(
+                f"Too many concurrent '{endpoint}' requests; retry later", 429, settings.COMPUTE_RETRY_AFTER
+            )
+
+        # An explicit timeout of 0 waits as long as the work takes
+        timeout = (self.timeouts.get(endpoint, self.timeout) if timeout is None else timeout) or None
+        deadline = time.monotonic() + timeout if timeout else None
+        loop = asyncio.get_running_loop()
+        self.admitted += 1
+        try:
+            if lane.running < lane.limit and not lane.waiters:
+                lane.running += 1
+            else:
+                # Queued synchronously so later callers see the queue depth
+                waiter = loop.create_future()
+                lane.waiters.append(waiter)
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), timeout)
+                except asyncio.TimeoutError:
+                    self._abandon(lane, waiter)
+                    lane.timed_out += 1
+                    raise ComputeUnavailable(f"'{endpoint}' timed out waiting for a worker", 503, settings.COMPUTE_RETRY_AFTER)
+                except asyncio.CancelledError:
+                    self._abandon(lane, waiter)
+                    raise
+
+            try:
+                future = self._pool(endpoint).submit(fn, *args)
+            except BaseException:
+                self._release(lane)
+                raise
+            future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, lane))
+
+            wrapped = asyncio.wrap_future(future)
+            # Abandoned work may still fail; observe it so it is not reported as unhandled
+            wrapped.add_done_callback(lambda done: done.cancelled() or done.exception())
+            remaining = max(deadline - time.monotonic(), 0) if deadline else None
+            try:
+                result = await asyncio.wait_for(asyncio.shield(wrapped), remaining)
+            except asyncio.TimeoutError:
+                # Work that has not started is dropped; running work cannot be interrupted
+                future.cancel()
+                lane.timed_out += 1
+                raise ComputeUnavailable(f"'{endpoint}' did not finish within {timeout}s", 504)
+            lane.completed += 1
+            return result
+        finally:
+            self.admitted -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool sizes and per-endpoint load"""
+        return {
+            "threads": self.threads,
+            "processes": self.processes,
+            "process_endpoints": sorted(self.process_endpoints),
+            "admitted": self.admitted,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "timeouts": self.timeouts,
+            "endpoints": {
+                endpoint: {
+                    "limit": lane.limit,
+                    "running": lane.running,
+                    "waiting": len(lane.waiters),
+                    "completed": lane.completed,
+                    "rejected": lane.rejected,
+                    "timed_out": lane.timed_out
+                }
+                for endpoint, lane in sorted(self._lanes.items())
+            }
+        }
+
+    def shutdown(self):
+        """Stop the pools without waiting for running work"""
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = None
+        self._processes = None
+
+compute_executor = ComputeExecutor(
+    process_endpoints=settings.COMPUTE_PROCESS_ENDPOINTS,
+    limits=settings.COMPUTE_ENDPOINT_LIMITS,
+    timeouts=settings.COMPUTE_ENDPOINT_TIMEOUTS
+)
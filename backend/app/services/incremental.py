@@ -0,0 +1,170 @@
+"""
+Incremental Appends
+Add rows to a dataset and bring its versions, row hashes, sketches and profiles up to date
+"""
+import copy
+from collections import OrderedDict
+import pandas as pd
+from pandas.api.types import union_categoricals, infer_dtype
+from typing import Dict, List, Any, Optional
+
+from services.dataset_store import RAW, _buffers
+from services.duplicates import appended_row_hashes
+
+class DatasetChanged(Exception):
+    """The dataset was replaced or re-cleaned while rows were being appended"""
+
+class IncrementalService:
+
+    @staticmethod
+    def align(rows: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+        """Rows with the columns and column order of a frame, cast to its dtypes where no value changes"""
+        missing = [col for col in like.columns if col not in rows.columns]
+        extra = [col for col in rows.columns if col not in like.columns]
+        if missing or extra:
+            problems = []
+            if missing:
+                problems.append(f"missing columns: {', '.join(map(str, missing))}")
+            if extra:
+                problems.append(f"unknown columns: {', '.join(map(str, extra))}")
+            raise ValueError(f"Appended rows do not match the dataset ({'; '.join(problems)})")
+
+        rows = rows[list(like.columns)]
+        cast = {}
+        for col in like.columns:
+            if rows[col].dtype == like[col].dtype:
+                continue
+            dtype = like[col].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                # New values of the same kind become new categories
+                new = pd.Index(rows[col].dropna().unique()).difference(dtype.categories)
+                if len(new) and infer_dtype(new) == infer_dtype(dtype.categories):
+                    dtype = pd.CategoricalDtype(dtype.categories.append(new))
+            try:
+                converted = rows[col].astype(dtype)
+                # Only keep lossless casts, e.g. not 1.5 -> 1
+                if converted.astype(rows[col].dtype).equals(rows[col]):
+                    cast[col] = converted
+            except (TypeError, ValueError):
+                pass
+        return rows.assign(**cast) if cast else rows
+
+    @staticmethod
+    def _concat_column(old: pd.Series, added: pd.Series) -> pd.Series:
+        """A column with rows appended; categoricals stay categorical with the union of their categories"""
+        if (
+            isinstance(old.dtype, pd.CategoricalDtype) and isinstance(added.dtype, pd.CategoricalDtype)
+            and old.dtype != added.dtype
+        ):
+            # Existing codes keep their meaning, new categories are added at the end
+            values = union_categoricals([old.array, added.array], ignore_order=True)
+            return pd.Series(values, index=old.index.append(added.index), name=old.name)
+        return pd.concat([old, added])
+
+    @staticmethod
+    def concat(old: pd.DataFrame, added: pd.DataFrame) -> pd.DataFrame:
+        """Rows appended to a frame with the same columns"""
+        return pd.DataFrame(
+            {col: IncrementalService._concat_column(old[col], added[col]) for col in old.columns},
+            copy=False
+        )
+
+    @staticmethod
+    def _concat(old: pd.DataFrame, added: pd.DataFrame, old_parent: pd.DataFrame, added_parent: pd.DataFrame, parent: pd.DataFrame) -> pd.DataFrame:
+        """
+        A cleaned version with its new rows appended. Columns the version
+        shares with its parent stay shared when no row was removed.
+        """
+        same_rows = len(old) == len(old_parent) and len(added) == len(added_parent)
+        columns = {}
+        for col in old.columns:
+            if (
+                same_rows and col in parent.columns
+                and _buffers(old[col]) == _buffers(old_parent[col])
+                and _buffers(added[col]) == _buffers(added_parent[col])
+            ):
+                columns[col] = parent[col]
+            else:
+                columns[col] = IncrementalService._concat_column(old[col], added[col])
+        return pd.DataFrame(columns, copy=False)
+
+    @staticmethod
+    def _derived(name: str, derived: Dict[str, Any], old: pd.DataFrame, added: pd.DataFrame, combined: pd.DataFrame) -> Dict[str, Any]:
+        """Row hashes, sketches and profile of a version, updated with the appended rows"""
+        updated = {}
+        hashes = derived.get(f"row_hashes:{name}")
+        if hashes is not None:
+            hashes = appended_row_hashes(hashes, old, combined)
+            updated[f"row_hashes:{name}"] = hashes
+
+        sketches = derived.get(f"sketches:{name}")
+        if sketches is not None:
+            sketches = copy.deepcopy(sketches)
+            sketches.update(added)
+            sketches.retain(combined)
+            updated[f"sketches:{name}"] = sketches
+
+        profile = derived.get(f"profile:{name}")
+        if profile is not None:
+            updated[f"profile:{name}"] = profile.extend(added, combined, hashes)
+        return updated
+
+    @staticmethod
+    def append(store, rows: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Append rows to the raw data and extend every cleaned version by
+        cleaning only the new rows with its recorded plan. Versions whose
+        plan cannot be extended (or whose parent was dropped) are dropped.
+        """
+        base_version, versions, derived = store.snapshot()
+        raw = versions[RAW]["frame"] if RAW in versions else None
+        if raw is None:
+            raise ValueError("No data loaded")
+
+        rows = IncrementalService.align(rows, raw)
+        rows = rows.set_axis(pd.RangeIndex(len(raw), len(raw) + len(rows)))
+
+        frames: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        added_rows: Dict[str, pd.DataFrame] = {}
+        plans: Dict[str, Any] = {}
+        updated: Dict[str, Any] = {}
+        report: List[Dict[str, Any]] = []
+
+        for name, version in versions.items():
+            old = version["frame"]
+            if name == RAW:
+                added, stats = rows, {}
+                combined = IncrementalService.concat(old, rows)
+            else:
+                parent = version["parent"]
+                if parent not in frames or version["plan"] is None or old is None:
+                    continue
+                try:
+                    added, stats, plans[name] = version["plan"].extend(added_rows[parent])
+                except ValueError:
+                    continue
+                combined = IncrementalService._concat(
+                    old, added, versions[parent]["frame"], added_rows[parent], frames[parent]
+                )
+
+            frames[name] = combined
+            added_rows[name] = added
+            updated.update(IncrementalService._derived(name, derived, old, added, combined))
+            report.append({
+                "name": name,
+                "rows": len(combined),
+                "rows_added": len(added),
+                **{key: stats[key] for key in ("missing_filled", "duplicates_removed", "values_coerced") if key in stats}
+            })
+
+        version = store.replace_versions(frames, plans, updated, base_version)
+        if version is None:
+            raise DatasetChanged("Dataset changed while rows were being appended; retry the append")
+
+        return {
+            "version": version,
+            "rows_appended": len(rows),
+            "rows": len(frames[RAW]),
+            "versions": report,
+            "dropped_versions": [name for name in versions if name not in frames]
+        }
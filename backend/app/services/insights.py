@@ -4,61 +4,87 @@ Generate business insights from data analysis
 """
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from services.profiler import DatasetProfile
 
 class InsightsService:
     
     @staticmethod
-    def generate_insights(raw_df: pd.DataFrame, cleaned_df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def generate_insights(
+        raw_df: pd.DataFrame,
+        cleaned_df: pd.DataFrame,
+        raw_profile: Optional[DatasetProfile] = None,
+        profile: Optional[DatasetProfile] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Generate AI-powered business insights
+        Generate AI-powered business insights.
+        Column roles, counts and top values come from the dataset profiles.
         """
+        raw_profile = raw_profile or DatasetProfile.build(raw_df)
+        profile = profile or (raw_profile if cleaned_df is raw_df else DatasetProfile.build(cleaned_df))
         insights = []
         
         # Revenue insights
-        revenue_insight = InsightsService._analyze_revenue(cleaned_df)
+        revenue_insight = InsightsService._analyze_revenue(cleaned_df, profile)
         if revenue_insight:
             insights.append(revenue_insight)
         
         # Customer/Segment insights
-        customer_insight = InsightsService._analyze_customers(cleaned_df)
+        customer_insight = InsightsService._analyze_customers(profile)
         if customer_insight:
             insights.append(customer_insight)
         
         # Product insights
-        product_insight = InsightsService._analyze_products(cleaned_df)
+        product_insight = InsightsService._analyze_products(profile)
         if product_insight:
             insights.append(product_insight)
         
         # Data quality insights
-        quality_insight = InsightsService._analyze_data_quality(raw_df, cleaned_df)
+        quality_insight = InsightsService._analyze_data_quality(raw_profile)
         if quality_insight:
             insights.append(quality_insight)
         
         # Regional insights
-        regional_insight = InsightsService._analyze_regions(cleaned_df)
+        regional_insight = InsightsService._analyze_regions(profile)
         if regional_insight:
             insights.append(regional_insight)
         
         return insights
     
     @staticmethod
-    def _analyze_revenue(df: pd.DataFrame) -> Dict[str, Any]:
+    def _top_share(profile: DatasetProfile, *roles: str) -> Optional[tuple]:
+        """Most frequent value of the first column with a role, and its share, if categorical"""
+        cols = profile.columns_with_role(*roles)
+        if not cols or not profile.rows:
+            return None
+        
+        stats = profile.column(cols[0])
+        top_values = stats["top_values"]
+        if stats["kind"] != "categorical" or not top_values:
+            return None
+        return top_values[0]["value"], top_values[0]["count"] / profile.rows * 100
+    
+    @staticmethod
+    def _analyze_revenue(df: pd.DataFrame, profile: DatasetProfile) -> Dict[str, Any]:
         """Analyze revenue patterns"""
-        revenue_cols = [col for col in df.columns if 'revenue' in col.lower() or 'price' in col.lower()]
+        revenue_cols = [
+            col for col in profile.columns_with_role("revenue")
+            if 'revenue' in col.lower() or 'price' in col.lower()
+        ]
         
         if not revenue_cols:
             return None
         
         col = revenue_cols[0]
-        data = df[col].dropna()
+        stats = profile.column(col)
         
-        if len(data) == 0:
+        if not stats["count"] or stats["mean"] is None:
             return None
         
-        avg = data.mean()
-        high_performers = len(data[data > avg * 1.2])
-        pct = (high_performers / len(data) * 100) if len(data) > 0 else 0
+        avg = stats["mean"]
+        high_performers = int((df[col] > avg * 1.2).sum())
+        pct = high_performers / stats["count"] * 100
         
         return {
             "icon": "💰",
@@ -67,57 +93,41 @@ class InsightsService:
         }
     
     @staticmethod
-    def _analyze_customers(df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_customers(profile: DatasetProfile) -> Dict[str, Any]:
         """Analyze customer segments"""
-        customer_cols = [col for col in df.columns if 'customer' in col.lower() or 'segment' in col.lower()]
+        top = InsightsService._top_share(profile, "customer")
         
-        if not customer_cols:
+        if not top:
             return None
         
-        col = customer_cols[0]
-        
-        if df[col].dtype == 'object' or df[col].dtype.name == 'category':
-            segments = df[col].value_counts()
-            if len(segments) > 0:
-                top_segment = segments.index[0]
-                pct = (segments.iloc[0] / len(df) * 100)
-                
-                return {
-                    "icon": "👥",
-                    "text": f"Customer segmentation reveals {top_segment} as the dominant segment ({pct:.1f}% of total). Focus marketing efforts on this high-value segment for maximum ROI.",
-                    "confidence": 88
-                }
-        
-        return None
+        top_segment, pct = top
+        
+        return {
+            "icon": "👥",
+            "text": f"Customer segmentation reveals {top_segment} as the dominant segment ({pct:.1f}% of total). Focus marketing efforts on this high-value segment for maximum ROI.",
+            "confidence": 88
+        }
     
     @staticmethod
-    def _analyze_products(df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_products(profile: DatasetProfile) -> Dict[str, Any]:
         """Analyze product performance"""
-        product_cols = [col for col in df.columns if 'product' in col.lower() or 'category' in col.lower()]
+        top = InsightsService._top_share(profile, "product")
         
-        if not product_cols:
+        if not top:
             return None
         
-        col = product_cols[0]
-        
-        if df[col].dtype == 'object' or df[col].dtype.name == 'category':
-            products = df[col].value_counts()
-            if len(products) > 0:
-                top_product = products.index[0]
-                pct = (products.iloc[0] / len(df) * 100)
-                
-                return {
-                    "icon": "📦",
-                    "text": f"Product analysis indicates {top_product} leads with {pct:.1f}% market share. Consider expanding this product line and analyzing success factors for replication across other products.",
-                    "confidence": 85
-                }
-        
-        return None
+        top_product, pct = top
+        
+        return {
+            "icon": "📦",
+            "text": f"Product analysis indicates {top_product} leads with {pct:.1f}% market share. Consider expanding this product line and analyzing success factors for replication across other products.",
+            "confidence": 85
+        }
     
     @staticmethod
-    def _analyze_data_quality(raw_df: pd.DataFrame, cleaned_df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_data_quality(raw_profile: DatasetProfile) -> Dict[str, Any]:
         """Analyze data quality improvements"""
-        original_missing = raw_df.isnull().sum().sum()
+        original_missing = raw_profile.missing_count
         
         if original_missing == 0:
             return {
@@ -133,25 +143,17 @@ class InsightsService:
         }
     
     @staticmethod
-    def _analyze_regions(df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_regions(profile: DatasetProfile) -> Dict[str, Any]:
         """Analyze regional distribution"""
-        region_cols = [col for col in df.columns if 'region' in col.lower() or 'location' in col.lower()]
+        top = InsightsService._top_share(profile, "region")
         
-        if not region_cols:
+        if not top:
             return None
         
-        col = region_cols[0]
-        
-        if df[col].dtype == 'object' or df[col].dtype.name == 'category':
-            regions = df[col].value_counts()
-            if len(regions) > 0:
-                top_region = regions.index[0]
-                pct = (regions.iloc[0] / len(df) * 100)
-                
-                return {
-                    "icon": "🌍",
-                    "text": f"Geographic analysis shows {top_region} region dominates with {pct:.1f}% of activity. Consider region-specific strategies and investigate expansion opportunities in underperforming areas.",
-                    "confidence": 89
-                }
-        
-        return None
\ No newline at end of file
+        top_region, pct = top
+        
+        return {
+            "icon": "🌍",
+            "text": f"Geographic analysis shows {top_region} region dominates with {pct:.1f}% of activity. Consider region-specific strategies and investigate expansion opportunities in underperforming areas.",
+            "confidence": 89
+        }
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+Background Jobs
+Long-running cleaning, segmentation and forecasting submitted and polled by id
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Callable, Optional
+
+from config import settings
+from services.executor import ComputeUnavailable, compute_executor
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled", "superseded")
+FINISHED = ("completed", "failed", "cancelled", "superseded")
+
+class JobCancelled(Exception):
+    """Raised inside a job's work when it reports progress after cancellation"""
+
+class JobSuperseded(Exception):
+    """Raised by a job's finish step when the dataset changed while it ran"""
+
+class JobQueueFull(Exception):
+    """Too many jobs are waiting to run"""
+
+class JobManager:
+    """
+    Runs submitted jobs in the background, at most `workers` at a time.
+
+    Further jobs wait in a FIFO queue of at most `max_queued` jobs. A job's
+    work runs on the compute executor under its kind's endpoint limits
+    (waiting while the executor is saturated) and an optional finish step
+    then runs on the event loop, e.g. to store a cleaned version. Finished
+    jobs are kept for polling for `ttl` seconds, and at most `retained` of
+    them.
+    """
+
+    def __init__(self, workers: int, max_queued: int, ttl: float, retained: int):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.retained = retained
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: deque = deque()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancelled: set = set()
+        self._running = 0
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable,
+        *args,
+        finish: Optional[Callable[[Any], Any]] = None,
+        progress: bool = False,
+        dataset_id: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue fn(*args) as a job. With progress, fn also receives a
+        `progress` callback taking the completed fraction; it raises
+        JobCancelled once the job is cancelled.
+        """
+        self._purge()
+        queued = sum(1 for job, *_ in self._pending if job["status"] == "queued")
+        if queued >= self.max_queued:
+            raise JobQueueFull(f"{queued} jobs are already queued; retry later")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "dataset_id": dataset_id,
+            "params": params or {},
+            "status": "queued",
+            "progress": 0,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+        self._jobs[job["id"]] = job
+        if progress:
+            args = args + (self._reporter(job),)
+        self._pending.append((job, fn, args, finish))
+        self._start_next()
+        return dict(job)
+
+    def _reporter(self, job: Dict[str, Any]) -> Callable[[float], None]:
+        def report(fraction: float):
+            if job["id"] in self._cancelled:
+                raise JobCancelled("Job was cancelled")
+            job["progress"] = max(job["progress"], min(int(fraction * 100), 99))
+        return report
+
+    def _start_next(self):
+        loop = asyncio.get_running_loop()
+        while self._pending and self._running < self.workers:
+            job, fn, args, finish = self._pending.popleft()
+            if job["status"] != "queued":
+                continue
+            self._running += 1
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            self._tasks[job["id"]] = loop.create_task(self._execute(job, fn, args, finish))
+
+    async def _execute(self, job: Dict[str, Any], fn: Callable, args: tuple, finish: Optional[Callable]):
+        try:
+            while True:
+                try:
+                    # Jobs are not bound by the request timeout
+                    value = await compute_executor.run(job["kind"], fn, *args, timeout=0)
+                    break
+                except ComputeUnavailable as e:
+                    await asyncio.sleep(e.retry_after or settings.COMPUTE_RETRY_AFTER)
+            job["result"] = finish(value) if finish else value
+            job["status"] = "completed"
+            job["progress"] = 100
+        except (JobCancelled, asyncio.CancelledError):
+            job["status"] = "cancelled"
+        except JobSuperseded as e:
+            job["status"] = "superseded"
+            job["error"] = str(e)
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = time.time()
+            self._tasks.pop(job["id"], None)
+            self._running -= 1
+            self._start_next()
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued or running job. Running work stops at its next
+        progress report; its result is discarded either way.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job["status"] in ("queued", "running"):
+            self._cancelled.add(job_id)
+            if job["status"] == "queued":
+                job["status"] = "cancelled"
+                job["finished_at"] = time.time()
+            task = self._tasks.get(job_id)
+            if task is not None:
+                task.cancel()
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self._purge()
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def list(self, kind: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Jobs without their results, newest first"""
+        self._purge()
+        return [
+            {key: value for key, value in job.items() if key != "result"}
+            for job in reversed(self._jobs.values())
+            if (kind is None or job["kind"] == kind) and (status is None or job["status"] == status)
+        ]
+
+    def _purge(self):
+        """Forget finished jobs past their TTL or beyond the retained count"""
+        now = time.time()
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED]
+        expired = [job_id for job_id in finished if now - self._jobs[job_id]["finished_at"] > self.ttl]
+        kept = [job_id for job_id in finished if job_id not in expired]
+        expired += kept[:max(len(kept) - self.retained, 0)]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            self._cancelled.discard(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Job counts by status"""
+        counts = {status: 0 for status in JOB_STATUSES}
+        for job in self._jobs.values():
+            counts[job["status"]] += 1
+        return {"workers": self.workers, "max_queued": self.max_queued, "ttl": self.ttl, **counts}
+
+job_manager = JobManager(
+    workers=settings.JOBS_WORKERS,
+    max_queued=settings.JOBS_MAX_QUEUED,
+    ttl=settings.JOBS_RESULT_TTL,
+    retained=settings.JOBS_RETAINED
+)
@@ -0,0 +1,189 @@
+"""
+Live Query Service
+Pushes analytics aggregates down to a connected source database
+"""
+import math
+from typing import Dict, List, Any, Optional
+from sqlalchemy import Table, MetaData, select, func, cast, Float, Integer, Numeric, DateTime, desc
+from sqlalchemy.exc import NoSuchTableError
+
+from services.connection_pool import engine_registry
+
+class LiveSource:
+    """A table in a connected database that is queried in place"""
+
+    def __init__(self, db_type: str, connection_string: str, table_name: str):
+        if db_type == 'mongodb':
+            raise ValueError("Live datasets are only supported for SQL databases")
+
+        self.db_type = db_type
+        self.connection_string = connection_string
+        self.table_name = table_name
+
+        schema, _, name = table_name.rpartition('.')
+        try:
+            self.table = Table(name, MetaData(), autoload_with=self.engine, schema=schema or None)
+        except NoSuchTableError:
+            raise ValueError(f"Table '{table_name}' does not exist in the database.")
+
+    @property
+    def engine(self):
+        return engine_registry.get_engine(self.connection_string)
+
+    @property
+    def dialect(self) -> str:
+        return self.engine.dialect.name
+
+    @property
+    def columns(self) -> List[str]:
+        return [col.name for col in self.table.columns]
+
+    def column(self, name: str):
+        if name not in self.table.columns:
+            raise ValueError(f"Column {name} not found")
+        return self.table.columns[name]
+
+    @property
+    def numeric_columns(self) -> List:
+        return [
+            col for col in self.table.columns
+            if isinstance(col.type, (Integer, Numeric))
+        ]
+
+    def execute(self, query) -> List:
+        with self.engine.connect() as conn:
+            return conn.execute(query).all()
+
+    def info(self) -> Dict[str, Any]:
+        return {"db_type": self.db_type, "table": self.table_name, "dialect": self.dialect}
+
+class LiveQueryService:
+    """
+    Analytics compiled into SQL and executed at the source.
+
+    Only the aggregated result is transferred, so these work on tables far
+    larger than what would fit in a DataFrame. Results have the same shape
+    as the corresponding AnalyticsService methods.
+    """
+
+    @staticmethod
+    def count_rows(source: LiveSource) -> int:
+        return int(source.execute(select(func.count()).select_from(source.table))[0][0])
+
+    @staticmethod
+    def preview(source: LiveSource, limit: int) -> List[Dict[str, Any]]:
+        """Fetch the first rows of the table"""
+        rows = source.execute(select(source.table).limit(limit))
+        return [dict(row._mapping) for row in rows]
+
+    @staticmethod
+    def get_statistical_summary(source: LiveSource) -> List[Dict[str, Any]]:
+        """Statistical summary for all numeric columns in one aggregate query"""
+        numeric_cols = source.numeric_columns
+        if not numeric_cols:
+            return []
+
+        dialect = source.dialect
+        native_std = dialect in ('postgresql', 'mysql', 'mariadb')
+        native_median = dialect == 'postgresql'
+
+        aggregates = []
+        for col in numeric_cols:
+            value = cast(col, Float)
+            aggregates += [func.count(col), func.avg(value), func.min(col), func.max(col)]
+            # Sample std dev from the second moment where stddev_samp is missing
+            aggregates.append(func.stddev_samp(value) if native_std else func.avg(value * value))
+            if native_median:
+                aggregates.append(func.percentile_cont(0.5).within_group(value))
+
+        row = source.execute(select(*aggregates).select_from(source.table))[0]
+        width = 6 if native_median else 5
+
+        summaries = []
+        for i, col in enumerate(numeric_cols):
+            count, mean, min_val, max_val, second, *rest = row[i * width:(i + 1) * width]
+            count = int(count or 0)
+            if count == 0:
+                continue
+
+            mean = float(mean)
+            if native_std:
+                std = float(second) if second is not None else float('nan')
+            else:
+                variance = (float(second) - mean * mean) * count / (count - 1) if count > 1 else float('nan')
+                std = math.sqrt(max(variance, 0.0)) if count > 1 else float('nan')
+
+            median = float(rest[0]) if native_median else LiveQueryService._median(source, col, count)
+
+            summaries.append({
+                "field": col.name,
+                "mean": mean,
+                "median": median,
+                "std": std,
+                "min": float(min_val),
+                "max": float(max_val),
+                "count": count
+            })
+
+        return summaries
+
+    @staticmethod
+    def _median(source: LiveSource, col, count: int) -> float:
+        """Median via ORDER BY with OFFSET, fetching at most two values"""
+        query = (
+            select(col)
+            .where(col.isnot(None))
+            .order_by(col)
+            .offset((count - 1) // 2)
+            .limit(1 if count % 2 else 2)
+        )
+        values = [float(row[0]) for row in source.execute(query)]
+        return sum(values) / len(values)
+
+    @staticmethod
+    def get_categorical_distribution(source: LiveSource, column: str) -> Dict[str, Any]:
+        """Value counts computed with GROUP BY"""
+        col = source.column(column)
+        n = func.count().label("n")
+        query = select(col, n).where(col.isnot(None)).group_by(col).order_by(desc(n))
+        rows = source.execute(query)
+
+        return {
+            "labels": [row[0] for row in rows],
+            "values": [int(row[1]) for row in rows],
+            "column": column
+        }
+
+    @staticmethod
+    def _month(col, dialect: str):
+        """Truncate a date column to a YYYY-MM label"""
+        if dialect == 'sqlite':
+            return func.strftime('%Y-%m', col)
+        if dialect == 'postgresql':
+            return func.to_char(func.date_trunc('month', cast(col, DateTime)), 'YYYY-MM')
+        if dialect in ('mysql', 'mariadb'):
+            return func.date_format(col, '%Y-%m')
+        if dialect == 'mssql':
+            return func.format(col, 'yyyy-MM')
+        raise ValueError(f"Date truncation is not supported for {dialect}")
+
+    @staticmethod
+    def get_time_series_trend(source: LiveSource, date_col: str, value_col: str) -> Dict[str, Any]:
+        """Monthly sums computed with date truncation and GROUP BY"""
+        if date_col not in source.table.columns or value_col not in source.table.columns:
+            raise ValueError("Specified columns not found")
+
+        period = LiveQueryService._month(source.column(date_col), source.dialect).label("period")
+        value = source.column(value_col)
+        query = (
+            select(period, func.sum(value))
+            .where(period.isnot(None), value.isnot(None))
+            .group_by(period)
+            .order_by(period)
+        )
+        rows = source.execute(query)
+
+        return {
+            "labels": [str(row[0]) for row in rows],
+            "values": [float(row[1]) for row in rows]
+        }
@@ -4,20 +4,21 @@ Sales forecasting, customer segmentation, anomaly detection
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LinearRegression
 from scipy import stats
 
+from services.profiler import DatasetProfile
+
 class MLService:
     
     @staticmethod
-    def forecast_sales(df: pd.DataFrame, periods: int = 6) -> Dict[str, Any]:
+    def forecast_columns(df: pd.DataFrame) -> Tuple[Optional[str], str]:
         """
-        Forecast sales using time series analysis
+        Find the date column (if any) and the value column to forecast
         """
-        # Find date and value columns
         date_col = None
         value_col = None
         
@@ -35,6 +36,23 @@ class MLService:
             else:
                 raise ValueError("No numeric column found for forecasting")
         
+        return date_col, value_col
+    
+    @staticmethod
+    def forecast_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Project the columns a forecast reads, so only they are sent to a worker process
+        """
+        date_col, value_col = MLService.forecast_columns(df)
+        return df[list(dict.fromkeys(col for col in (date_col, value_col) if col is not None))]
+    
+    @staticmethod
+    def forecast_sales(df: pd.DataFrame, periods: int = 6) -> Dict[str, Any]:
+        """
+        Forecast sales using time series analysis
+        """
+        date_col, value_col = MLService.forecast_columns(df)
+        
         # Aggregate data
         if date_col and pd.api.types.is_datetime64_any_dtype(df[date_col]) or date_col:
             try:
@@ -180,22 +198,23 @@ class MLService:
         }
     
     @staticmethod
-    def generate_recommendations(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def generate_recommendations(df: pd.DataFrame, profile: Optional[DatasetProfile] = None) -> List[Dict[str, Any]]:
         """
         Generate data-driven business recommendations
         """
+        profile = profile or DatasetProfile.build(df)
         recommendations = []
         
         # Revenue analysis
-        revenue_cols = [col for col in df.columns if 'revenue' in col.lower() or 'price' in col.lower() or 'sales' in col.lower()]
+        revenue_cols = profile.columns_with_role("revenue")
         if revenue_cols:
             col = revenue_cols[0]
-            data = df[col].dropna()
-            if len(data) > 0:
-                avg = data.mean()
-                max_val = data.max()
-                high_performers = len(data[data > avg * 1.5])
-                pct = (high_performers / len(data) * 100)
+            col_stats = profile.column(col)
+            if col_stats["count"] > 0 and col_stats["mean"] is not None:
+                avg = col_stats["mean"]
+                max_val = col_stats["max"]
+                high_performers = int((df[col] > avg * 1.5).sum())
+                pct = (high_performers / col_stats["count"] * 100)
                 
                 recommendations.append({
                     "icon": "💰",
@@ -205,14 +224,13 @@ class MLService:
                 })
         
         # Category analysis
-        cat_cols = [col for col in df.columns if 'product' in col.lower() or 'category' in col.lower() or 'segment' in col.lower()]
+        cat_cols = profile.columns_with_role("product", "segment")
         if cat_cols:
-            col = cat_cols[0]
-            counts = df[col].value_counts()
-            if len(counts) > 0:
-                top_cat = counts.index[0]
-                top_count = counts.iloc[0]
-                pct = (top_count / len(df) * 100)
+            top_values = profile.column(cat_cols[0])["top_values"]
+            if top_values:
+                top_cat = top_values[0]["value"]
+                top_count = top_values[0]["count"]
+                pct = (top_count / profile.rows * 100)
                 
                 recommendations.append({
                     "icon": "📊",
@@ -222,7 +240,7 @@ class MLService:
                 })
         
         # Data quality
-        missing = df.isnull().sum().sum()
+        missing = profile.missing_count
         if missing > 0:
             recommendations.append({
                 "icon": "🔍",
@@ -0,0 +1,153 @@
+"""
+Dataset Profiler
+Per-column profile computed once per dataset version and shared by services
+"""
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Any, Optional
+
+from config import settings
+from services.duplicates import RowHashIndex
+from services.dtypes import value_counts
+
+# Semantic roles inferred from column names, in the order services look for them
+ROLE_KEYWORDS = {
+    "revenue": ("revenue", "price", "sales"),
+    "customer": ("customer", "segment"),
+    "segment": ("segment",),
+    "product": ("product", "category"),
+    "region": ("region", "location"),
+    "date": ("date", "time")
+}
+
+TOP_VALUES = 5
+
+def _scalar(value: Any) -> Any:
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value.item() if hasattr(value, "item") else value
+
+def _kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return "boolean"
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    return "categorical"
+
+def _from_counts(name: str, series: pd.Series, counts: pd.Series) -> Dict[str, Any]:
+    kind = _kind(series)
+    count = int(counts.sum())
+
+    roles = [role for role, keywords in ROLE_KEYWORDS.items() if any(k in name.lower() for k in keywords)]
+    if kind == "datetime" and "date" not in roles:
+        roles.append("date")
+
+    profile = {
+        "name": name,
+        "dtype": str(series.dtype),
+        "kind": kind,
+        "count": count,
+        "null_count": int(len(series) - count),
+        "cardinality": int(len(counts)),
+        "top_values": [
+            {"value": _scalar(value), "count": int(n)}
+            for value, n in counts.iloc[:TOP_VALUES].items()
+        ],
+        "roles": roles,
+        "min": None,
+        "max": None,
+        "mean": None
+    }
+
+    if count and kind in ("numeric", "datetime"):
+        # Extrema of the distinct values avoid another full scan
+        profile["min"] = _scalar(counts.index.min())
+        profile["max"] = _scalar(counts.index.max())
+    if count and kind == "numeric":
+        profile["mean"] = float(np.dot(counts.index.to_numpy(dtype=np.float64), counts.to_numpy()) / count)
+    if len(counts) <= settings.PROFILE_COUNTS_MAX_DISTINCT:
+        # Exact counts let the profile absorb appended rows without a rescan
+        profile["_counts"] = counts
+
+    return profile
+
+def profile_column(name: str, series: pd.Series) -> Dict[str, Any]:
+    """Profile one column with a single value_counts pass"""
+    return _from_counts(name, series, value_counts(series))
+
+class DatasetProfile:
+    """
+    Column profiles of one frame: dtype, null count, extrema, cardinality,
+    top values and semantic roles, plus frame-level duplicate count.
+    """
+
+    def __init__(self, rows: int, columns: Dict[str, Dict[str, Any]], duplicate_count: int):
+        self.rows = rows
+        self.columns = columns
+        self.duplicate_count = duplicate_count
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, row_hashes: Optional[RowHashIndex] = None) -> "DatasetProfile":
+        """Profile every column of a frame, counting duplicates from its row hashes if known"""
+        columns = {col: profile_column(col, df[col]) for col in df.columns}
+        if not len(df.columns):
+            duplicate_count = 0
+        else:
+            duplicate_count = (row_hashes or RowHashIndex.build(df)).duplicate_count
+        return cls(len(df), columns, duplicate_count)
+
+    @property
+    def missing_count(self) -> int:
+        return sum(col["null_count"] for col in self.columns.values())
+
+    @property
+    def total_cells(self) -> int:
+        return self.rows * len(self.columns)
+
+    def column(self, name: str) -> Dict[str, Any]:
+        return self.columns[name]
+
+    def columns_with_role(self, *roles: str, kind: Optional[str] = None) -> List[str]:
+        """Columns having any of the roles, in frame order"""
+        return [
+            name for name, col in self.columns.items()
+            if any(role in col["roles"] for role in roles) and (kind is None or col["kind"] == kind)
+        ]
+
+    def extend(self, rows: pd.DataFrame, combined: pd.DataFrame, row_hashes: Optional[RowHashIndex] = None) -> "DatasetProfile":
+        """
+        Profile of `combined`, this profile's frame with `rows` appended.
+        Columns with exact counts only count the new rows; the others
+        (high-cardinality or with a changed dtype) are profiled again.
+        """
+        columns = {}
+        for col in combined.columns:
+            old = self.columns.get(col)
+            if old is None or "_counts" not in old or col not in rows.columns or old["dtype"] != str(combined[col].dtype):
+                columns[col] = profile_column(col, combined[col])
+                continue
+            new = value_counts(rows[col])
+            counts = old["_counts"].add(new, fill_value=0).astype(np.int64)
+            # Tied values keep their earlier order, new values after them
+            order = old["_counts"].index.append(new.index[~new.index.isin(old["_counts"].index)])
+            counts = counts.reindex(order).sort_values(ascending=False, kind="stable")
+            columns[col] = _from_counts(col, combined[col], counts)
+
+        if not len(combined.columns):
+            duplicate_count = 0
+        else:
+            duplicate_count = (row_hashes or RowHashIndex.build(combined)).duplicate_count
+        return DatasetProfile(len(combined), columns, duplicate_count)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "missing_count": self.missing_count,
+            "duplicate_count": self.duplicate_count,
+            "columns": [
+                {key: value for key, value in col.items() if not key.startswith("_")}
+                for col in self.columns.values()
+            ]
+        }
@@ -0,0 +1,155 @@
+"""
+Result Cache
+Caches endpoint results per dataset version with size-bounded LRU eviction
+"""
+import json
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, Optional, Tuple
+
+from config import settings
+from services.single_flight import single_flight
+from services.executor import compute_executor
+
+class ResultCache:
+    """
+    LRU cache of computed results keyed by (dataset key, dataset version,
+    endpoint, normalized params).
+
+    A dataset's entries are dropped as soon as its version changes, so a
+    stale result is never served. Entries are evicted least recently used
+    first once either the entry or the byte limit is exceeded.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(dataset_key: str, version: int, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Tuple:
+        """Build a cache key with parameters in a canonical order"""
+        normalized = json.dumps(params or {}, sort_keys=True, default=str)
+        return (dataset_key, version, endpoint, normalized)
+
+    @staticmethod
+    def _size(value: Any) -> int:
+        try:
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Look up a key, returning (hit, value)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        """Store a result, evicting least recently used entries as needed"""
+        size = self._size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        store,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        compute: Callable[[Any], Any],
+        project: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """
+        Return the cached result for a dataset's current version.
+        On a miss, compute(frame) runs on the compute executor under the
+        endpoint's limits with the frame of the version the key names, and
+        concurrent identical misses share that one execution. `project`
+        narrows the frame before it is handed over, for endpoints run on
+        worker processes.
+        """
+        version, df = store.active_snapshot()
+        if project is not None and df is not None:
+            df = project(df)
+        if store.live is not None or version == 0:
+            # Live tables change underneath us; unregistered stores hold no data
+            return await compute_executor.run(endpoint, compute, df)
+
+        key = self.make_key(store.key, version, endpoint, params)
+        hit, value = self.get(key)
+        if hit:
+            return value
+
+        async def run():
+            value = await compute_executor.run(endpoint, compute, df)
+            # Derived data a compute reads from the store (sketches, profiles)
+            # follows the current version; keep results that may mix versions out
+            if store.version == version:
+                self.put(key, value)
+            return value
+
+        return await single_flight.run(key, run)
+
+    def invalidate(self, dataset_key: str, keep_version: Optional[int] = None) -> int:
+        """Drop a dataset's entries, except those for keep_version"""
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if key[0] == dataset_key and key[1] != keep_version
+            ]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self) -> int:
+        """Drop every entry"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+result_cache = ResultCache(
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES
+)
@@ -0,0 +1,157 @@
+"""
+Sample Data Generation
+Vectorized, seeded generation of sales, customer and inventory datasets
+"""
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from typing import Iterator, List, Optional, Tuple
+
+from config import settings
+
+PRODUCTS = np.array(['Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Tablet', 'Phone', 'Headphones'], dtype=object)
+REGIONS = np.array(['North', 'South', 'East', 'West'], dtype=object)
+SEGMENTS = np.array(['Enterprise', 'SMB', 'Startup'], dtype=object)
+CATEGORIES = np.array(['Electronics', 'Office', 'Accessories'], dtype=object)
+DATES = np.array(
+    pd.date_range('2025-01-01', periods=366, freq='D').strftime('%Y-%m-%d').tolist(),
+    dtype=object
+)
+
+def _choice(rng: np.random.Generator, values: np.ndarray, n: int) -> np.ndarray:
+    return values[rng.integers(0, len(values), n)]
+
+def _labels(prefix: str, ids: np.ndarray) -> np.ndarray:
+    return np.char.add(prefix, ids.astype(str)).astype(object)
+
+def _blank(rng: np.random.Generator, values: np.ndarray, rate: float) -> np.ndarray:
+    """Object column with a share of values replaced by empty strings"""
+    values = values.astype(object)
+    values[rng.random(len(values)) < rate] = ''
+    return values
+
+def _missing(rng: np.random.Generator, values: np.ndarray, rate: float) -> np.ndarray:
+    return np.where(rng.random(len(values)) < rate, np.nan, values)
+
+def _sales(rng: np.random.Generator, start: int, n: int) -> pd.DataFrame:
+    price = np.round(rng.uniform(100, 1100, n), 2)
+    quantity = rng.integers(1, 51, n)
+    return pd.DataFrame({
+        'id': np.arange(start + 1, start + n + 1),
+        'product': _choice(rng, PRODUCTS, n),
+        'quantity': quantity,
+        'price': price,
+        'region': _choice(rng, REGIONS, n),
+        'date': _choice(rng, DATES, n),
+        'revenue': _missing(rng, price * quantity, 0.15),
+        'customer_id': _blank(rng, rng.integers(1, 1001, n), 0.1)
+    })
+
+def _customers(rng: np.random.Generator, start: int, n: int) -> pd.DataFrame:
+    ids = np.arange(start + 1, start + n + 1)
+    return pd.DataFrame({
+        'customer_id': ids,
+        'name': _labels('Customer ', ids),
+        'segment': _choice(rng, SEGMENTS, n),
+        'ltv': np.round(rng.uniform(5000, 55000, n), 2),
+        'acquisition_cost': _missing(rng, np.round(rng.uniform(100, 2100, n), 2), 0.15),
+        'churn_risk': _blank(rng, np.round(rng.uniform(0, 0.3, n), 2), 0.2)
+    })
+
+def _inventory(rng: np.random.Generator, start: int, n: int) -> pd.DataFrame:
+    ids = np.arange(start + 1, start + n + 1)
+    return pd.DataFrame({
+        'sku': _labels('SKU', ids),
+        'product_name': _labels('Product ', ids),
+        'category': _choice(rng, CATEGORIES, n),
+        'stock_level': rng.integers(0, 201, n),
+        'reorder_point': _missing(rng, rng.integers(10, 61, n), 0.1),
+        'unit_cost': np.round(rng.uniform(1, 100, n), 2)
+    })
+
+SAMPLE_TYPES = {
+    "sales": _sales,
+    "customers": _customers,
+    "inventory": _inventory
+}
+
+class SampleDataService:
+    """
+    Generates sample datasets in fixed-size chunks.
+
+    Each chunk draws from its own child of the seed's SeedSequence, so the
+    same seed and size always give the same rows regardless of how many
+    threads generate the chunks.
+    """
+
+    @staticmethod
+    def _tasks(size: int, seed: int, chunk_rows: int) -> List[Tuple[np.random.SeedSequence, int, int]]:
+        starts = range(0, size, chunk_rows)
+        seeds = np.random.SeedSequence(seed).spawn(len(starts))
+        return [(child, start, min(chunk_rows, size - start)) for child, start in zip(seeds, starts)]
+
+    @staticmethod
+    def iter_chunks(
+        data_type: str,
+        size: int,
+        seed: Optional[int] = None,
+        chunk_rows: int = settings.SAMPLE_CHUNK_ROWS,
+        threads: int = settings.SAMPLE_THREADS
+    ) -> Iterator[pd.DataFrame]:
+        """Yield the dataset chunk by chunk, in order"""
+        if data_type not in SAMPLE_TYPES:
+            raise ValueError(f"Unknown sample data type: {data_type}")
+        if size < 0:
+            raise ValueError("Sample size must not be negative")
+
+        build = SAMPLE_TYPES[data_type]
+        make = lambda child, start, n: build(np.random.default_rng(child), start, n)
+        tasks = SampleDataService._tasks(size, settings.RANDOM_SEED if seed is None else seed, chunk_rows)
+        threads = min(threads or os.cpu_count() or 1, len(tasks))
+
+        if threads <= 1:
+            for task in tasks:
+                yield make(*task)
+            return
+
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="sample-data") as pool:
+            # Keep a bounded number of chunks in flight
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.submit(make, *task))
+                if len(pending) >= threads * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    @staticmethod
+    def generate(data_type: str, size: int, seed: Optional[int] = None, **options) -> pd.DataFrame:
+        """Generate a sample dataset as one DataFrame"""
+        chunks = list(SampleDataService.iter_chunks(data_type, size, seed, **options))
+        if not chunks:
+            return SAMPLE_TYPES[data_type](np.random.default_rng(0), 0, 0)
+        return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
+    @staticmethod
+    def write_parquet(data_type: str, size: int, path: str, seed: Optional[int] = None, **options) -> int:
+        """Write a sample dataset to Parquet one row group per chunk, returning bytes written"""
+        from services.data_loader import DataLoaderService, _pyarrow
+        pa = _pyarrow()
+
+        writer = None
+        try:
+            for chunk in SampleDataService.iter_chunks(data_type, size, seed, **options):
+                table = DataLoaderService.to_arrow_table(chunk)
+                if writer is None:
+                    writer = pa.parquet.ParquetWriter(path, table.schema)
+                # Mixed columns may be typed differently in a chunk without blanks
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is None:
+            pa.parquet.write_table(DataLoaderService.to_arrow_table(SampleDataService.generate(data_type, 0)), path)
+        return os.path.getsize(path)
@@ -0,0 +1,174 @@
+"""
+Shared Dataset Catalog
+Memory-mapped Arrow files and a version manifest shared by the workers of a node
+"""
+import os
+import re
+import json
+import pickle
+import hashlib
+import uuid
+from contextlib import contextmanager
+import pandas as pd
+from typing import Optional, Dict, List, Any, Iterator
+
+MANIFEST = "manifest.json"
+LOCK = ".lock"
+
+def _safe(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_\-\.]', '_', name)
+
+class SharedCatalog:
+    """
+    Datasets published to a local directory so every worker process of a
+    node serves the same data.
+
+    Each dataset has a directory holding one immutable Arrow IPC file per
+    version (only the columns that version changed; the rest are read
+    from its parent) and a small JSON manifest naming the files, the
+    current version and the version number. Workers map the files into
+    memory, so the page cache holds one copy of the data for all of them.
+    Writers serialize on an advisory file lock; readers only compare the
+    manifest's version number with their own.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _dir(self, key: str) -> str:
+        safe = re.sub(r'[^A-Za-z0-9_\-]', '_', key)
+        digest = hashlib.sha1(key.encode()).hexdigest()[:8]
+        return os.path.join(self.directory, f"{safe}-{digest}")
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """Hold the dataset's writer lock, across threads and processes"""
+        try:
+            import fcntl
+        except ImportError:
+            raise ValueError("Shared datasets require a POSIX system with file locking")
+
+        os.makedirs(self._dir(key), exist_ok=True)
+        with open(os.path.join(self._dir(key), LOCK), "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def read_manifest(self, key: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self._dir(key), MANIFEST)
+        try:
+            with open(path) as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def stamp(self, key: str) -> Optional[tuple]:
+        """Changes whenever the manifest is replaced; a stat instead of a read"""
+        try:
+            st = os.stat(os.path.join(self._dir(key), MANIFEST))
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def publish(self, key: str, manifest: Dict[str, Any]):
+        """Atomically replace the manifest, then remove files it no longer names"""
+        directory = self._dir(key)
+        tmp = os.path.join(directory, f".{MANIFEST}.{uuid.uuid4().hex}")
+        with open(tmp, "w") as handle:
+            json.dump(manifest, handle)
+        os.replace(tmp, os.path.join(directory, MANIFEST))
+
+        # Workers still mapping an unlinked file keep reading it until they let go
+        referenced = {MANIFEST, LOCK}
+        files = {entry["file"] for entry in manifest["versions"]}
+        for entry in manifest["versions"]:
+            referenced.update(name for name in (entry["file"], entry.get("plan_file")) if name)
+        for name in os.listdir(directory):
+            # Derived data is named after the version file it was built from
+            if name in referenced or name.startswith(".") or name.rsplit(".", 1)[0] in files:
+                continue
+            os.remove(os.path.join(directory, name))
+
+    def write_frame(self, key: str, name: str, df: pd.DataFrame) -> str:
+        """Write a frame as an uncompressed Arrow IPC file, falling back to pickle for mixed-type columns"""
+        base = f"{_safe(name)}-{uuid.uuid4().hex[:12]}"
+        path = os.path.join(self._dir(key), base + ".arrow")
+        pa = _pyarrow()
+        try:
+            # Index labels are kept: cleaned versions keep the labels of their source rows
+            table = pa.Table.from_pandas(df, preserve_index=None)
+            pa.feather.write_feather(table, path, compression="uncompressed")
+            return base + ".arrow"
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            if os.path.exists(path):
+                os.remove(path)
+            df.to_pickle(os.path.join(self._dir(key), base + ".pkl"))
+            return base + ".pkl"
+
+    def read_frame(self, key: str, filename: str) -> pd.DataFrame:
+        """Map a version file into memory; null-free numeric and string columns are not copied"""
+        path = os.path.join(self._dir(key), filename)
+        if filename.endswith(".pkl"):
+            return pd.read_pickle(path)
+        pa = _pyarrow()
+        table = pa.feather.read_table(path, memory_map=True)
+        return table.to_pandas(split_blocks=True)
+
+    def write_plan(self, key: str, name: str, plan) -> str:
+        filename = f"{_safe(name)}-{uuid.uuid4().hex[:12]}.plan"
+        with open(os.path.join(self._dir(key), filename), "wb") as handle:
+            pickle.dump(plan, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        return filename
+
+    def read_plan(self, key: str, filename: str):
+        with open(os.path.join(self._dir(key), filename), "rb") as handle:
+            return pickle.load(handle)
+
+    def write_derived(self, key: str, filename: str, kind: str, value):
+        """Keep data derived from a version file (sketches, row hashes, profile) next to it"""
+        path = os.path.join(self._dir(key), f"{filename}.{kind}")
+        tmp = os.path.join(self._dir(key), f".{filename}.{kind}.{uuid.uuid4().hex}")
+        with open(tmp, "wb") as handle:
+            pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def read_derived(self, key: str, filename: str, kind: str):
+        try:
+            with open(os.path.join(self._dir(key), f"{filename}.{kind}"), "rb") as handle:
+                return pickle.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def keys(self) -> List[str]:
+        """Keys of every published dataset"""
+        keys = []
+        for name in sorted(os.listdir(self.directory)):
+            try:
+                with open(os.path.join(self.directory, name, MANIFEST)) as handle:
+                    keys.append(json.load(handle)["key"])
+            except (FileNotFoundError, NotADirectoryError, ValueError, KeyError):
+                continue
+        return keys
+
+    def restore(self) -> List[str]:
+        """Keys of the datasets to reopen at startup"""
+        return self.keys()
+
+    def remove(self, key: str):
+        """Unpublish a dataset; workers drop it on their next access"""
+        directory = self._dir(key)
+        with self.lock(key):
+            for name in os.listdir(directory):
+                if name != LOCK:
+                    os.remove(os.path.join(directory, name))
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        return pyarrow
+    except ImportError:
+        raise ValueError("Shared datasets require 'pyarrow' package. Install with: pip install pyarrow")
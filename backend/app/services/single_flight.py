@@ -0,0 +1,44 @@
+"""
+Single Flight
+Coalesces concurrent identical computations into one in-flight execution
+"""
+import asyncio
+from typing import Dict, Any, Awaitable, Callable, Hashable
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time.
+
+    Callers arriving while a computation for their key is in flight await
+    the same task and receive its result (or its exception). The task is
+    shielded, so a disconnecting client does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Await the in-flight computation for key, starting it if there is none"""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Execution and coalescing counters"""
+        requests = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / requests, 4) if requests else None
+        }
+
+single_flight = SingleFlight()
@@ -0,0 +1,327 @@
+"""
+Column Sketches
+Mergeable summaries for approximate quantiles, distinct counts and top-k
+"""
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+
+from config import settings
+from services.dtypes import value_counts
+
+class KLLSketch:
+    """
+    KLL quantile sketch.
+
+    Items live in levels of compactors; level h items carry weight 2^h.
+    A full level is sorted and every other item (random offset) is promoted,
+    so memory stays O(k log n) and two sketches merge level by level.
+    """
+
+    def __init__(self, k: int = settings.SKETCH_QUANTILE_K, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so total weight is preserved
+                keep = items[len(items) - len(items) % 2:]
+                promoted = items[self._rng.integers(2):len(items) - len(keep):2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values: np.ndarray):
+        """Add a batch of non-missing values"""
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values.astype(np.float64)])
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        """Fold another sketch into this one"""
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def quantiles(self, qs: List[float]) -> List[float]:
+        """Approximate quantiles for fractions in [0, 1]"""
+        if self.n == 0:
+            return [math.nan for _ in qs]
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, cumulative = values[order], np.cumsum(weights[order])
+
+        positions = np.searchsorted(cumulative, np.asarray(qs) * self.n, side="left")
+        results = values[np.clip(positions, 0, len(values) - 1)]
+        return [
+            self.min if q <= 0 else self.max if q >= 1 else float(value)
+            for q, value in zip(qs, results)
+        ]
+
+    @property
+    def rank_error(self) -> float:
+        """Normalized rank error at 99% confidence (exact until the first compaction)"""
+        if len(self.levels) == 1:
+            return 0.0
+        return 2.296 / self.k ** 0.9723
+
+def _leading_zeros(x: np.ndarray) -> np.ndarray:
+    """Count leading zero bits of uint64 values"""
+    # Values shifted down to 53 bits convert to float exactly, and frexp's
+    # exponent is then the bit length
+    high = x >> np.uint64(11)
+    _, bits = np.frexp(high.astype(np.float64))
+    bits += 11
+    small = np.flatnonzero(high == 0)
+    if len(small):
+        _, bits[small] = np.frexp(x[small].astype(np.float64))
+    return 64 - bits
+
+def _canonical(values: pd.Series) -> List[pd.Series]:
+    """
+    Values in one form per kind, so blocks of a column parsed or encoded
+    with different dtypes hash equal values alike: numbers as float64,
+    text and categories as str (numbers written as text count as numbers)
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(values.dtype.categories.dtype)
+    if pd.api.types.is_numeric_dtype(values):
+        # + 0.0 folds -0.0 into 0.0
+        return [values.astype(np.float64) + 0.0]
+    if values.dtype != object and not pd.api.types.is_string_dtype(values.dtype):
+        return [values]
+    numbers = pd.to_numeric(values, errors="coerce")
+    is_number = numbers.notna()
+    return [numbers[is_number].astype(np.float64) + 0.0, values[~is_number].astype(str).astype(object)]
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit pandas hashes of canonical values"""
+
+    def __init__(self, precision: int = settings.SKETCH_HLL_PRECISION):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values: pd.Series):
+        """Add a batch of non-missing values"""
+        for part in _canonical(values):
+            if len(part):
+                self._add(pd.util.hash_pandas_object(part, index=False).to_numpy())
+
+    def _add(self, hashes: np.ndarray):
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        rank = np.minimum(_leading_zeros(hashes << np.uint64(self.precision)) + 1, 64 - self.precision + 1)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog"):
+        """Fold another counter into this one"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        """Estimated number of distinct values"""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self) -> float:
+        """Standard error of the estimate relative to the true count"""
+        return 1.04 / math.sqrt(self.m)
+
+class SpaceSaving:
+    """
+    Mergeable heavy-hitter summary.
+
+    Tracks at most `capacity` values with overestimated counts and their
+    maximum overestimate. `floor` bounds the count of any value that is not
+    tracked, so every value more frequent than `floor` is present.
+    """
+
+    def __init__(self, capacity: int = settings.SKETCH_TOPK_CAPACITY):
+        self.capacity = capacity
+        self.n = 0
+        self.floor = 0
+        self.counts = pd.Series(dtype=np.int64)
+        self.errors = pd.Series(dtype=np.int64)
+
+    def _truncate(self, counts: pd.Series, errors: pd.Series, floor: int):
+        counts = counts.sort_values(ascending=False, kind="stable")
+        if len(counts) > self.capacity:
+            floor = max(floor, int(counts.iloc[self.capacity]))
+            counts = counts.iloc[:self.capacity]
+        self.counts = counts
+        self.errors = errors.loc[counts.index]
+        self.floor = floor
+
+    def update(self, values: pd.Series):
+        """Add a batch of non-missing values"""
+        self.update_counts(value_counts(values))
+
+    def update_counts(self, counts: pd.Series):
+        """Add exact value counts of a batch"""
+        chunk = SpaceSaving(self.capacity)
+        chunk.n = int(counts.sum())
+        chunk._truncate(counts, pd.Series(0, index=counts.index, dtype=np.int64), 0)
+        self.merge(chunk)
+
+    def merge(self, other: "SpaceSaving"):
+        """Fold another summary in; values missing from one side count as its floor"""
+        index = self.counts.index.union(other.counts.index, sort=False)
+        counts = self.counts.reindex(index, fill_value=self.floor) + other.counts.reindex(index, fill_value=other.floor)
+        errors = self.errors.reindex(index, fill_value=self.floor) + other.errors.reindex(index, fill_value=other.floor)
+        self.n += other.n
+        self._truncate(counts, errors, self.floor + other.floor)
+
+class ColumnSketches:
+    """
+    Per-column sketches of a dataset, built chunk by chunk and mergeable.
+
+    Numeric columns get a KLL quantile sketch, every column a HyperLogLog
+    distinct counter, and non-float columns a space-saving top-k summary.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _quantile_column(series: pd.Series) -> bool:
+        return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+    def _entry(self, col: str, series: pd.Series) -> Dict[str, Any]:
+        entry = self.columns.get(col)
+        if entry is None:
+            entry = {
+                "quantiles": KLLSketch(seed=settings.RANDOM_SEED) if self._quantile_column(series) else None,
+                "distinct": HyperLogLog(),
+                "top": None if pd.api.types.is_float_dtype(series) else SpaceSaving()
+            }
+            self.columns[col] = entry
+        return entry
+
+    def update(self, df: pd.DataFrame):
+        """Add a chunk of rows"""
+        self.rows += len(df)
+        for col in df.columns:
+            series = df[col]
+            entry = self._entry(col, series)
+            values = series.dropna()
+
+            if entry["quantiles"] is not None:
+                if self._quantile_column(series):
+                    entry["quantiles"].update(values.to_numpy(dtype=np.float64))
+                else:
+                    # The column stopped being numeric in this chunk
+                    entry["quantiles"] = None
+            if entry["top"] is not None:
+                counts = value_counts(values)
+                entry["top"].update_counts(counts)
+                # Duplicates do not change a HyperLogLog, so only hash the distinct values
+                entry["distinct"].update(pd.Series(counts.index))
+            else:
+                entry["distinct"].update(values)
+
+    def merge(self, other: "ColumnSketches"):
+        """Fold the sketches of another chunk into these"""
+        self.rows += other.rows
+        for col, theirs in other.columns.items():
+            ours = self.columns.get(col)
+            if ours is None:
+                self.columns[col] = theirs
+                continue
+            for name in ("quantiles", "distinct", "top"):
+                if ours[name] is not None and theirs[name] is not None:
+                    ours[name].merge(theirs[name])
+                elif name != "distinct":
+                    ours[name] = None
+
+    def retain(self, df: pd.DataFrame):
+        """Drop sketches that no longer fit the final dtypes of the assembled frame"""
+        self.columns = {col: entry for col, entry in self.columns.items() if col in df.columns}
+        for col, entry in self.columns.items():
+            if not self._quantile_column(df[col]):
+                entry["quantiles"] = None
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, chunk_rows: int = settings.SKETCH_CHUNK_ROWS) -> "ColumnSketches":
+        """Sketch a DataFrame chunk by chunk"""
+        sketches = cls()
+        for start in range(0, max(len(df), 1), chunk_rows):
+            sketches.update(df.iloc[start:start + chunk_rows])
+        return sketches
+
+    def _column(self, column: str) -> Dict[str, Any]:
+        if column not in self.columns:
+            raise ValueError(f"Column {column} not found")
+        return self.columns[column]
+
+    def percentiles(self, column: str, percentiles: List[int]) -> Dict[str, Any]:
+        """Approximate percentiles of a numeric column"""
+        sketch = self._column(column)["quantiles"]
+        if sketch is None:
+            raise ValueError(f"Column {column} is not numeric")
+        values = sketch.quantiles([p / 100 for p in percentiles])
+        return {
+            "column": column,
+            "percentiles": {f"p{p}": value for p, value in zip(percentiles, values)},
+            "approx": True,
+            "count": sketch.n,
+            "rank_error": sketch.rank_error
+        }
+
+    def cardinality(self, column: str) -> Dict[str, Any]:
+        """Approximate number of distinct values in a column"""
+        sketch = self._column(column)["distinct"]
+        return {
+            "column": column,
+            "distinct": sketch.estimate(),
+            "approx": True,
+            "relative_error": round(sketch.relative_error, 6)
+        }
+
+    def top(self, column: str, k: Optional[int] = None) -> Dict[str, Any]:
+        """Approximate most frequent values of a column"""
+        sketch = self._column(column)["top"]
+        if sketch is None:
+            raise ValueError(f"Column {column} has no top-k sketch (float columns are not tracked)")
+        counts = sketch.counts.iloc[:k] if k else sketch.counts
+        return {
+            "labels": [label.item() if hasattr(label, "item") else label for label in counts.index],
+            "values": [int(value) for value in counts.values],
+            "column": column,
+            "approx": True,
+            "total": sketch.n,
+            # Listed counts exceed the true ones by at most this much
+            "error_bound": int(sketch.errors.max()) if len(sketch.errors) else 0,
+            # Values not listed occur at most this often
+            "unlisted_max": sketch.floor
+        }
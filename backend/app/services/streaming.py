@@ -0,0 +1,124 @@
+"""
+Streaming Response Service
+Encodes DataFrames incrementally as JSON, NDJSON, columnar JSON or Arrow IPC
+"""
+import io
+import json
+import pandas as pd
+from typing import Dict, Any, Iterator, Optional
+from fastapi.responses import StreamingResponse
+
+from config import settings
+from services.data_loader import DataLoaderService, _pyarrow
+
+STREAM_FORMATS = ("json", "ndjson", "columnar", "arrow")
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose contents are taken after each record batch"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+class StreamingService:
+
+    @staticmethod
+    def _batches(df: pd.DataFrame, batch_rows: int) -> Iterator[pd.DataFrame]:
+        for start in range(0, len(df), batch_rows):
+            yield df.iloc[start:start + batch_rows]
+
+    @staticmethod
+    def _extra_json(extra: Dict[str, Any]) -> str:
+        return "".join(f",{json.dumps(key)}:{json.dumps(value)}" for key, value in extra.items())
+
+    @staticmethod
+    def iter_json(df: pd.DataFrame, extra: Dict[str, Any], batch_rows: int) -> Iterator[bytes]:
+        """{"data": [row objects...], **extra}"""
+        yield b'{"data":['
+        first = True
+        for batch in StreamingService._batches(df, batch_rows):
+            rows = batch.to_json(orient="records", date_format="iso")[1:-1]
+            if rows:
+                yield (rows if first else "," + rows).encode()
+                first = False
+        yield f"]{StreamingService._extra_json(extra)}}}".encode()
+
+    @staticmethod
+    def iter_ndjson(df: pd.DataFrame, batch_rows: int) -> Iterator[bytes]:
+        """One JSON object per line"""
+        for batch in StreamingService._batches(df, batch_rows):
+            lines = batch.to_json(orient="records", lines=True, date_format="iso")
+            if lines:
+                yield (lines if lines.endswith("\n") else lines + "\n").encode()
+
+    @staticmethod
+    def iter_columnar(df: pd.DataFrame, extra: Dict[str, Any]) -> Iterator[bytes]:
+        """{"columns": [names], "values": [[column values]...], **extra}"""
+        yield f'{{"columns":{json.dumps([str(col) for col in df.columns])},"values":['.encode()
+        for i, col in enumerate(df.columns):
+            values = df[col].to_json(orient="values", date_format="iso")
+            yield (values if i == 0 else "," + values).encode()
+        yield f"]{StreamingService._extra_json(extra)}}}".encode()
+
+    @staticmethod
+    def iter_arrow(df: pd.DataFrame, batch_rows: int) -> Iterator[bytes]:
+        """Arrow IPC stream, one record batch at a time"""
+        pa = _pyarrow()
+        sink = _Drain()
+        schema = DataLoaderService.arrow_schema(df)
+        with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+            for batch in StreamingService._batches(df, batch_rows):
+                table = DataLoaderService.to_arrow_table(batch).cast(schema)
+                writer.write_table(table)
+                yield sink.take()
+        yield sink.take()
+
+    @staticmethod
+    def stream(
+        df: pd.DataFrame,
+        fmt: str = "json",
+        extra: Optional[Dict[str, Any]] = None,
+        batch_rows: int = settings.STREAM_BATCH_ROWS
+    ) -> StreamingResponse:
+        """
+        Stream a DataFrame batch by batch so memory stays flat.
+
+        JSON and columnar responses carry `extra` as additional top-level
+        keys; NDJSON and Arrow responses send it as X-* headers instead.
+        """
+        extra = extra or {}
+
+        if fmt == "json":
+            return StreamingResponse(StreamingService.iter_json(df, extra, batch_rows), media_type="application/json")
+        if fmt == "columnar":
+            return StreamingResponse(StreamingService.iter_columnar(df, extra), media_type="application/json")
+
+        headers = {
+            "X-" + key.replace("_", "-").title(): str(value)
+            for key, value in extra.items() if value is not None
+        }
+        if fmt == "ndjson":
+            return StreamingResponse(
+                StreamingService.iter_ndjson(df, batch_rows),
+                media_type="application/x-ndjson",
+                headers=headers
+            )
+        if fmt == "arrow":
+            _pyarrow()
+            return StreamingResponse(
+                StreamingService.iter_arrow(df, batch_rows),
+                media_type="application/vnd.apache.arrow.stream",
+                headers=headers
+            )
+        raise ValueError(f"Unsupported format: {fmt}. Use one of {', '.join(STREAM_FORMATS)}")
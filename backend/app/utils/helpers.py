@@ -0,0 +1,18 @@
+"""
+Helper Utilities
+"""
+import base64
+from typing import Tuple
+
+def encode_cursor(version: int, offset: int) -> str:
+    """Encode a pagination cursor bound to a dataset version"""
+    return base64.urlsafe_b64encode(f"{version}:{offset}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """Decode a pagination cursor into (version, offset)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        version, offset = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        return int(version), int(offset)
+    except Exception:
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    from fastapi.testclient import TestClient
+    
+    # The app creates its upload directory relative to the working directory
+    os.chdir(tmp_path_factory.mktemp("app"))
+    from main import app
+    
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,20 @@
+import gzip
+
+import pytest
+
+from services.csv_ingest import StreamingCSVParser, DecodedSizeExceeded
+
+def test_gzip_bomb_is_stopped_at_the_decoded_limit():
+    body = gzip.compress(b"a,b\n" + b"1,2\n" * (1 << 20))
+    parser = StreamingCSVParser("gzip", max_decoded=1 << 20)
+    
+    with pytest.raises(DecodedSizeExceeded):
+        parser.feed(body)
+    # Inflation stops within one step of the limit
+    assert parser.bytes_decoded <= (1 << 20) + (1 << 20)
+
+def test_upload_within_decoded_limit_parses():
+    parser = StreamingCSVParser("gzip", max_decoded=1 << 20)
+    parser.feed(gzip.compress(b"a,b\n1,2\n3,4\n"))
+    
+    assert parser.close()["b"].tolist() == [2, 4]
@@ -0,0 +1,38 @@
+def upload(client, dataset_id, content):
+    response = client.post(
+        "/api/data/upload",
+        params={"dataset_id": dataset_id},
+        files={"file": ("data.csv", content, "text/csv")}
+    )
+    assert response.status_code == 200
+
+def test_unchanged_dataset_answers_304(client):
+    upload(client, "etag-same", b"a,b\n1,2\n3,4\n")
+    
+    first = client.get("/api/data/raw", params={"dataset_id": "etag-same"})
+    assert first.status_code == 200
+    
+    again = client.get(
+        "/api/data/raw",
+        params={"dataset_id": "etag-same"},
+        headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert again.status_code == 304
+
+def test_reupload_after_delete_changes_etag(client):
+    upload(client, "etag-reload", b"a,b\n1,2\n3,4\n")
+    first = client.get("/api/data/raw", params={"dataset_id": "etag-reload"})
+    assert first.status_code == 200
+    
+    assert client.delete("/api/data/datasets/etag-reload").status_code == 200
+    # The new store numbers its versions from the start again
+    upload(client, "etag-reload", b"a,b\n5,6\n")
+    
+    second = client.get(
+        "/api/data/raw",
+        params={"dataset_id": "etag-reload"},
+        headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert second.json()["data"] == [{"a": 5, "b": 6}]
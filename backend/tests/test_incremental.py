@@ -0,0 +1,22 @@
+import pandas as pd
+
+from services.dataset_store import DatasetStore
+from services.dtypes import DtypeOptimizer
+from services.incremental import IncrementalService
+
+def test_append_new_category_keeps_categorical():
+    df, _ = DtypeOptimizer.optimize(pd.DataFrame({
+        "product": ["apple", "pear", "apple", "pear", "apple", "pear"],
+        "units": [1, 2, 3, 4, 5, 6]
+    }))
+    assert isinstance(df["product"].dtype, pd.CategoricalDtype)
+    store = DatasetStore("append-category")
+    store.load(df)
+    
+    IncrementalService.append(store, pd.DataFrame({"product": ["plum", "apple"], "units": [7, 8]}))
+    
+    raw = store.raw()
+    assert isinstance(raw["product"].dtype, pd.CategoricalDtype)
+    assert list(raw["product"].cat.categories) == ["apple", "pear", "plum"]
+    assert raw["product"].astype(str).tolist() == ["apple", "pear", "apple", "pear", "apple", "pear", "plum", "apple"]
+    assert raw.index.equals(pd.RangeIndex(8))
@@ -0,0 +1,20 @@
+import pandas as pd
+
+from services.sketches import ColumnSketches, HyperLogLog
+
+def test_distinct_count_ignores_block_dtypes():
+    ints = pd.DataFrame({"n": list(range(1000)), "s": [f"v{i % 50}" for i in range(1000)]})
+    floats = ints.assign(n=ints["n"].astype("float64"), s=ints["s"].astype("category"))
+    
+    merged = ColumnSketches.build(ints)
+    merged.merge(ColumnSketches.build(floats))
+    
+    assert merged.cardinality("n")["distinct"] == ColumnSketches.build(ints).cardinality("n")["distinct"]
+    assert merged.cardinality("s")["distinct"] == 50
+
+def test_numbers_written_as_text_count_as_numbers():
+    counter = HyperLogLog()
+    counter.update(pd.Series([1, 2, 3]))
+    counter.update(pd.Series(["1", "2.0", "x"]))
+    
+    assert counter.estimate() == 4